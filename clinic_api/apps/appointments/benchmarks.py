@@ -0,0 +1,138 @@
+import random
+import statistics
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.users.tokens import ClinicRefreshToken
+from clinic_api.apps.doctors.models import TimeSlot
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+class BenchmarkContext:
+    """Seeded users and a test client shared by all scenarios."""
+
+    def __init__(self, password, random_seed=0):
+        self.password = password
+        self.rng = random.Random(random_seed)
+        self.client = Client()
+        self.doctors = list(User.objects.filter(role='doctor').order_by('id'))
+        self.patients = list(User.objects.filter(role='patient').order_by('id'))
+        self._tokens = {}
+
+    def headers(self, user):
+        if user.pk not in self._tokens:
+            self._tokens[user.pk] = str(ClinicRefreshToken.for_user(user).access_token)
+        return {'HTTP_AUTHORIZATION': f'Bearer {self._tokens[user.pk]}'}
+
+
+@contextmanager
+def scratch_database():
+    """Run the block against a freshly created, then destroyed, test database."""
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_scenario(name, context, requests):
+    """Issue ``requests`` calls of one scenario and summarise them."""
+    make_request = SCENARIOS[name](context)
+    latencies, queries, statuses = [], [], Counter()
+    started = time.perf_counter()
+    for _ in range(requests):
+        with CaptureQueriesContext(connection) as ctx:
+            begin = time.perf_counter()
+            response = make_request()
+            latencies.append(time.perf_counter() - begin)
+        queries.append(len(ctx.captured_queries))
+        statuses[response.status_code] += 1
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': requests,
+        'requests_per_sec': round(requests / elapsed, 2),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p95': round(percentile(latencies, 95) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+            'mean': round(statistics.fmean(latencies) * 1000, 3),
+        },
+        'queries_per_request': round(statistics.fmean(queries), 2),
+        'queries_per_sec': round(sum(queries) / elapsed, 2),
+        'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+@scenario('slot_search')
+def slot_search(context):
+    patient = context.patients[0]
+
+    def request():
+        doctor = context.rng.choice(context.doctors)
+        url = reverse('doctor-timeslots', kwargs={'pk': doctor.pk})
+        return context.client.get(url, **context.headers(patient))
+    return request
+
+
+@scenario('booking_storm')
+def booking_storm(context):
+    # Everyone competes for the first free slots of a single doctor, so
+    # most requests lose the race and exercise the conflict path.
+    doctor = context.doctors[0]
+    slots = list(
+        TimeSlot.objects
+        .filter(doctor=doctor, is_available=True, appointment__isnull=True)
+        .values_list('pk', flat=True)[:20]
+    )
+    url = reverse('appointment-list')
+
+    def request():
+        patient = context.rng.choice(context.patients)
+        data = {'doctor': doctor.pk, 'timeslot': context.rng.choice(slots)}
+        return context.client.post(url, data, **context.headers(patient))
+    return request
+
+
+@scenario('doctor_agenda')
+def doctor_agenda(context):
+    url = reverse('appointment-list')
+
+    def request():
+        doctor = context.rng.choice(context.doctors)
+        day = date.today() + timedelta(days=context.rng.randint(1, 7))
+        return context.client.get(url, {'date': day.isoformat()}, **context.headers(doctor))
+    return request
+
+
+@scenario('login')
+def login(context):
+    url = reverse('token_obtain_pair')
+
+    def request():
+        user = context.rng.choice(context.patients)
+        return context.client.post(url, {'username': user.username, 'password': context.password})
+    return request
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+
+from clinic_api.apps.appointments.benchmarks import percentile
+
+
+class HTTPConnection:
+    """A minimal keep-alive HTTP/1.1 client, enough to drive a local server hard.
+
+    The load generator must not be the bottleneck at hundreds of
+    concurrent clients, so this speaks raw asyncio streams instead of
+    spinning up a thread per client.
+    """
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, body=b''):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', f'Content-Length: {len(body)}']
+        lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('Server closed the connection')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in response_headers:
+            content = await self.reader.readexactly(int(response_headers['content-length']))
+        elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                chunks.append(await self.reader.readexactly(size + 2))
+                if size == 0:
+                    break
+            content = b''.join(chunk[:-2] for chunk in chunks)
+        else:
+            content = await self.reader.read()
+            response_headers['connection'] = 'close'
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, response_headers, content
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+
+async def login(host, port, username, password):
+    """Obtain an access token from ``/auth/login/``."""
+    connection = HTTPConnection(host, port)
+    try:
+        status, _, content = await connection.request(
+            'POST', '/auth/login/', {'Content-Type': 'application/json'},
+            json.dumps({'username': username, 'password': password}).encode(),
+        )
+    finally:
+        await connection.close()
+    if status != 200:
+        raise RuntimeError(f'Login as {username} failed with HTTP {status}: {content[:200]!r}')
+    return json.loads(content)['access']
+
+
+async def run_load(host, port, requests, clients, duration, warmup=0.0):
+    """Have ``clients`` keep-alive connections cycle through ``requests`` for ``duration`` seconds.
+
+    ``requests`` is a list of ``(method, path, headers)`` tuples; each client
+    starts at a different offset. Responses completing during the first
+    ``warmup`` seconds are not recorded.
+    """
+    latencies, statuses, errors = [], Counter(), Counter()
+    started = time.perf_counter()
+    record_from = started + warmup
+    deadline = record_from + duration
+
+    async def client(offset):
+        connection = HTTPConnection(host, port)
+        i = offset
+        try:
+            while time.perf_counter() < deadline:
+                method, path, headers = requests[i % len(requests)]
+                i += 1
+                begin = time.perf_counter()
+                try:
+                    status, _, _ = await connection.request(method, path, headers)
+                except (OSError, asyncio.IncompleteReadError, ValueError, IndexError) as exc:
+                    await connection.close()
+                    if begin >= record_from:
+                        errors[type(exc).__name__] += 1
+                    await asyncio.sleep(0.01)
+                    continue
+                if begin >= record_from:
+                    latencies.append(time.perf_counter() - begin)
+                    statuses[status] += 1
+        finally:
+            await connection.close()
+
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    elapsed = time.perf_counter() - record_from
+    return {
+        'clients': clients,
+        'duration_sec': round(elapsed, 2),
+        'requests': len(latencies),
+        'requests_per_sec': round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p95': round(percentile(latencies, 95) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+            'mean': round(statistics.fmean(latencies) * 1000, 3),
+        } if latencies else None,
+        'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+        'errors': dict(errors),
+    }
@@ -0,0 +1,84 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+
+from clinic_api.apps.appointments.benchmarks import SCENARIOS, BenchmarkContext, run_scenario, scratch_database
+from clinic_api.apps.appointments.seed import seed
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Run scripted API scenarios in-process against a freshly seeded test database '
+        'and report latency percentiles, throughput and queries per request as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                            help='Scenario to run; repeat for several. Defaults to all.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per scenario.')
+        parser.add_argument('--doctors', type=int, default=20)
+        parser.add_argument('--patients', type=int, default=500)
+        parser.add_argument('--days', type=int, default=7)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for data and scenarios.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+        parser.add_argument('--throttled', action='store_true',
+                            help='Apply THROTTLE_RATES, e.g. to see booking_storm shed load; off by default.')
+
+    def handle(self, *args, **options):
+        password = 'pass1234'
+        # Background jobs run inline: pool and poller threads writing to the
+        # SQLite scratch database would fight the scenarios for its lock.
+        with scratch_database(), override_settings(THROTTLE_ENABLED=options['throttled'], TASKS_RUNNER='local'):
+            dataset = seed(
+                doctors=options['doctors'],
+                patients=options['patients'],
+                days=options['days'],
+                password=password,
+                random_seed=options['seed'],
+            )
+            context = BenchmarkContext(password, random_seed=options['seed'])
+            results = {}
+            for name in options['scenario'] or sorted(SCENARIOS):
+                if options['warmup']:
+                    run_scenario(name, context, options['warmup'])
+                results[name] = run_scenario(name, context, options['requests'])
+                self.stderr.write(
+                    f"{name}: p50={results[name]['latency_ms']['p50']}ms "
+                    f"p99={results[name]['latency_ms']['p99']}ms "
+                    f"{results[name]['requests_per_sec']} req/s"
+                )
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'dataset': dataset,
+                'throttled': options['throttled'],
+            },
+            'scenarios': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,83 @@
+import json
+import statistics
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from clinic_api.apps.appointments.benchmarks import percentile
+from clinic_api.apps.users.models import User
+
+VARIANTS = {
+    'per_request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False},
+    'persistent_health_checked': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure per-request latency of a small read with and without persistent database '
+        'connections, replaying the request_started/request_finished cycle that closes '
+        'connections in production.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--variant', action='append', choices=list(VARIANTS),
+                            help='Connection setting to measure; repeat for several. Defaults to all.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per variant.')
+        parser.add_argument('--database', default='default', help='Database alias to measure.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        original = {key: connection.settings_dict[key] for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            if connection.alias == options['database']:
+                opened.append(connection.alias)
+
+        connection_created.connect(count_connection)
+        results = {}
+        try:
+            for name in options['variant'] or list(VARIANTS):
+                connection.close()
+                connection.settings_dict.update(VARIANTS[name])
+                opened.clear()
+                results[name] = self.measure(options['requests'], options['database'])
+                results[name]['connections_opened'] = len(opened)
+                self.stderr.write(
+                    f"{name}: p50={results[name]['latency_ms']['p50']}ms "
+                    f"p99={results[name]['latency_ms']['p99']}ms, {len(opened)} connections"
+                )
+        finally:
+            connection_created.disconnect(count_connection)
+            connection.close()
+            connection.settings_dict.update(original)
+
+        self.stdout.write(json.dumps({
+            'database': {'alias': options['database'], 'vendor': connection.vendor},
+            'variants': results,
+        }, indent=2))
+
+    def measure(self, requests, alias):
+        latencies = []
+        for _ in range(requests):
+            begin = time.perf_counter()
+            # The same signals WSGIHandler sends; close_old_connections listens to both.
+            request_started.send(sender=WSGIHandler)
+            User.objects.using(alias).filter(role='doctor', is_active=True).exists()
+            request_finished.send(sender=WSGIHandler)
+            latencies.append(time.perf_counter() - begin)
+        return {
+            'requests': requests,
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50) * 1000, 3),
+                'p95': round(percentile(latencies, 95) * 1000, 3),
+                'p99': round(percentile(latencies, 99) * 1000, 3),
+                'mean': round(statistics.fmean(latencies) * 1000, 3),
+            },
+        }
@@ -0,0 +1,79 @@
+import json
+import math
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from clinic_api.apps.appointments.benchmarks import scratch_database
+from clinic_api.apps.appointments.models import Appointment
+from clinic_api.apps.appointments.seed import seed
+from clinic_api.apps.appointments.serializers import AppointmentRowSerializer, AppointmentSerializer
+
+# Appointments the default seed books per doctor and day (16 slots, half booked).
+BOOKINGS_PER_DOCTOR_DAY = 8
+
+
+def model_page(queryset, rows):
+    return AppointmentSerializer(list(queryset.select_related('doctor', 'patient', 'timeslot')[:rows]), many=True)
+
+
+def row_page(queryset, rows):
+    return AppointmentRowSerializer(list(queryset.values(*AppointmentRowSerializer.values)[:rows]), many=True)
+
+
+PATHS = {'model': model_page, 'values': row_page}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare fetching, serializing and rendering one large appointment page through '
+        'model instances (AppointmentSerializer) and through .values() rows '
+        '(AppointmentRowSerializer) on a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Appointments on the page.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per path.')
+        parser.add_argument('--doctors', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        days = math.ceil(rows / (options['doctors'] * BOOKINGS_PER_DOCTOR_DAY)) + 1
+        with scratch_database():
+            seed(doctors=options['doctors'], patients=200, days=days)
+            queryset = Appointment.objects.order_by('-created_at', '-id')
+            if queryset.count() < rows:
+                raise CommandError(f'Seeded fewer than {rows} appointments; raise --doctors.')
+            rendered = {name: self.render(page(queryset, rows)) for name, page in PATHS.items()}
+            if rendered['model'] != rendered['values']:
+                raise CommandError('The two paths rendered different JSON; the benchmark would be meaningless.')
+            results = {name: self.measure(page, queryset, rows, options['repeat']) for name, page in PATHS.items()}
+
+        results['speedup'] = {
+            stage: round(results['model'][stage] / results['values'][stage], 2)
+            for stage in ('fetch_ms', 'serialize_ms', 'total_ms')
+        }
+        self.stdout.write(json.dumps({'rows': rows, 'bytes': len(rendered['values']), **results}, indent=2))
+
+    @staticmethod
+    def render(serializer):
+        return JSONRenderer().render(serializer.data)
+
+    def measure(self, page, queryset, rows, repeat):
+        fetch, serialize = [], []
+        for _ in range(repeat):
+            begin = time.perf_counter()
+            serializer = page(queryset, rows)
+            fetched = time.perf_counter()
+            self.render(serializer)
+            fetch.append(fetched - begin)
+            serialize.append(time.perf_counter() - fetched)
+        fetch_ms = statistics.median(fetch) * 1000
+        serialize_ms = statistics.median(serialize) * 1000
+        return {
+            'fetch_ms': round(fetch_ms, 3),
+            'serialize_ms': round(serialize_ms, 3),
+            'total_ms': round(fetch_ms + serialize_ms, 3),
+        }
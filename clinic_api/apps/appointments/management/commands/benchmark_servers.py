@@ -0,0 +1,170 @@
+import asyncio
+import json
+import os
+import platform
+import shlex
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from clinic_api.apps.appointments.loadtest import login, run_load
+from clinic_api.apps.appointments.management.commands.benchmark import git_revision
+
+SERVERS = {
+    'wsgi': 'gunicorn clinic_api.core.wsgi:application --bind {host}:{port} --workers {workers} '
+            '--threads {threads} --worker-class gthread --log-level warning',
+    'asgi': 'uvicorn clinic_api.core.asgi:application --host {host} --port {port} --workers {workers} '
+            '--log-level warning --no-access-log',
+}
+PASSWORD = 'pass1234'
+
+
+def wait_for_port(host, port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f'Server exited with status {process.returncode} before accepting connections')
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Server did not listen on {host}:{port} within {timeout}s')
+
+
+def read_requests(doctor_token, patient_token):
+    """The read mix served by the async views: directory, slots and /me."""
+    doctor = {'Authorization': f'Bearer {doctor_token}'}
+    patient = {'Authorization': f'Bearer {patient_token}'}
+    return [
+        ('GET', '/doctors/', patient),
+        ('GET', '/doctors/?search=Cardiology', patient),
+        ('GET', '/doctors/1/timeslots/', patient),
+        ('GET', '/appointments/me/', patient),
+        ('GET', '/timeslots/', doctor),
+        ('GET', '/appointments/me/', doctor),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a scratch SQLite database, serve it with a WSGI (gunicorn) and an ASGI (uvicorn) '
+        'server in turn and compare their throughput on the read endpoints under many '
+        'concurrent keep-alive clients.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', action='append', choices=sorted(SERVERS),
+                            help='Server mode to measure; repeat for several. Defaults to both.')
+        parser.add_argument('--clients', type=int, default=500, help='Concurrent client connections.')
+        parser.add_argument('--duration', type=float, default=20.0, help='Measured seconds per mode.')
+        parser.add_argument('--warmup', type=float, default=3.0, help='Unmeasured seconds per mode.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Server worker processes.')
+        parser.add_argument('--threads', type=int, default=8, help='Threads per WSGI worker.')
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--database', help='SQLite file to seed and serve (defaults to a temporary file).')
+        parser.add_argument('--doctors', type=int, default=20)
+        parser.add_argument('--patients', type=int, default=500)
+        parser.add_argument('--days', type=int, default=7)
+        for mode in SERVERS:
+            parser.add_argument(f'--{mode}-server', help=f'Command template for the {mode.upper()} server.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        modes = options['mode'] or sorted(SERVERS, reverse=True)
+        commands = {
+            mode: shlex.split((options[f'{mode}_server'] or SERVERS[mode]).format(**options)) for mode in modes
+        }
+        for mode, command in commands.items():
+            if shutil.which(command[0]) is None:
+                raise CommandError(f'{command[0]} is not installed; it is needed for the {mode.upper()} run.')
+
+        scratch = tempfile.mkdtemp(prefix='clinic-bench-')
+        database = options['database'] or os.path.join(scratch, 'bench.sqlite3')
+        # The servers run with DEBUG off, where the user-state cache must be
+        # shared by all workers; a file-based cache in the scratch directory is.
+        # Throttling is off, as in `manage.py benchmark` by default.
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'clinic_api.core.settings',
+            'PYTHONPATH': os.pathsep.join(filter(None, [str(settings.BASE_DIR), os.environ.get('PYTHONPATH')])),
+            'DATABASE_ENGINE': 'django.db.backends.sqlite3',
+            'DATABASE_NAME': database,
+            'DEBUG': 'false',
+            'ALLOWED_HOSTS': f'{options["host"]},localhost',
+            'SECRET_KEY': settings.SECRET_KEY,
+            'CACHE_BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'CACHE_LOCATION': os.path.join(scratch, 'cache'),
+            'THROTTLE_ENABLED': 'false',
+        }
+        try:
+            self.prepare_database(env, options)
+            results = {}
+            for mode in modes:
+                self.stderr.write(f'{mode}: {" ".join(commands[mode])}')
+                results[mode] = self.measure(commands[mode], {**env, 'ASYNC_READ_VIEWS': str(mode == 'asgi')}, options)
+                self.stderr.write(
+                    f"{mode}: {results[mode]['requests_per_sec']} req/s, "
+                    f"p99={(results[mode]['latency_ms'] or {}).get('p99')}ms, errors={results[mode]['errors']}"
+                )
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'cpus': os.cpu_count(),
+                'workers': options['workers'],
+                'threads': options['threads'],
+                'servers': {mode: ' '.join(command) for mode, command in commands.items()},
+            },
+            'modes': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def prepare_database(self, env, options):
+        seed = (
+            'from clinic_api.apps.appointments.seed import seed; '
+            f'seed(doctors={options["doctors"]}, patients={options["patients"]}, '
+            f'days={options["days"]}, password={PASSWORD!r})'
+        )
+        for command in (['migrate', '--run-syncdb', '--verbosity', '0'], ['shell', '-c', seed]):
+            subprocess.run([sys.executable, '-m', 'django', *command], env=env, check=True)
+
+    def measure(self, command, env, options):
+        host, port = options['host'], options['port']
+        server = subprocess.Popen(command, env=env)
+        try:
+            wait_for_port(host, port, server)
+            return asyncio.run(self.drive(host, port, options))
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    async def drive(self, host, port, options):
+        doctor_token = await login(host, port, 'doctor0', PASSWORD)
+        patient_token = await login(host, port, 'patient0', PASSWORD)
+        return await run_load(
+            host, port, read_requests(doctor_token, patient_token),
+            clients=options['clients'], duration=options['duration'], warmup=options['warmup'],
+        )
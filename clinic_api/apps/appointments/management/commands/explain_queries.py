@@ -0,0 +1,91 @@
+import re
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import DoctorDaySummary, TimeSlot
+from clinic_api.apps.appointments.models import Appointment
+
+PAGE = 11
+
+
+def hot_queries(doctor_id, patient_id, day):
+    """The filter/order patterns the API issues most, keyed by a short name."""
+    return {
+        'appointments.doctor_agenda': (
+            Appointment.objects
+            .filter(doctor_id=doctor_id, status='pending', timeslot__date=day)
+            .order_by('-created_at', '-id')[:PAGE]
+        ),
+        'appointments.doctor_list': Appointment.objects.filter(doctor_id=doctor_id).order_by('-created_at', '-id')[:PAGE],
+        'appointments.patient_list': Appointment.objects.filter(patient_id=patient_id).order_by('-created_at', '-id')[:PAGE],
+        'appointments.admin_list': Appointment.objects.order_by('-created_at', '-id')[:PAGE],
+        'appointments.patient_status': Appointment.objects.filter(patient_id=patient_id, status='confirmed'),
+        'timeslots.doctor_open': (
+            TimeSlot.objects
+            .filter(doctor_id=doctor_id, is_available=True)
+            .order_by('date', 'start_time', 'id')[:PAGE]
+        ),
+        'timeslots.doctor_day': TimeSlot.objects.filter(doctor_id=doctor_id, date=day).order_by('start_time'),
+        'timeslots.calendar': TimeSlot.objects.order_by('date', 'start_time', 'id')[:PAGE],
+        'timeslots.open_range': (
+            TimeSlot.objects
+            .filter(is_available=True, date__range=(day, day + timedelta(days=7)))
+            .order_by('date', 'start_time')[:PAGE]
+        ),
+        'summaries.doctor_month': (
+            DoctorDaySummary.objects
+            .filter(doctor_id=doctor_id, date__range=(day, day + timedelta(days=31)))
+            .order_by('doctor', 'date')[:PAGE]
+        ),
+        'users.doctor_directory': User.objects.filter(role='doctor', is_active=True).order_by('-created_at')[:PAGE],
+        'users.admin_list': User.objects.order_by('-created_at')[:PAGE],
+    }
+
+
+def plan_uses_index(vendor, plan):
+    """Return True/False for a plan on a known backend, None when unsure."""
+    if vendor == 'sqlite':
+        steps = [line for line in plan.splitlines() if re.search(r'\b(SCAN|SEARCH)\b', line)]
+        return bool(steps) and all(re.search(r'USING (COVERING )?INDEX|PRIMARY KEY', line) for line in steps)
+    if vendor == 'postgresql':
+        return 'Index' in plan and 'Seq Scan' not in plan
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the hot API queries and confirm each one is served by an index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctor', type=int, help='Doctor id to plug into the queries.')
+        parser.add_argument('--patient', type=int, help='Patient id to plug into the queries.')
+        parser.add_argument('--strict', action='store_true',
+                            help='Exit with an error if any query does not use an index.')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plan for every query.')
+
+    def handle(self, *args, **options):
+        doctor_id = options['doctor'] or User.objects.filter(role='doctor').values_list('pk', flat=True).first() or 0
+        patient_id = options['patient'] or User.objects.filter(role='patient').values_list('pk', flat=True).first() or 0
+        vendor = connection.vendor
+
+        failures = []
+        with transaction.atomic():
+            if vendor == 'postgresql':
+                # Small tables favour sequential scans; ask whether an index *can* serve the query.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, queryset in hot_queries(doctor_id, patient_id, date.today()).items():
+                plan = queryset.explain()
+                uses_index = plan_uses_index(vendor, plan)
+                label = {True: self.style.SUCCESS('index'), False: self.style.ERROR('NO INDEX'), None: 'unknown'}
+                self.stdout.write(f'{label[uses_index]:>10}  {name}')
+                if options['verbose_plans'] or uses_index is False:
+                    for line in plan.splitlines():
+                        self.stdout.write(f'            {line}')
+                if uses_index is False:
+                    failures.append(name)
+
+        if failures and options['strict']:
+            raise CommandError(f'Queries not using an index: {", ".join(failures)}')
@@ -0,0 +1,68 @@
+import json
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.appointments.seed import seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with a deterministic synthetic clinic: doctors and patients with '
+        'profiles, months of time slots and a mix of appointment statuses, all bulk inserted. '
+        'Row counts scale with --doctors x --days x --slots-per-day.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=20)
+        parser.add_argument('--patients', type=int, default=500)
+        parser.add_argument('--days', type=int, default=90, help='Days of slots per doctor.')
+        parser.add_argument('--slots-per-day', type=int, default=16)
+        parser.add_argument('--slot-minutes', type=int, default=30)
+        parser.add_argument('--booked-ratio', type=float, default=0.5, help='Share of slots with an appointment.')
+        parser.add_argument('--start', type=date.fromisoformat,
+                            help='First slot day (YYYY-MM-DD); defaults to tomorrow.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; equal options give equal data.')
+        parser.add_argument('--password', default='pass1234', help='Password shared by every seeded user.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows generated and inserted together.')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['booked_ratio'] <= 1:
+            raise CommandError('--booked-ratio must be between 0 and 1.')
+        if User.objects.filter(username__in=['doctor0', 'patient0']).exists():
+            raise CommandError('The database already holds seeded users; seed into an empty database.')
+        started = time.perf_counter()
+
+        batches = 0
+
+        def on_progress(counts):
+            nonlocal batches
+            batches += 1
+            if batches % 20 == 0:
+                rows = sum(counts.values())
+                self.stderr.write(f'{rows} rows ({rows / (time.perf_counter() - started):.0f} rows/s) {counts}')
+
+        try:
+            counts = seed(
+                doctors=options['doctors'],
+                patients=options['patients'],
+                days=options['days'],
+                slots_per_day=options['slots_per_day'],
+                slot_minutes=options['slot_minutes'],
+                booked_ratio=options['booked_ratio'],
+                start=options['start'],
+                password=options['password'],
+                random_seed=options['seed'],
+                batch_size=options['batch_size'],
+                on_progress=on_progress,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        seconds = time.perf_counter() - started
+        self.stdout.write(json.dumps({
+            **counts,
+            'rows': sum(counts.values()),
+            'seconds': round(seconds, 2),
+        }))
@@ -11,6 +11,13 @@ class Appointment(models.Model):
         ('confirmed', 'Confirmed'),
         ('cancelled', 'Cancelled'),
     )
+    # Statuses each status may move to. Taking back a cancellation also
+    # needs its slot to be free still.
+    TRANSITIONS = {
+        'pending': ('confirmed', 'cancelled'),
+        'confirmed': ('cancelled',),
+        'cancelled': ('pending', 'confirmed'),
+    }
     
     doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='doctor_appointments', limit_choices_to={'role': 'doctor'})
     patient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='patient_appointments', limit_choices_to={'role': 'patient'})
@@ -23,25 +30,36 @@ class Appointment(models.Model):
         db_table = 'appointments'
         ordering = ['-created_at']
         unique_together = ('patient', 'timeslot')
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='appointment_created_idx'),
+            models.Index(fields=['doctor', '-created_at', '-id'], name='appt_doctor_created_idx'),
+            models.Index(fields=['patient', '-created_at', '-id'], name='appt_patient_created_idx'),
+            models.Index(fields=['doctor', 'status'], name='appt_doctor_status_idx'),
+            models.Index(fields=['patient', 'status'], name='appt_patient_status_idx'),
+        ]
     
     def __str__(self):
         return f"Appointment: {self.patient.username} with Dr. {self.doctor.username} - {self.status}"
     
     def clean(self):
-        if self.doctor == self.patient:
+        if self.doctor_id == self.patient_id:
             raise ValidationError("Doctor cannot book appointment with themselves")
-        if self.timeslot and not self.pk and not self.timeslot.is_available:
+        if self.timeslot_id and self._state.adding and not self.timeslot.is_available:
             raise ValidationError("This time slot is not available")
-        if self.timeslot and self.timeslot.doctor != self.doctor:
+        if self.timeslot_id and self.timeslot.doctor_id != self.doctor_id:
             raise ValidationError("Time slot does not belong to this doctor")
     
-    def save(self, *args, **kwargs):
-        self.clean()
+    def save(self, *args, validate=True, **kwargs):
+        if validate:
+            self.clean()
         super().save(*args, **kwargs)
-        
-        if self.status == 'cancelled' and self.timeslot:
-            self.timeslot.is_available = True
-            self.timeslot.save()
-        elif self.timeslot:
-            self.timeslot.is_available = False
-            self.timeslot.save()
+        self.sync_timeslot()
+
+    def sync_timeslot(self):
+        """Free the slot on cancellation and hold it otherwise, writing only on change."""
+        if not self.timeslot_id:
+            return
+        is_available = self.status == 'cancelled'
+        if self.timeslot.is_available != is_available:
+            self.timeslot.is_available = is_available
+            self.timeslot.save(update_fields=['is_available', 'updated_at'])
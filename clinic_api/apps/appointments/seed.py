@@ -0,0 +1,186 @@
+import random
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from clinic_api.apps.users.cache import bump_directory_version
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import DoctorProfile, TimeSlot
+from clinic_api.apps.doctors.summaries import rebuild_day_summaries
+from clinic_api.apps.patients.models import PatientProfile
+from clinic_api.apps.appointments.models import Appointment
+
+SPECIALIZATIONS = ['General', 'Cardiology', 'Dermatology', 'Neurology', 'Pediatrics', 'Orthopedics']
+FIRST_NAMES = ['Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn']
+LAST_NAMES = ['Smith', 'Karimov', 'Johnson', 'Lee', 'Brown', 'Garcia', 'Rashidova', 'Miller', 'Davis', 'Wilson']
+GENDERS = ['male', 'female']
+STATUS_WEIGHTS = (('pending', 5), ('confirmed', 4), ('cancelled', 1))
+DAY_START = time(9, 0)
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class TableWriter:
+    """Insert rows into one model's table with ``executemany``.
+
+    ``bulk_create`` prepares every field of every instance; here rows are
+    plain tuples for ``columns`` holding values the database takes as they
+    are (ints, strings, booleans or results of :meth:`prepare`), and every
+    other column gets one value prepared up front: ``shared``, else
+    ``timezone.now()`` for auto dates, else the field default. Primary keys
+    are allocated here so dependent rows can point at them straight away.
+    """
+
+    def __init__(self, model, columns, **shared):
+        self.model = model
+        self.connection = connections[router.db_for_write(model)]
+        opts = model._meta
+        now = timezone.now()
+        rest = [field for field in opts.concrete_fields if not field.primary_key and field.attname not in columns]
+        values = []
+        for field in rest:
+            if field.attname in shared:
+                value = shared[field.attname]
+            elif getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                value = now
+            else:
+                value = field.get_default() if field.has_default() else None
+            values.append(field.get_db_prep_save(value, self.connection))
+        self.shared = tuple(values)
+
+        quote = self.connection.ops.quote_name
+        names = [opts.pk.column] + [opts.get_field(name).column for name in columns] + [field.column for field in rest]
+        self.sql = (
+            f'INSERT INTO {quote(opts.db_table)} ({", ".join(map(quote, names))}) '
+            f'VALUES ({", ".join(["%s"] * len(names))})'
+        )
+        self.next_id = (model._default_manager.using(self.connection.alias).aggregate(top=Max('pk'))['top'] or 0) + 1
+
+    def prepare(self, name, value):
+        return self.model._meta.get_field(name).get_db_prep_save(value, self.connection)
+
+    def insert(self, rows):
+        """Insert ``rows`` and return the range of primary keys they were given."""
+        ids = range(self.next_id, self.next_id + len(rows))
+        with self.connection.cursor() as cursor:
+            cursor.executemany(self.sql, [(pk, *row, *self.shared) for pk, row in zip(ids, rows)])
+        self.next_id = ids.stop
+        return ids
+
+    def reset_sequence(self):
+        # Explicit keys leave PostgreSQL sequences behind; SQLite needs nothing.
+        with self.connection.cursor() as cursor:
+            for sql in self.connection.ops.sequence_reset_sql(no_style(), [self.model]):
+                cursor.execute(sql)
+
+
+@transaction.atomic
+def seed(doctors=20, patients=500, days=7, slots_per_day=16, slot_minutes=30,
+         booked_ratio=0.5, start=None, password='pass1234', random_seed=0,
+         batch_size=5000, on_progress=None):
+    """Insert a deterministic clinic dataset and return row counts.
+
+    Rows are generated and written ``batch_size`` at a time through
+    :class:`TableWriter`; users get contiguous primary keys, so nothing but
+    counters is kept between batches. Every user gets the same password
+    hash, computed once.
+    """
+    if slots_per_day * slot_minutes > (24 - DAY_START.hour) * 60:
+        raise ValueError('A day of slots must end by midnight')
+    # One generator per stream, so the data does not depend on where batches split.
+    names, profiles, bookings, assignments = (
+        random.Random(f'{random_seed}:{stream}') for stream in ('names', 'profiles', 'bookings', 'assignments')
+    )
+    start = start or date.today() + timedelta(days=1)
+    counts = {'doctors': 0, 'patients': 0, 'timeslots': 0, 'appointments': 0}
+
+    def progress(**created):
+        for table, n in created.items():
+            counts[table] += n
+        if on_progress:
+            on_progress(dict(counts))
+
+    users = TableWriter(
+        User, ['username', 'email', 'first_name', 'last_name', 'role'], password=make_password(password),
+    )
+    doctor_profiles = TableWriter(DoctorProfile, ['user_id', 'specialization', 'experience_years', 'gender'])
+    patient_profiles = TableWriter(PatientProfile, ['user_id', 'phone', 'date_of_birth', 'gender'])
+    timeslots = TableWriter(TimeSlot, ['doctor_id', 'date', 'start_time', 'end_time', 'is_available'])
+    appointments = TableWriter(Appointment, ['doctor_id', 'patient_id', 'timeslot_id', 'status'])
+
+    def people(role, chunk):
+        return [
+            (f'{role}{i}', f'{role}{i}@example.com', names.choice(FIRST_NAMES), names.choice(LAST_NAMES), role)
+            for i in chunk
+        ]
+
+    first_doctor = users.next_id
+    for chunk in batched(range(doctors), batch_size):
+        ids = users.insert(people('doctor', chunk))
+        doctor_profiles.insert([
+            (pk, profiles.choice(SPECIALIZATIONS), profiles.randint(0, 30), profiles.choice(GENDERS)) for pk in ids
+        ])
+        progress(doctors=len(ids))
+    doctor_ids = range(first_doctor, users.next_id)
+
+    birthdays = [patient_profiles.prepare('date_of_birth', date(1950, 1, 1) + timedelta(days=n)) for n in range(25001)]
+    first_patient = users.next_id
+    for chunk in batched(range(patients), batch_size):
+        ids = users.insert(people('patient', chunk))
+        patient_profiles.insert([
+            (pk, f'+998{profiles.randint(100000000, 999999999)}', profiles.choice(birthdays), profiles.choice(GENDERS))
+            for pk in ids
+        ])
+        progress(patients=len(ids))
+    patient_ids = range(first_patient, users.next_id)
+
+    statuses = [value for value, _ in STATUS_WEIGHTS]
+    weights = [weight for _, weight in STATUS_WEIGHTS]
+    booked_ratio = booked_ratio if patient_ids else 0
+    step = timedelta(minutes=slot_minutes)
+    # Slots end by midnight, so one day's times serve every date.
+    dates = [timeslots.prepare('date', start + timedelta(days=offset)) for offset in range(days)]
+    times = []
+    for n in range(slots_per_day):
+        begins = datetime.combine(start, DAY_START) + n * step
+        times.append((
+            timeslots.prepare('start_time', begins.time()),
+            timeslots.prepare('end_time', (begins + step).time()),
+        ))
+
+    def planned_slots():
+        for doctor_id in doctor_ids:
+            for day in dates:
+                for start_time, end_time in times:
+                    status = bookings.choices(statuses, weights)[0] if bookings.random() < booked_ratio else None
+                    yield (doctor_id, day, start_time, end_time, status in (None, 'cancelled')), status
+
+    for batch in batched(planned_slots(), batch_size):
+        ids = timeslots.insert([slot for slot, _ in batch])
+        booked = appointments.insert([
+            (slot[0], assignments.choice(patient_ids), pk, status)
+            for pk, (slot, status) in zip(ids, batch)
+            if status is not None
+        ])
+        progress(timeslots=len(ids), appointments=len(booked))
+
+    for writer in (users, doctor_profiles, patient_profiles, timeslots, appointments):
+        writer.reset_sequence()
+    # Raw inserts send no signals, so the summaries are rebuilt in one pass
+    # and the cached doctor directory is invalidated by hand.
+    rebuild_day_summaries()
+    bump_directory_version()
+    return counts
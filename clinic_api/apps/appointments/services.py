@@ -0,0 +1,102 @@
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from clinic_api.apps.appointments.models import Appointment
+from clinic_api.apps.appointments.tasks import record_appointment_event
+from clinic_api.apps.doctors.models import TimeSlot
+from clinic_api.apps.doctors.tasks import schedule_refresh
+
+
+class SlotUnavailable(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This time slot is no longer available.'
+    default_code = 'slot_unavailable'
+
+
+def book_timeslot(patient, doctor, timeslot, status='pending'):
+    """Book ``timeslot`` for ``patient`` without a check-then-act race.
+
+    The slot is claimed with a conditional UPDATE (``is_available`` True ->
+    False) and the appointment is inserted in the same transaction, so of
+    any number of concurrent callers exactly one wins and the rest get
+    ``SlotUnavailable``, as does anyone who asks for a slot already taken.
+    """
+    if not timeslot.is_available:
+        raise SlotUnavailable()
+    appointment = Appointment(doctor=doctor, patient=patient, timeslot=timeslot, status=status)
+    appointment.clean()
+
+    try:
+        with transaction.atomic():
+            claimed = (
+                TimeSlot.objects
+                .filter(pk=timeslot.pk, doctor_id=doctor.pk, is_available=True)
+                .update(is_available=False, updated_at=timezone.now())
+            )
+            if not claimed:
+                raise SlotUnavailable()
+            timeslot.is_available = False
+            appointment.save(validate=False)
+            record_appointment_event.enqueue(event='booked', appointment_ids=[appointment.pk], actor_id=patient.pk)
+    except IntegrityError:
+        raise SlotUnavailable()
+    return appointment
+
+
+def bulk_set_status(user, status, ids=None, date=None, current_status=None):
+    """Move many appointments to ``status`` with set-based UPDATEs.
+
+    The candidates are those of ``ids`` and/or matching ``date`` and
+    ``current_status``, restricted to ``user``'s own appointments unless
+    ``user`` is an admin. They are locked, updated with one UPDATE, and the
+    slots of the changed ones are freed (on cancel) or held again with a
+    second UPDATE, all in one transaction. Only moves allowed by
+    ``Appointment.TRANSITIONS`` are made; a cancellation is only taken back
+    while its slot is still free.
+
+    Returns ``{id: outcome}`` with outcome ``updated``, ``unchanged``,
+    ``rejected`` for a move that is not allowed or, for requested ids that
+    do not exist or belong to someone else, ``not_found``.
+    """
+    scope = Appointment.objects.all() if user.is_admin() else Appointment.objects.filter(doctor=user)
+    if ids is not None:
+        scope = scope.filter(pk__in=ids)
+    if date is not None:
+        scope = scope.filter(timeslot__date=date)
+    if current_status is not None:
+        scope = scope.filter(status=current_status)
+
+    with transaction.atomic():
+        rows = scope.select_for_update(of=('self',)).order_by('pk').values_list(
+            'pk', 'status', 'doctor_id', 'timeslot__date', 'timeslot__is_available',
+        )
+        matched, rejected, changed, days = [], [], [], set()
+        for pk, current, doctor_id, day, slot_free in rows:
+            matched.append(pk)
+            if current == status:
+                continue
+            if status not in Appointment.TRANSITIONS[current] or (current == 'cancelled' and not slot_free):
+                rejected.append(pk)
+                continue
+            changed.append(pk)
+            days.add((doctor_id, day))
+        if changed:
+            now = timezone.now()
+            Appointment.objects.filter(pk__in=changed).update(status=status, updated_at=now)
+            is_available = status == 'cancelled'
+            (
+                TimeSlot.objects
+                .filter(appointment__in=changed)
+                .exclude(is_available=is_available)
+                .update(is_available=is_available, updated_at=now)
+            )
+            schedule_refresh(days)
+            record_appointment_event.enqueue(event=status, appointment_ids=changed, actor_id=user.pk)
+
+    outcomes = {pk: 'not_found' for pk in ids or ()}
+    outcomes.update((pk, 'unchanged') for pk in matched)
+    outcomes.update((pk, 'rejected') for pk in rejected)
+    outcomes.update((pk, 'updated') for pk in changed)
+    return outcomes
@@ -0,0 +1,20 @@
+import logging
+
+from clinic_api.apps.appointments.models import Appointment
+from clinic_api.apps.tasks.queue import task
+
+audit_logger = logging.getLogger('clinic_api.audit')
+
+
+@task(max_attempts=5)
+def record_appointment_event(event, appointment_ids, actor_id=None):
+    """Audit trail of bookings and status changes; notifications and reminders belong here too."""
+    rows = Appointment.objects.filter(pk__in=appointment_ids).values(
+        'id', 'doctor_id', 'patient_id', 'status', 'timeslot__date', 'timeslot__start_time',
+    )
+    for row in rows:
+        audit_logger.info(
+            'appointment.%s id=%s doctor=%s patient=%s status=%s slot=%s %s actor=%s',
+            event, row['id'], row['doctor_id'], row['patient_id'], row['status'],
+            row['timeslot__date'], row['timeslot__start_time'], actor_id,
+        )
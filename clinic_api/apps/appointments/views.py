@@ -1,19 +1,30 @@
-from rest_framework import viewsets, permissions, filters, status
+from functools import partial
+
+from rest_framework import viewsets, permissions, filters, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.core.exceptions import ValidationError as DjangoValidationError
 
 from clinic_api.apps.appointments.models import Appointment
 from clinic_api.apps.appointments.serializers import (
     AppointmentSerializer,
+    AppointmentBulkStatusSerializer,
     AppointmentDetailSerializer,
+    AppointmentRowSerializer,
     AppointmentStatusUpdateSerializer,
 )
+from clinic_api.apps.appointments.services import book_timeslot, bulk_set_status
 from clinic_api.apps.users.permissions import IsOwnerOrAdmin, IsDoctor, IsPatient, IsAdmin
+from clinic_api.core.async_views import AsyncViewSetMixin
+from clinic_api.core.export import StreamingExportMixin
+from clinic_api.core.mixins import ConditionalGetMixin
+from clinic_api.core.pagination import KeysetPagination
+from clinic_api.core.throttling import BookingThrottle
 
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+class AppointmentViewSet(StreamingExportMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     
 
     queryset = (
@@ -24,6 +35,12 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter, filters.OrderingFilter, filters.OrderingFilter]
     search_fields = ['doctor__first_name', 'doctor__last_name', 'patient__first_name', 'patient__last_name']
     ordering_fields = ['created_at', 'timeslot__date']
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
+    conditional_related = ('doctor', 'patient', 'timeslot')
+    # Read-only list actions served from .values() rows.
+    row_actions = ('list', 'me', 'export')
+    export_fields = AppointmentSerializer.Meta.fields
     
     def filter_queryset(self, queryset):
         qs = super().filter_queryset(queryset)
@@ -46,15 +63,26 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             perms.append(IsOwnerOrAdmin())
         elif self.action in ['create']:
             perms.append(IsPatient())
+        elif self.action == 'bulk_status':
+            perms.append((IsDoctor | IsAdmin)())
         else:
             perms.append(IsOwnerOrAdmin())
         return perms
 
+    def get_throttles(self):
+        if self.action == 'create':
+            return [BookingThrottle()]
+        return super().get_throttles()
+
     def get_serializer_class(self):
         if self.action in ['update', 'partial_update']:
             return AppointmentStatusUpdateSerializer
         if self.action in ['retrieve']:
             return AppointmentDetailSerializer
+        if self.action == 'bulk_status':
+            return AppointmentBulkStatusSerializer
+        if self.action in self.row_actions and not getattr(self, 'swagger_fake_view', False):
+            return AppointmentRowSerializer
         return AppointmentSerializer
 
     def get_queryset(self):
@@ -68,9 +96,24 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             return qs.filter(patient=user)
         return qs.none()
 
+    def as_rows(self, queryset):
+        # Applied only when fetching the page, so the ETag query stays join-free.
+        if self.action in self.row_actions:
+            return queryset.values(*AppointmentRowSerializer.values)
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        return super().paginate_queryset(self.as_rows(queryset))
+
+    def export_rows(self, queryset):
+        return self.as_rows(queryset)
+
     def perform_create(self, serializer):
-        
-        serializer.save(patient=self.request.user)
+        data = serializer.validated_data
+        try:
+            serializer.instance = book_timeslot(self.request.user, data['doctor'], data['timeslot'])
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.messages)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -86,9 +129,36 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='me')
     def me(self, request):
         qs = self.get_queryset()
-        page = self.paginate_queryset(qs)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(qs, many=True)
-        return Response(serializer.data)
+
+        def render():
+            page = self.paginate_queryset(qs)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            serializer = self.get_serializer(self.as_rows(qs), many=True)
+            return Response(serializer.data)
+
+        return self.conditional_response(qs, render)
+
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        outcomes = bulk_set_status(request.user, **serializer.validated_data)
+        return Response({
+            'status': serializer.validated_data['status'],
+            'updated': sum(outcome == 'updated' for outcome in outcomes.values()),
+            'results': [{'id': pk, 'outcome': outcome} for pk, outcome in outcomes.items()],
+        })
+
+
+class AsyncAppointmentViewSet(AsyncViewSetMixin, AppointmentViewSet):
+    """``AppointmentViewSet`` with an async ``me``, routed in the ASGI deployment."""
+
+    async def apaginate_queryset(self, queryset):
+        return await super().apaginate_queryset(self.as_rows(queryset))
+
+    @action(detail=False, methods=['get'], url_path='me')
+    async def me(self, request):
+        qs = self.get_queryset()
+        return await self.aconditional_response(qs, partial(self.apaginated_response, qs))
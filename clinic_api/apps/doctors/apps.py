@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class DoctorsConfig(AppConfig):
+    name = 'clinic_api.apps.doctors'
+    label = 'doctors'
+
+    def ready(self):
+        from clinic_api.apps.doctors import signals  # noqa: F401
+        from clinic_api.apps.doctors.overlaps import install_overlap_constraint
+
+        post_migrate.connect(install_overlap_constraint, sender=self)
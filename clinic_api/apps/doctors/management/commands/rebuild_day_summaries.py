@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from clinic_api.apps.doctors.summaries import rebuild_day_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recompute every per-doctor daily schedule summary from the time slots and appointments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Summary rows inserted per statement.')
+
+    def handle(self, *args, **options):
+        begin = time.perf_counter()
+        created = rebuild_day_summaries(batch_size=options['batch_size'])
+        self.stdout.write(f'Rebuilt {created} day summaries in {time.perf_counter() - begin:.2f}s')
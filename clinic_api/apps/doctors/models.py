@@ -36,9 +36,66 @@ class TimeSlot(models.Model):
         db_table = 'time_slots'
         ordering = ['date', 'start_time']
         unique_together = ('doctor', 'date', 'start_time', 'end_time')
+        indexes = [
+            models.Index(fields=['date', 'start_time', 'id'], name='timeslot_calendar_idx'),
+            models.Index(fields=['doctor', 'date', 'start_time', 'id'], name='timeslot_doctor_calendar_idx'),
+            models.Index(
+                fields=['doctor', 'date', 'start_time'],
+                condition=models.Q(is_available=True),
+                name='timeslot_doctor_open_idx',
+            ),
+            models.Index(
+                fields=['date', 'start_time'],
+                condition=models.Q(is_available=True),
+                name='timeslot_open_idx',
+            ),
+        ]
+        constraints = [
+            # end_time before start_time is an overnight slot; equal would be empty.
+            models.CheckConstraint(check=~models.Q(start_time=models.F('end_time')), name='timeslot_not_empty'),
+        ]
     
     def __str__(self):
         return f"{self.doctor.username} - {self.date} {self.start_time}-{self.end_time}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so moving a slot also refreshes the summary of the day it left.
+        instance._loaded_day = (instance.__dict__.get('doctor_id'), instance.__dict__.get('date'))
+        return instance
     
     def is_overlap(self, other_start_time, other_end_time):
-        return not (self.end_time <= other_start_time or self.start_time >= other_end_time)
+        from clinic_api.apps.doctors.overlaps import slot_bounds
+
+        start, end = slot_bounds(self.date, self.start_time, self.end_time)
+        other_start, other_end = slot_bounds(self.date, other_start_time, other_end_time)
+        return start < other_end and end > other_start
+
+
+class DoctorDaySummary(models.Model):
+    """Slot and appointment counts per doctor and day.
+
+    Derived from ``TimeSlot`` and ``Appointment``; the rows are refreshed
+    after every write that touches a day (see ``doctors.summaries``) and can
+    be rebuilt with ``manage.py rebuild_day_summaries``.
+    """
+
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='day_summaries')
+    date = models.DateField()
+    total = models.PositiveIntegerField(default=0)
+    available = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+    confirmed = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'doctor_day_summaries'
+        ordering = ['doctor', 'date']
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'date'], name='day_summary_doctor_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor_id} - {self.date}: {self.available}/{self.total} free"
@@ -0,0 +1,145 @@
+"""Overlap checks for time slots.
+
+A slot covers ``[date + start_time, date + end_time)``; when ``end_time`` is
+not after ``start_time`` the slot runs past midnight and ends on the next
+day. Three layers enforce that a doctor's slots never overlap:
+
+* ``has_overlap`` asks the database with a single ``EXISTS`` query;
+* on PostgreSQL, ``install_overlap_constraint`` adds an exclusion
+  constraint so concurrent inserts cannot slip past the check;
+* ``IntervalIndex`` validates large batches of candidates in memory.
+"""
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, Q
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from clinic_api.apps.doctors.models import TimeSlot
+
+CONSTRAINT_NAME = 'timeslot_no_overlap'
+ONE_DAY = timedelta(days=1)
+
+
+class SlotOverlap(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This time slot overlaps with an existing time slot.'
+    default_code = 'slot_overlap'
+
+
+def slot_bounds(day, start, end):
+    """Absolute ``(start, end)`` datetimes of a slot, wrapping past midnight."""
+    return datetime.combine(day, start), datetime.combine(day + ONE_DAY if end <= start else day, end)
+
+
+def day_pieces(day, start, end):
+    """Split a slot into ``(day, start, end)`` pieces within single days; ``end=None`` is midnight."""
+    if end > start:
+        return [(day, start, end)]
+    pieces = [(day, start, None)]
+    if end != time.min:
+        pieces.append((day + ONE_DAY, time.min, end))
+    return pieces
+
+
+def overlap_filter(day, start, end):
+    """``Q`` matching slots that share any instant with the given slot.
+
+    For each single-day piece ``[start, end)`` of the slot this is the usual
+    ``start_time < end AND end_time > start``, applied to slots on that day
+    and to the part of the previous day's overnight slots spilling into it.
+    """
+    wraps = Q(end_time__lte=F('start_time'))
+    condition = Q()
+    for piece_day, piece_start, piece_end in day_pieces(day, start, end):
+        before_end = Q(start_time__lt=piece_end) if piece_end is not None else Q()
+        condition |= Q(date=piece_day) & ((~wraps & Q(end_time__gt=piece_start)) | wraps) & before_end
+        condition |= Q(date=piece_day - ONE_DAY, end_time__gt=piece_start) & wraps
+    return condition
+
+
+def overlapping_slots(doctor, day, start, end, exclude=None):
+    slots = TimeSlot.objects.filter(overlap_filter(day, start, end), doctor=doctor)
+    if exclude is not None:
+        slots = slots.exclude(pk=exclude)
+    return slots
+
+
+def has_overlap(doctor, day, start, end, exclude=None):
+    """Whether ``doctor`` has a slot overlapping the given one, in one ``EXISTS`` query."""
+    return overlapping_slots(doctor, day, start, end, exclude).exists()
+
+
+@contextmanager
+def overlap_errors_as_conflicts():
+    """Turn a violation of the overlap constraint into ``SlotOverlap``."""
+    if transaction.get_connection().vendor != 'postgresql':
+        # Only PostgreSQL has the constraint; skip the savepoint elsewhere.
+        yield
+        return
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if CONSTRAINT_NAME in str(exc):
+            raise SlotOverlap()
+        raise
+
+
+def install_overlap_constraint(using='default', **kwargs):
+    """Add the exclusion constraint on PostgreSQL; run after ``migrate`` creates the table."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_constraint WHERE conname = %s', [CONSTRAINT_NAME])
+        if cursor.fetchone():
+            return
+        # btree_gist provides the "=" operator class for doctor_id inside a GiST index.
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        cursor.execute(
+            f'ALTER TABLE {TimeSlot._meta.db_table} ADD CONSTRAINT {CONSTRAINT_NAME} EXCLUDE USING gist ('
+            'doctor_id WITH =, '
+            "tsrange(date + start_time, date + end_time + CASE WHEN end_time > start_time "
+            "THEN interval '0' ELSE interval '1 day' END) WITH &&)"
+        )
+
+
+class IntervalIndex:
+    """Sorted ``[start, end)`` intervals answering overlap queries by bisection.
+
+    ``max_ends[i]`` holds the latest end among the first ``i + 1`` intervals,
+    so an overlap lookup is a single bisect even if stored intervals overlap.
+    Building from an iterable sorts once; adding in start order (as the
+    bulk paths do) is O(log n), so validating n candidates is O(n log n).
+    Intervals are slots given as ``(day, start, end)``.
+    """
+
+    def __init__(self, slots=()):
+        bounds = sorted(slot_bounds(*slot) for slot in slots)
+        self._starts = [start for start, _ in bounds]
+        self._ends = [end for _, end in bounds]
+        self._max_ends = []
+        for end in self._ends:
+            self._max_ends.append(max(end, self._max_ends[-1]) if self._max_ends else end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def overlaps(self, day, start, end):
+        start, end = slot_bounds(day, start, end)
+        pos = bisect_left(self._starts, end)
+        return pos > 0 and self._max_ends[pos - 1] > start
+
+    def add(self, day, start, end):
+        start, end = slot_bounds(day, start, end)
+        starts, ends, max_ends = self._starts, self._ends, self._max_ends
+        pos = bisect_right(starts, start)
+        starts.insert(pos, start)
+        ends.insert(pos, end)
+        max_ends.insert(pos, end)
+        for i in range(pos, len(max_ends)):
+            max_ends[i] = max(ends[i], max_ends[i - 1]) if i else ends[i]
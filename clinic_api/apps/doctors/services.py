@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from clinic_api.apps.doctors.models import TimeSlot
+from clinic_api.apps.doctors.overlaps import ONE_DAY, IntervalIndex, overlap_errors_as_conflicts
+from clinic_api.apps.doctors.tasks import schedule_refresh
+
+
+def generate_slot_times(start_date, weeks, weekdays, day_start, day_end, slot_minutes):
+    step = timedelta(minutes=slot_minutes)
+    for offset in range(weeks * 7):
+        day = start_date + timedelta(days=offset)
+        if day.weekday() not in weekdays:
+            continue
+        current = datetime.combine(day, day_start)
+        closing = datetime.combine(day, day_end)
+        while current + step <= closing:
+            yield day, current.time(), (current + step).time()
+            current += step
+
+
+def bulk_create_timeslots(doctor, slot_times):
+    """Create every non-overlapping slot in one transaction.
+
+    Existing slots for the covered date range (and overnight slots from the
+    day before it) are loaded once into an ``IntervalIndex``; candidates are
+    checked against it and inserted with ``bulk_create``. Returns
+    ``(created, conflicts)``.
+    """
+    slot_times = list(slot_times)
+    if not slot_times:
+        return [], []
+
+    dates = [day for day, _, _ in slot_times]
+    created, conflicts = [], []
+    with transaction.atomic():
+        existing = (
+            TimeSlot.objects
+            .filter(doctor=doctor, date__range=(min(dates) - ONE_DAY, max(dates)))
+            .values_list('date', 'start_time', 'end_time')
+        )
+        index = IntervalIndex(existing)
+        for day, start, end in slot_times:
+            if index.overlaps(day, start, end):
+                conflicts.append({
+                    'date': day,
+                    'start_time': start,
+                    'end_time': end,
+                    'detail': 'This time slot overlaps with an existing time slot',
+                })
+                continue
+            index.add(day, start, end)
+            created.append(TimeSlot(doctor=doctor, date=day, start_time=start, end_time=end, is_available=True))
+        with overlap_errors_as_conflicts():
+            TimeSlot.objects.bulk_create(created)
+        schedule_refresh((doctor.pk, slot.date) for slot in created)
+    return created, conflicts
+
+
+DEFAULT_PER_DOCTOR = 3
+
+
+def find_available_slots(date_from, date_to, time_from=None, time_to=None, specialization=None,
+                         gender=None, per_doctor=None, first=None):
+    """Earliest free slots grouped by doctor, fetched in a single query.
+
+    A ``ROW_NUMBER()`` window keeps at most ``per_doctor`` slots for each
+    doctor (3 when neither limit is given). ``first`` alone is a plain
+    ``ORDER BY date, start_time, id LIMIT first``, so the scan stops after
+    that many slots; a window would number every open slot in the range
+    before the limit applied.
+    """
+    now = timezone.localtime()
+    slots = TimeSlot.objects.filter(
+        is_available=True,
+        date__range=(date_from, date_to),
+        doctor__is_active=True,
+    ).exclude(date=now.date(), start_time__lt=now.time())
+    if time_from:
+        slots = slots.filter(start_time__gte=time_from)
+    if time_to:
+        slots = slots.filter(end_time__lte=time_to)
+    if specialization:
+        slots = slots.filter(doctor__doctor_profile__specialization__iexact=specialization)
+    if gender:
+        slots = slots.filter(doctor__doctor_profile__gender=gender)
+
+    if per_doctor is None and not first:
+        per_doctor = DEFAULT_PER_DOCTOR
+    if per_doctor is not None:
+        ordering = [F('date').asc(), F('start_time').asc(), F('id').asc()]
+        slots = (
+            slots
+            .annotate(rank=Window(RowNumber(), partition_by=[F('doctor_id')], order_by=ordering))
+            .filter(rank__lte=per_doctor)
+        )
+    slots = slots.select_related('doctor', 'doctor__doctor_profile').order_by('date', 'start_time', 'id')
+    if first:
+        slots = slots[:first]
+
+    grouped = {}
+    for slot in slots:
+        if slot.doctor_id not in grouped:
+            try:
+                profile = slot.doctor.doctor_profile
+            except ObjectDoesNotExist:
+                profile = None
+            grouped[slot.doctor_id] = {'doctor': slot.doctor, 'profile': profile, 'slots': []}
+        grouped[slot.doctor_id]['slots'].append(slot)
+    return list(grouped.values())
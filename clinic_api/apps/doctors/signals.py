@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from clinic_api.apps.doctors.models import TimeSlot
+from clinic_api.apps.doctors.tasks import schedule_refresh
+from clinic_api.apps.appointments.models import Appointment
+
+
+@receiver([post_save, post_delete], sender=TimeSlot)
+def timeslot_changed(sender, instance, **kwargs):
+    schedule_refresh([(instance.doctor_id, instance.date), getattr(instance, '_loaded_day', (None, None))])
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+def appointment_changed(sender, instance, **kwargs):
+    if not instance.timeslot_id:
+        return
+    if Appointment.timeslot.is_cached(instance):
+        day = (instance.timeslot.doctor_id, instance.timeslot.date)
+    else:
+        day = TimeSlot.objects.filter(pk=instance.timeslot_id).values_list('doctor_id', 'date').first()
+    if day:
+        schedule_refresh([day])
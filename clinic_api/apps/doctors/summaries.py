@@ -0,0 +1,87 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import DoctorDaySummary, TimeSlot
+
+COUNTERS = ['total', 'available', 'pending', 'confirmed', 'cancelled']
+
+
+def day_counts():
+    """Aggregates over ``TimeSlot`` rows giving one summary's counters."""
+    return {
+        'total': Count('pk'),
+        'available': Count('pk', filter=Q(is_available=True)),
+        **{
+            status: Count('appointment', filter=Q(appointment__status=status))
+            for status in ('pending', 'confirmed', 'cancelled')
+        },
+    }
+
+
+def days_filter(days, doctor='doctor_id', date='date'):
+    by_doctor = defaultdict(set)
+    for doctor_id, day in days:
+        by_doctor[doctor_id].add(day)
+    return reduce(or_, (Q(**{doctor: doctor_id, f'{date}__in': sorted(dates)}) for doctor_id, dates in by_doctor.items()))
+
+
+def refresh_day_summaries(days):
+    """Recompute the summaries of ``days``, an iterable of ``(doctor_id, date)``.
+
+    Write paths call it through ``doctors.tasks.schedule_refresh``, which
+    runs it as a background job once their transaction has committed.
+
+    One aggregate over the days' slots, one upsert and, for days with no
+    slots left, one delete. Rows are recomputed rather than adjusted, so a
+    lost refresh is corrected by the next write to the same day.
+
+    Refreshes run concurrently on the task pool, so each one first locks
+    its doctors' user rows (in id order, so two refreshes cannot deadlock)
+    and aggregates inside the same transaction: a refresh that read older
+    counts can no longer commit after one that read newer counts.
+    """
+    days = {(doctor_id, day) for doctor_id, day in days if doctor_id is not None and day is not None}
+    if not days:
+        return
+    with transaction.atomic():
+        doctor_ids = sorted({doctor_id for doctor_id, _ in days})
+        list(User.objects.select_for_update().filter(pk__in=doctor_ids).order_by('pk').values_list('pk', flat=True))
+        rows = (
+            TimeSlot.objects
+            .filter(days_filter(days))
+            .order_by()
+            .values('doctor_id', 'date')
+            .annotate(**day_counts())
+        )
+        summaries = [DoctorDaySummary(**row) for row in rows]
+        if summaries:
+            DoctorDaySummary.objects.bulk_create(
+                summaries,
+                update_conflicts=True,
+                unique_fields=['doctor', 'date'],
+                update_fields=COUNTERS + ['updated_at'],
+            )
+        empty = days - {(summary.doctor_id, summary.date) for summary in summaries}
+        if empty:
+            DoctorDaySummary.objects.filter(days_filter(empty)).delete()
+
+
+def rebuild_day_summaries(batch_size=2000):
+    """Replace every summary with counts aggregated from scratch; return the row count."""
+    rows = TimeSlot.objects.order_by('doctor_id', 'date').values('doctor_id', 'date').annotate(**day_counts())
+    created = 0
+    with transaction.atomic():
+        DoctorDaySummary.objects.all().delete()
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(DoctorDaySummary(**row))
+            if len(batch) >= batch_size:
+                created += len(DoctorDaySummary.objects.bulk_create(batch))
+                batch = []
+        created += len(DoctorDaySummary.objects.bulk_create(batch))
+    return created
@@ -0,0 +1,16 @@
+from datetime import date
+
+from clinic_api.apps.doctors.summaries import refresh_day_summaries
+from clinic_api.apps.tasks.queue import task
+
+
+@task(max_attempts=5)
+def refresh_summaries(days):
+    refresh_day_summaries((doctor_id, date.fromisoformat(day)) for doctor_id, day in days)
+
+
+def schedule_refresh(days):
+    """Refresh the summaries of ``(doctor_id, date)`` pairs in the background after commit."""
+    days = {(doctor_id, day) for doctor_id, day in days if doctor_id is not None and day is not None}
+    if days:
+        refresh_summaries.enqueue(days=[[doctor_id, day.isoformat()] for doctor_id, day in sorted(days)])
@@ -1,13 +1,31 @@
+from functools import partial
+
 from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.views import APIView
 from rest_framework.response import Response
 
-from clinic_api.apps.doctors.models import TimeSlot
-from clinic_api.apps.users.serializers import TimeSlotSerializer, TimeSlotDetailSerializer
+from clinic_api.apps.doctors.models import DoctorDaySummary, TimeSlot
+from clinic_api.apps.doctors.services import bulk_create_timeslots, find_available_slots, generate_slot_times
+from clinic_api.apps.users.serializers import (
+    TimeSlotSerializer,
+    TimeSlotDetailSerializer,
+    TimeSlotBulkCreateSerializer,
+    TimeSlotConflictSerializer,
+    AvailabilityQuerySerializer,
+    AvailableDoctorSerializer,
+    DaySummaryQuerySerializer,
+    DoctorDaySummarySerializer,
+)
 from clinic_api.apps.users.permissions import IsDoctor, IsAdmin, IsOwner
+from clinic_api.core.async_views import AsyncViewSetMixin
+from clinic_api.core.export import StreamingExportMixin
+from clinic_api.core.mixins import ConditionalGetMixin
+from clinic_api.core.pagination import KeysetPagination
+from clinic_api.core.throttling import AvailabilityThrottle
 
 
-class TimeSlotViewSet(viewsets.ModelViewSet):
+class TimeSlotViewSet(StreamingExportMixin, ConditionalGetMixin, viewsets.ModelViewSet):
 
     
 
@@ -15,7 +33,10 @@ class TimeSlotViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['date', 'doctor__first_name', 'doctor__last_name']
     ordering_fields = ['date', 'start_time']
-    
+    pagination_class = KeysetPagination
+    keyset_ordering = ('date', 'start_time', 'id')
+    conditional_related = ('doctor',)
+
     def filter_queryset(self, queryset):
         qs = super().filter_queryset(queryset)
         params = self.request.query_params
@@ -31,13 +52,15 @@ class TimeSlotViewSet(viewsets.ModelViewSet):
         return qs
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'export']:
             return [permissions.IsAuthenticated()]
         return [permissions.IsAuthenticated(), IsDoctor()]
 
     def get_serializer_class(self):
         if self.action in ['retrieve', 'update', 'partial_update']:
             return TimeSlotDetailSerializer
+        if self.action == 'bulk':
+            return TimeSlotBulkCreateSerializer
         return TimeSlotSerializer
 
     def get_queryset(self):
@@ -52,10 +75,86 @@ class TimeSlotViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(doctor=self.request.user, is_available=True)
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        slot_times = generate_slot_times(
+            params['start_date'],
+            params['weeks'],
+            set(params['weekdays']),
+            params['day_start'],
+            params['day_end'],
+            params['slot_minutes'],
+        )
+        created, conflicts = bulk_create_timeslots(request.user, slot_times)
+        return Response(
+            {
+                'created': TimeSlotSerializer(created, many=True).data,
+                'conflicts': TimeSlotConflictSerializer(conflicts, many=True).data,
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
     @action(detail=False, methods=['get'], url_path='mine')
     def mine(self, request):
         qs = self.get_queryset()
-        page = self.paginate_queryset(qs)
-        if page is not None:
-            return self.get_paginated_response(TimeSlotSerializer(page, many=True).data)
-        return Response(TimeSlotSerializer(qs, many=True).data)
+
+        def render():
+            page = self.paginate_queryset(qs)
+            if page is not None:
+                return self.get_paginated_response(TimeSlotSerializer(page, many=True).data)
+            return Response(TimeSlotSerializer(qs, many=True).data)
+
+        return self.conditional_response(qs, render)
+
+
+class AsyncTimeSlotViewSet(AsyncViewSetMixin, TimeSlotViewSet):
+    """``TimeSlotViewSet`` with an async ``list``, routed in the ASGI deployment."""
+
+    async def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return await self.aconditional_response(queryset, partial(self.apaginated_response, queryset))
+
+
+class DoctorDaySummaryViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """Per-day slot and booking counts; a month of one doctor is one index range scan."""
+
+    queryset = DoctorDaySummary.objects.all()
+    serializer_class = DoctorDaySummarySerializer
+    permission_classes = [permissions.IsAuthenticated, IsDoctor | IsAdmin]
+    filter_backends = []
+    pagination_class = KeysetPagination
+    keyset_ordering = ('doctor', 'date')
+
+    def get_queryset(self):
+        user = self.request.user
+        qs = super().get_queryset()
+        if user.is_admin():
+            return qs
+        return qs.filter(doctor=user)
+
+    def filter_queryset(self, queryset):
+        params = DaySummaryQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        if 'doctor' in data:
+            queryset = queryset.filter(doctor_id=data['doctor'])
+        if 'date_from' in data:
+            queryset = queryset.filter(date__gte=data['date_from'])
+        if 'date_to' in data:
+            queryset = queryset.filter(date__lte=data['date_to'])
+        return queryset
+
+
+class AvailabilityView(APIView):
+
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [AvailabilityThrottle]
+
+    def get(self, request):
+        params = AvailabilityQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        doctors = find_available_slots(**params.validated_data)
+        return Response({'results': AvailableDoctorSerializer(doctors, many=True).data})
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.core.signals import request_started
+from django.utils.module_loading import autodiscover_modules
+
+
+class TasksConfig(AppConfig):
+    name = 'clinic_api.apps.tasks'
+    label = 'tasks'
+
+    def ready(self):
+        # Registers the @task functions of every app so workers can resolve job names.
+        autodiscover_modules('tasks')
+        from clinic_api.apps.tasks.queue import start_pool
+        request_started.connect(start_pool, dispatch_uid='clinic_api.tasks.start_pool')
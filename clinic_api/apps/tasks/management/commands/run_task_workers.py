@@ -0,0 +1,71 @@
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from clinic_api.apps.tasks.queue import due_job_ids, purge_finished, run_job, worker_name
+
+PURGE_EVERY = 3600
+
+
+def run_pooled(job_id):
+    # Pool threads get no request signals, so manage their connections the same way.
+    close_old_connections()
+    try:
+        return run_job(job_id, worker_name())
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        'Run background jobs from the job table: poll for due jobs (including retries and jobs '
+        'abandoned by a crashed runner) and execute them on a thread pool until stopped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=getattr(settings, 'TASKS_THREADS', 4),
+                            help='Jobs run concurrently by this process; 1 runs them in the main thread.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when idle.')
+        parser.add_argument('--batch', type=int, default=100, help='Due jobs fetched per poll.')
+        parser.add_argument('--once', action='store_true', help='Exit as soon as no job is due.')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: stop.set())
+
+        pool = None
+        if options['threads'] > 1:
+            pool = ThreadPoolExecutor(max_workers=options['threads'], thread_name_prefix='clinic-worker')
+        totals, last_purge = {}, None
+        try:
+            while not stop.is_set():
+                if last_purge is None or time.monotonic() - last_purge > PURGE_EVERY:
+                    retention = timedelta(days=getattr(settings, 'TASKS_RETENTION_DAYS', 7))
+                    purge_finished(timezone.now() - retention)
+                    last_purge = time.monotonic()
+                job_ids = due_job_ids(options['batch'])
+                if not job_ids:
+                    if options['once']:
+                        break
+                    stop.wait(options['poll_interval'])
+                    continue
+                if pool is None:
+                    statuses = [run_job(job_id, worker_name()) for job_id in job_ids]
+                else:
+                    statuses = pool.map(run_pooled, job_ids)
+                for status in statuses:
+                    if status is not None:
+                        totals[status] = totals.get(status, 0) + 1
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.stdout.write(', '.join(f'{status}: {count}' for status, count in sorted(totals.items())) or 'No jobs run')
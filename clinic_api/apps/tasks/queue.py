@@ -0,0 +1,303 @@
+"""Background jobs for work that should not hold up the request.
+
+Functions decorated with ``@task`` are handed to the queue with
+``func.enqueue(**kwargs)``, which inserts a ``Job`` row in the caller's
+transaction: a rolled-back request leaves no job behind, and a committed
+one leaves a durable record that survives a crash of the process that was
+going to run it. Nothing runs before the commit; ``transaction.on_commit``
+then only wakes the runner ``TASKS_RUNNER`` picks:
+
+* ``thread``: a thread pool inside the web process, right after commit,
+  plus a poller thread feeding it whatever else is due every
+  ``TASKS_POLL_INTERVAL`` seconds (0 leaves that to other processes);
+* ``worker``: nobody in-process; ``manage.py run_task_workers`` polls;
+* ``local``: inline in the committing thread, for tests.
+
+Failed jobs are retried with exponential backoff up to ``max_attempts``.
+One heartbeat thread per process renews the locks of all the jobs running
+in it every third of ``TASKS_LOCK_TIMEOUT``; a job whose runner died
+mid-way stops being renewed and is reclaimed by the pollers or the
+standalone workers once the lock is that old.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from clinic_api.apps.tasks.models import Job
+
+logger = logging.getLogger('clinic_api.tasks')
+
+registry = {}
+
+
+class Task:
+
+    def __init__(self, func, name, max_attempts):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def enqueue(self, **kwargs):
+        """Queue a run with ``kwargs`` (JSON-serialisable), to start once the current transaction commits."""
+        job = Job.objects.create(name=self.name, payload=kwargs, max_attempts=self.max_attempts, run_at=timezone.now())
+        transaction.on_commit(partial(wake, job.pk))
+        return job
+
+
+def task(func=None, *, name=None, max_attempts=3):
+    """Register ``func`` as a background task; use ``func.enqueue(**kwargs)`` to queue it."""
+    if func is None:
+        return partial(task, name=name, max_attempts=max_attempts)
+    registered = Task(func, name or f'{func.__module__}.{func.__qualname__}', max_attempts)
+    registry[registered.name] = registered
+    return registered
+
+
+def runner():
+    return getattr(settings, 'TASKS_RUNNER', 'thread')
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def wake(job_id):
+    """Start committed job ``job_id`` on this process's runner; ``worker`` leaves it to the pollers."""
+    mode = runner()
+    if mode == 'local':
+        run_job(job_id)
+    elif mode == 'thread':
+        dispatch(job_id)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def executor():
+    """The process's job pool; creating it also starts the poller that feeds it, unless polling is off."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'TASKS_THREADS', 4), thread_name_prefix='clinic-tasks',
+            )
+            if poll_interval() > 0:
+                threading.Thread(target=poll, name='clinic-tasks-poller', daemon=True).start()
+        return _executor
+
+
+def start_pool(**kwargs):
+    """``request_started`` receiver: make sure a ``thread`` runner is polling before the first job is queued."""
+    if runner() == 'thread':
+        executor()
+
+
+def dispatch(job_id):
+    """Hand job ``job_id`` to the pool unless it is already waiting there."""
+    with _pending_lock:
+        if job_id in _pending:
+            return
+        _pending.add(job_id)
+    executor().submit(run_in_thread, job_id)
+
+
+def run_in_thread(job_id):
+    # Pool threads get no request signals, so manage their connections like a request would.
+    close_old_connections()
+    try:
+        run_job(job_id)
+    except Exception:
+        logger.exception('Background job %s could not be run', job_id)
+    finally:
+        with _pending_lock:
+            _pending.discard(job_id)
+        close_old_connections()
+
+
+def poll_once(limit=100):
+    """Dispatch up to ``limit`` due jobs: retries, reclaimed ones and ones queued by other processes."""
+    job_ids = due_job_ids(limit)
+    for job_id in job_ids:
+        dispatch(job_id)
+    return job_ids
+
+
+def poll_interval():
+    return getattr(settings, 'TASKS_POLL_INTERVAL', 10.0)
+
+
+def poll():
+    while True:
+        close_old_connections()
+        try:
+            poll_once()
+        except Exception:
+            logger.exception('Polling for due jobs failed')
+        finally:
+            close_old_connections()
+        time.sleep(poll_interval())
+
+
+def due(now):
+    """Jobs ready to run: queued and due, or running under a lock that has expired."""
+    stale = now - timedelta(seconds=getattr(settings, 'TASKS_LOCK_TIMEOUT', 300))
+    return Q(status=Job.QUEUED, run_at__lte=now) | Q(status=Job.RUNNING, locked_at__lt=stale)
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=getattr(settings, 'TASKS_RETRY_DELAY', 10) * 2 ** (attempts - 1))
+
+
+def renew_locks(held):
+    """Move the locks of running jobs ``held`` (``{job_id: worker}``) forward; return how many are still held.
+
+    Runs one UPDATE per worker; a job another worker has taken over no longer
+    matches and is left alone.
+    """
+    by_worker = {}
+    for job_id, worker in held.items():
+        by_worker.setdefault(worker, []).append(job_id)
+    now = timezone.now()
+    return sum(
+        Job.objects.filter(pk__in=job_ids, status=Job.RUNNING, locked_by=worker).update(locked_at=now, updated_at=now)
+        for worker, job_ids in by_worker.items()
+    )
+
+
+_held = {}
+_held_lock = threading.Lock()
+_heartbeat = None
+
+
+def beat_once():
+    """Renew the locks of every job currently running in this process."""
+    with _held_lock:
+        held = dict(_held)
+    return renew_locks(held) if held else 0
+
+
+def beat():
+    while True:
+        time.sleep(getattr(settings, 'TASKS_LOCK_TIMEOUT', 300) / 3)
+        close_old_connections()
+        try:
+            beat_once()
+        except Exception:
+            logger.exception('Could not renew the locks of running jobs')
+        finally:
+            close_old_connections()
+
+
+@contextmanager
+def heartbeat(job_id, worker):
+    """Keep ``worker``'s lock on job ``job_id`` renewed while the block runs.
+
+    All jobs running in the process share one heartbeat thread, started with
+    the first of them.
+    """
+    global _heartbeat
+    with _held_lock:
+        _held[job_id] = worker
+        if _heartbeat is None:
+            _heartbeat = threading.Thread(target=beat, name='clinic-tasks-heartbeat', daemon=True)
+            _heartbeat.start()
+    try:
+        yield
+    finally:
+        with _held_lock:
+            _held.pop(job_id, None)
+
+
+class LockLost(Exception):
+    """The job was reclaimed by another worker while this one ran it."""
+
+
+def finish(job_id, worker, **fields):
+    """Record the end of ``worker``'s attempt at job ``job_id``; False if the job is no longer ``worker``'s."""
+    return bool(Job.objects.filter(pk=job_id, status=Job.RUNNING, locked_by=worker).update(
+        locked_by='', locked_at=None, updated_at=timezone.now(), **fields,
+    ))
+
+
+def run_job(job_id, worker=None):
+    """Claim job ``job_id`` and run it; return its new status, or None if it was not ours to finish.
+
+    The claim is a conditional UPDATE, so of several workers racing for the
+    same job exactly one runs it, and a heartbeat keeps the claim fresh for
+    as long as the task runs. The task and the success update share one
+    transaction, and the update only matches while this worker still holds
+    the lock: an attempt whose job was reclaimed in the meantime rolls back
+    and leaves the job to its new owner. A failed attempt leaves no partial
+    writes behind either.
+    """
+    now = timezone.now()
+    worker = worker or worker_name()
+    claimed = Job.objects.filter(due(now), pk=job_id).update(
+        status=Job.RUNNING, attempts=F('attempts') + 1, locked_by=worker, locked_at=now, updated_at=now,
+    )
+    if not claimed:
+        return None
+    job = Job.objects.get(pk=job_id)
+    try:
+        registered = registry.get(job.name)
+        if registered is None:
+            raise LookupError(f'No task is registered as {job.name!r}')
+        with heartbeat(job_id, worker), transaction.atomic():
+            registered.func(**job.payload)
+            if not finish(job_id, worker, status=Job.SUCCEEDED, last_error=''):
+                raise LockLost
+    except LockLost:
+        logger.warning('Job %s (%s) was taken over from %s; its attempt was rolled back', job.pk, job.name, worker)
+        return None
+    except Exception:
+        retry = job.name in registry and job.attempts < job.max_attempts
+        status = Job.QUEUED if retry else Job.FAILED
+        run_at = timezone.now() + retry_delay(job.attempts) if retry else job.run_at
+        logger.warning('Job %s (%s) failed on attempt %s/%s', job.pk, job.name, job.attempts, job.max_attempts,
+                       exc_info=True)
+        if not finish(job_id, worker, status=status, run_at=run_at, last_error=traceback.format_exc()):
+            logger.warning('Job %s (%s) was taken over from %s; not recording its failure', job.pk, job.name, worker)
+            return None
+        return status
+    return Job.SUCCEEDED
+
+
+def due_job_ids(limit):
+    return list(Job.objects.filter(due(timezone.now())).order_by('run_at', 'id').values_list('pk', flat=True)[:limit])
+
+
+def run_due_jobs(limit=100, worker=None):
+    """Run up to ``limit`` due jobs in this thread; return ``{status: count}``."""
+    counts = {}
+    for job_id in due_job_ids(limit):
+        status = run_job(job_id, worker)
+        if status is not None:
+            counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+def purge_finished(older_than):
+    """Delete succeeded jobs last touched before ``older_than``; failed ones are kept for inspection."""
+    deleted, _ = Job.objects.filter(status=Job.SUCCEEDED, updated_at__lt=older_than).delete()
+    return deleted
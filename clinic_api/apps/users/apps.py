@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.core import checks
+
+
+class UsersConfig(AppConfig):
+    name = 'clinic_api.apps.users'
+    label = 'users'
+
+    def ready(self):
+        from clinic_api.apps.users import signals  # noqa: F401
+        from clinic_api.apps.users.checks import check_user_state_cache
+        checks.register(check_user_state_cache, checks.Tags.security)
@@ -0,0 +1,36 @@
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.users.tokens import USER_STATE_CLAIMS, changed_user_state
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication that builds ``request.user`` from token claims.
+
+    The user is an unsaved-looking ``User`` whose remaining fields are
+    deferred, so permission checks and ``*_id`` filters cost no query and
+    anything that needs the full row loads it on access. Claims are
+    overridden by the cached state published when a user is saved or
+    deleted, which is how deactivation takes effect before tokens expire.
+    """
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in USER_STATE_CLAIMS):
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        state = changed_user_state(user_id) or {claim: validated_token[claim] for claim in USER_STATE_CLAIMS}
+        if not state['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        loaded = {api_settings.USER_ID_FIELD: user_id, **{claim: state[claim] for claim in USER_STATE_CLAIMS}}
+        # from_db() expects values in concrete field order.
+        field_names = [field.attname for field in User._meta.concrete_fields if field.attname in loaded]
+        return User.from_db(router.db_for_read(User), field_names, [loaded[name] for name in field_names])
@@ -0,0 +1,48 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import quote_etag, urlencode
+
+DIRECTORY_VERSION_KEY = 'doctors:directory:version'
+
+
+def directory_version():
+    """Timestamp of the last directory change; doubles as Last-Modified."""
+    version = cache.get(DIRECTORY_VERSION_KEY)
+    if version is None:
+        cache.add(DIRECTORY_VERSION_KEY, int(time.time()), None)
+        version = cache.get(DIRECTORY_VERSION_KEY)
+    return version
+
+
+def bump_directory_version():
+    """Move the directory version forward; call it once the change is committed.
+
+    ``cache.incr`` is atomic, so concurrent bumps from several processes each
+    move the version on instead of overwriting one another. It catches up
+    with the clock and moves by at least one, even within the same second.
+    """
+    now = int(time.time())
+    while not cache.add(DIRECTORY_VERSION_KEY, now, None):
+        try:
+            return cache.incr(DIRECTORY_VERSION_KEY, max(1, now - (cache.get(DIRECTORY_VERSION_KEY) or now)))
+        except ValueError:
+            # Evicted between the add and the incr: start again.
+            continue
+    return now
+
+
+def directory_cache_key(request, version):
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    digest = hashlib.sha1(f'{request.get_host()}{request.path}?{params}'.encode()).hexdigest()
+    return f'doctors:directory:{version}:{digest}'
+
+
+def directory_etag(key):
+    return quote_etag(key.split(':', 2)[2])
+
+
+def directory_cache_timeout():
+    return getattr(settings, 'DOCTOR_DIRECTORY_CACHE_TIMEOUT', 300)
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core import checks
+
+from clinic_api.core.throttling import cache_is_shared
+
+CLAIMS_AUTHENTICATION = 'clinic_api.apps.users.authentication.ClaimsJWTAuthentication'
+
+
+def check_user_state_cache(app_configs, **kwargs):
+    """Token claims are only revoked through the cache, so every process must see the same one.
+
+    A warning rather than an error, so that management commands run with a
+    local cache (migrations, shells, benchmarks) are not refused.
+    """
+    classes = getattr(settings, 'REST_FRAMEWORK', {}).get('DEFAULT_AUTHENTICATION_CLASSES', ())
+    # A DEBUG server is one process, where a local cache is as good as a shared one.
+    if CLAIMS_AUTHENTICATION not in classes or settings.DEBUG or cache_is_shared():
+        return []
+    return [checks.Warning(
+        'ClaimsJWTAuthentication needs a cache shared by every process.',
+        hint=(
+            f"The default cache uses {settings.CACHES['default']['BACKEND']}, so a user deactivated or changed "
+            'in one process keeps their old token claims in the others. Point CACHE_BACKEND at Redis or '
+            'Memcached, or authenticate with JWTAuthentication instead.'
+        ),
+        id='users.W001',
+    )]
@@ -0,0 +1,194 @@
+"""Bulk creation of users and their profiles from CSV or NDJSON rows."""
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+
+from clinic_api.apps.users.cache import bump_directory_version
+from clinic_api.apps.users.models import User
+from clinic_api.apps.users.serializers import UserImportSerializer
+from clinic_api.apps.doctors.models import DoctorProfile
+from clinic_api.apps.patients.models import PatientProfile
+
+USER_FIELDS = ('username', 'email', 'first_name', 'last_name', 'role')
+
+
+def read_csv(stream):
+    for number, row in enumerate(csv.DictReader(stream), 1):
+        # Empty cells mean "not given", so field defaults apply.
+        yield number, {key: value for key, value in row.items() if key and value not in ('', None)}
+
+
+def read_ndjson(stream):
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            row = exc
+        yield number, row
+
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def setup_worker():
+    # Forked workers inherit the configured project; spawned ones set it up again.
+    if not settings.configured:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clinic_api.core.settings')
+        django.setup()
+
+
+def hash_passwords(passwords):
+    """Hash each password; an empty one becomes an unusable password."""
+    return [make_password(password or None) for password in passwords]
+
+
+class UserImporter:
+    """Validate, hash and insert rows batch by batch with bounded memory.
+
+    Each batch is validated with ``UserImportSerializer`` plus two queries
+    for usernames and emails already taken. Its passwords are hashed on a
+    process pool while the previous batch is written, and every batch is
+    written with ``bulk_create`` in its own transaction, so at most two
+    batches are held in memory however long the input is.
+
+    ``on_error(row_number, errors)`` is called for every rejected row and
+    ``on_progress(stats)`` after every batch.
+    """
+
+    def __init__(self, batch_size=1000, processes=None, dry_run=False, on_error=None, on_progress=None):
+        self.batch_size = batch_size
+        self.processes = processes or os.cpu_count() or 1
+        self.dry_run = dry_run
+        self.on_error = on_error or (lambda number, errors: None)
+        self.on_progress = on_progress or (lambda stats: None)
+        self.stats = {'rows': 0, 'created': 0, 'rejected': 0}
+        # One instance for every row, as ListSerializer does: building the fields is the costly part.
+        self.row_serializer = UserImportSerializer()
+
+    def run(self, rows):
+        """Import ``(row_number, row)`` pairs; return the counts."""
+        pending = None
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=setup_worker) as pool:
+            for batch in batched(rows, self.batch_size):
+                valid = self.validate(batch, pending[0] if pending else ())
+                hashes = [
+                    pool.submit(hash_passwords, [data.get('password') for _, data in chunk])
+                    for chunk in batched(valid, max(1, -(-len(valid) // self.processes)))
+                ]
+                if pending:
+                    self.write(*pending)
+                pending = (valid, hashes)
+            if pending:
+                self.write(*pending)
+        return self.stats
+
+    def reject(self, number, errors):
+        self.stats['rejected'] += 1
+        self.on_error(number, errors)
+
+    def validate(self, batch, unwritten):
+        """Return ``(row_number, data)`` for the valid rows of ``batch``.
+
+        ``unwritten`` is the previous, still pending batch, whose usernames
+        and emails the database does not know about yet.
+        """
+        self.stats['rows'] += len(batch)
+        candidates = []
+        for number, row in batch:
+            if not isinstance(row, dict):
+                self.reject(number, {'non_field_errors': [f'Not a JSON object: {row}']})
+                continue
+            try:
+                candidates.append((number, self.row_serializer.run_validation(row)))
+            except ValidationError as exc:
+                self.reject(number, exc.detail)
+
+        taken = {
+            'username': {data['username'] for _, data in unwritten},
+            'email': {data['email'] for _, data in unwritten},
+        }
+        taken['username'].update(User.objects.filter(
+            username__in=[data['username'] for _, data in candidates],
+        ).values_list('username', flat=True))
+        taken['email'].update(User.objects.filter(
+            email__in=[data['email'] for _, data in candidates],
+        ).values_list('email', flat=True))
+
+        valid = []
+        for number, data in candidates:
+            errors = {
+                field: [f'A user with that {field} already exists.']
+                for field in ('username', 'email') if data[field] in taken[field]
+            }
+            if errors:
+                self.reject(number, errors)
+                continue
+            taken['username'].add(data['username'])
+            taken['email'].add(data['email'])
+            valid.append((number, data))
+        return valid
+
+    def write(self, valid, hash_futures):
+        hashes = [password for future in hash_futures for password in future.result()]
+        users = [
+            User(password=password, **{field: data[field] for field in USER_FIELDS})
+            for (_, data), password in zip(valid, hashes)
+        ]
+        if not self.dry_run:
+            try:
+                with transaction.atomic():
+                    self.insert(users, [data for _, data in valid])
+                created = len(users)
+            except IntegrityError:
+                # Someone else took a username or email since validation; go row by row.
+                created = self.insert_one_by_one(valid, users)
+            if any(user.role == 'doctor' for user in users):
+                transaction.on_commit(bump_directory_version)
+        else:
+            created = len(users)
+        self.stats['created'] += created
+        self.on_progress(dict(self.stats))
+
+    @staticmethod
+    def insert(users, rows):
+        users = User.objects.bulk_create(users)
+        doctors, patients = [], []
+        for user, data in zip(users, rows):
+            if user.role == 'doctor':
+                doctors.append(DoctorProfile(
+                    user=user, specialization=data['specialization'],
+                    experience_years=data['experience_years'], gender=data['gender'],
+                ))
+            elif user.role == 'patient':
+                patients.append(PatientProfile(
+                    user=user, phone=data['phone'], date_of_birth=data['date_of_birth'], gender=data['gender'],
+                ))
+        DoctorProfile.objects.bulk_create(doctors)
+        PatientProfile.objects.bulk_create(patients)
+
+    def insert_one_by_one(self, valid, users):
+        created = 0
+        for (number, data), user in zip(valid, users):
+            try:
+                with transaction.atomic():
+                    self.insert([user], [data])
+                created += 1
+            except IntegrityError as exc:
+                self.reject(number, {'non_field_errors': [str(exc)]})
+        return created
@@ -0,0 +1,121 @@
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger('clinic_api.login')
+
+LOGIN_METRICS = (
+    'attempts',
+    'succeeded',
+    'failed',
+    'locked_out',
+    'slowed_down',
+    'authenticate_us',
+    'total_us',
+)
+
+
+def login_setting(name, default):
+    return getattr(settings, f'LOGIN_{name}', default)
+
+
+class LoginAttemptLimiter:
+    """Count failed logins per client (username and IP), per IP and per username.
+
+    Once a client or an IP reaches its limit its logins are refused before
+    the password is hashed, so a brute-force run stops costing CPU. Failures
+    against a username from anywhere only slow it down: past
+    ``LOGIN_SLOWDOWN_AFTER_FAILURES`` the username takes one attempt every
+    ``LOGIN_SLOWDOWN_SECONDS``, so nobody can lock its owner out but a
+    distributed guesser is held to that pace. Counters live for one lockout
+    window after the first failure; a successful login clears the client
+    and username counters but not the IP one.
+    """
+
+    def __init__(self, username, ip):
+        username, ip = str(username).lower(), ip or ''
+        self.locks = {
+            'client': (self._key(f'{username}|{ip}'), login_setting('MAX_FAILURES_PER_CLIENT', 5)),
+            'ip': (self._key(ip), login_setting('MAX_FAILURES_PER_IP', 50)),
+        }
+        self.username = self._key(username)
+
+    @staticmethod
+    def _key(value):
+        return hashlib.sha1(value.encode()).hexdigest()
+
+    @classmethod
+    def for_request(cls, request, username):
+        return cls(username, BaseThrottle().get_ident(request) if request is not None else None)
+
+    def check(self):
+        now = time.time()
+        for scope, (key, _limit) in self.locks.items():
+            locked_until = cache.get(f'login:lock:{scope}:{key}')
+            if locked_until is not None and locked_until > now:
+                record_login_metrics(locked_out=1)
+                raise Throttled(wait=math.ceil(locked_until - now), detail='Too many failed login attempts.')
+
+        failures = cache.get(f'login:failures:username:{self.username}') or 0
+        if failures >= login_setting('SLOWDOWN_AFTER_FAILURES', 5):
+            delay = login_setting('SLOWDOWN_SECONDS', 5)
+            # Whoever takes the slot makes the attempt; everyone else waits for the next one.
+            if not cache.add(f'login:slow:{self.username}', now + delay, delay):
+                next_attempt = cache.get(f'login:slow:{self.username}') or now + delay
+                record_login_metrics(slowed_down=1)
+                raise Throttled(wait=max(1, math.ceil(next_attempt - now)), detail='Too many failed login attempts.')
+
+    def record_failure(self):
+        window = login_setting('LOCKOUT_SECONDS', 900)
+        for scope, (key, limit) in self.locks.items():
+            failures = self._count(f'login:failures:{scope}:{key}', window)
+            if failures >= limit:
+                cache.set(f'login:lock:{scope}:{key}', time.time() + window, window)
+                logger.warning('Login locked out for %s after %d failures', scope, failures)
+        self._count(f'login:failures:username:{self.username}', window)
+
+    @staticmethod
+    def _count(counter, window):
+        cache.add(counter, 0, window)
+        try:
+            return cache.incr(counter)
+        except ValueError:
+            # Expired between add() and incr(); start a new window.
+            cache.set(counter, 1, window)
+            return 1
+
+    def reset(self):
+        key, _limit = self.locks['client']
+        cache.delete_many([
+            f'login:failures:client:{key}', f'login:lock:client:{key}',
+            f'login:failures:username:{self.username}', f'login:slow:{self.username}',
+        ])
+
+
+def record_login_metrics(**increments):
+    for name, value in increments.items():
+        key = f'login:metrics:{name}'
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key, value)
+        except ValueError:
+            cache.set(key, value, None)
+
+
+def login_metrics():
+    """Counters since the cache was last cleared, plus derived rates."""
+    values = cache.get_many([f'login:metrics:{name}' for name in LOGIN_METRICS])
+    metrics = {name: values.get(f'login:metrics:{name}', 0) for name in LOGIN_METRICS}
+    checked = metrics['succeeded'] + metrics['failed']
+    authenticate_seconds = metrics['authenticate_us'] / 1e6
+    metrics['mean_authenticate_ms'] = round(metrics['authenticate_us'] / 1e3 / checked, 3) if checked else None
+    metrics['mean_total_ms'] = round(metrics['total_us'] / 1e3 / checked, 3) if checked else None
+    # Every checked login, including unknown usernames, costs one hash.
+    metrics['hashes_per_sec'] = round(checked / authenticate_seconds, 2) if authenticate_seconds else None
+    return metrics
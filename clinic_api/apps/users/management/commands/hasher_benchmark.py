@@ -0,0 +1,65 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+
+def time_hashes(hasher_path, iterations_setting, count):
+    """Hash ``count`` passwords in this process and return the elapsed seconds."""
+    if not settings.configured:
+        settings.configure(PASSWORD_PBKDF2_ITERATIONS=iterations_setting)
+    hasher = import_string(hasher_path)()
+    salt = hasher.salt()
+    started = time.perf_counter()
+    for i in range(count):
+        hasher.encode(f'password-{i}', salt)
+    return time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure password hashes per second for the configured hasher, on one core '
+        'and across worker processes, to size login capacity.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hashes', type=int, default=20, help='Hashes per process.')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes for the parallel run (defaults to the CPU count).')
+        parser.add_argument('--policy', choices=sorted(settings.PASSWORD_HASHER_POLICIES),
+                            help='Hasher policy to measure instead of PASSWORD_HASHER.')
+
+    def handle(self, *args, **options):
+        path = settings.PASSWORD_HASHER_POLICIES[options['policy'] or settings.PASSWORD_HASHER]
+        hasher = import_string(path)()
+        try:
+            hasher.encode('warmup', hasher.salt())
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        count, processes = options['hashes'], options['processes']
+        single = count / time_hashes(path, settings.PASSWORD_PBKDF2_ITERATIONS, count)
+
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            list(pool.map(time_hashes, [path] * processes, [settings.PASSWORD_PBKDF2_ITERATIONS] * processes,
+                          [count] * processes))
+        parallel = count * processes / (time.perf_counter() - started)
+
+        report = {
+            'hasher': path,
+            'parameters': {
+                str(key): str(value)
+                for key, value in hasher.safe_summary(hasher.encode('x', hasher.salt())).items()
+                if key not in ('hash', 'salt')
+            },
+            'hashes_per_sec_per_core': round(single, 2),
+            'processes': processes,
+            'hashes_per_sec_parallel': round(parallel, 2),
+            'ms_per_login': round(1000 / single, 2),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
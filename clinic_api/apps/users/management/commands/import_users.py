@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clinic_api.apps.users.importing import READERS, UserImporter
+
+
+class Command(BaseCommand):
+    help = (
+        'Create users with their doctor/patient profiles from a CSV (with a header row) or '
+        'NDJSON file, streaming it in batches: rows are validated per batch, passwords hashed '
+        'on a process pool and rows inserted with bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file, or - for standard input.')
+        parser.add_argument('--format', choices=sorted(READERS),
+                            help='Input format; defaults to the file extension (.csv, .ndjson/.jsonl).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows validated and inserted together.')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Processes hashing passwords.')
+        parser.add_argument('--errors', help='Write rejected rows as NDJSON to this file instead of stderr.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and hash but do not insert.')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or self.guess_format(options['path'])
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8')
+        errors = open(options['errors'], 'w', encoding='utf-8') if options['errors'] else None
+        started = time.perf_counter()
+
+        def on_error(number, row_errors):
+            line = json.dumps({'row': number, 'errors': row_errors}, default=str)
+            if errors:
+                errors.write(line + '\n')
+            else:
+                self.stderr.write(line)
+
+        def on_progress(stats):
+            rate = stats['rows'] / max(time.perf_counter() - started, 1e-9)
+            self.stderr.write(
+                f"{stats['rows']} rows read, {stats['created']} created, {stats['rejected']} rejected "
+                f"({rate:.0f} rows/s)"
+            )
+
+        importer = UserImporter(
+            batch_size=options['batch_size'], processes=options['processes'], dry_run=options['dry_run'],
+            on_error=on_error, on_progress=on_progress,
+        )
+        try:
+            stats = importer.run(READERS[fmt](stream))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if errors:
+                errors.close()
+        self.stdout.write(json.dumps({
+            **stats, 'dry_run': options['dry_run'], 'seconds': round(time.perf_counter() - started, 2),
+        }))
+
+    @staticmethod
+    def guess_format(path):
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.csv':
+            return 'csv'
+        if extension in ('.ndjson', '.jsonl'):
+            return 'ndjson'
+        raise CommandError('Cannot tell the input format from the file name; pass --format.')
@@ -1,5 +1,27 @@
-from django.db import models
-from django.contrib.auth.models import AbstractUser
+from functools import partial
+
+from django.db import models, transaction
+from django.contrib.auth.models import AbstractUser, UserManager
+
+
+class UserQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        """Update the rows and, as saving would, publish new token claims of the users changed once committed."""
+        from clinic_api.apps.users.tokens import USER_STATE_CLAIMS, remember_user_state
+
+        if not kwargs.keys() & set(USER_STATE_CLAIMS):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            ids = list(self.values_list('pk', flat=True))
+            updated = super().update(**kwargs)
+            for state in self.model._base_manager.using(self.db).filter(pk__in=ids).values('pk', *USER_STATE_CLAIMS):
+                transaction.on_commit(partial(remember_user_state, state.pop('pk'), state), using=self.db)
+        return updated
+
+
+class ClinicUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
 
 
 class User(AbstractUser):
@@ -14,13 +36,30 @@ class User(AbstractUser):
     email = models.EmailField(unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ClinicUserManager()
     
     class Meta:
         db_table = 'users'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='user_created_idx'),
+            models.Index(
+                fields=['role', '-created_at'],
+                condition=models.Q(is_active=True),
+                name='user_active_role_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a doctor changing role still invalidates the directory.
+        instance._loaded_role = instance.__dict__.get('role')
+        return instance
     
     def is_admin(self):
         return self.role == 'admin' or self.is_superuser
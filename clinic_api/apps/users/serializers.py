@@ -1,8 +1,22 @@
-from rest_framework import serializers
+import time
+from datetime import date, timedelta
+
+from rest_framework import exceptions, serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from django.utils import timezone
+from django.contrib.auth.models import update_last_login
 from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from clinic_api.apps.users.models import User
-from clinic_api.apps.doctors.models import DoctorProfile, TimeSlot
+from clinic_api.apps.users.tasks import record_user_registered
+from clinic_api.apps.users.login import LoginAttemptLimiter, logger as login_logger, record_login_metrics
+from clinic_api.apps.users.tokens import ClinicRefreshToken, add_user_claims
+from clinic_api.apps.doctors.models import DoctorDaySummary, DoctorProfile, TimeSlot
+from clinic_api.apps.doctors.overlaps import has_overlap, overlap_errors_as_conflicts
 from clinic_api.apps.patients.models import PatientProfile
+from clinic_api.core.profiling import TimedSerializerMixin
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -42,11 +56,99 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
                 date_of_birth='2000-01-01',
                 gender='male'
             )
-        
+
+        record_user_registered.enqueue(user_id=user.pk)
         return user
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserImportSerializer(serializers.Serializer):
+    """One row of ``manage.py import_users``; profile fields apply to the row's role.
+
+    Defaults mirror the profiles ``UserRegistrationSerializer`` creates. A
+    blank password leaves the account without a usable one.
+    """
+
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField(max_length=254)
+    password = serializers.CharField(required=False, allow_blank=True, validators=[validate_password])
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    role = serializers.ChoiceField(choices=User.ROLE_CHOICES, default='patient')
+    specialization = serializers.CharField(max_length=100, default='General')
+    experience_years = serializers.IntegerField(min_value=0, default=0)
+    gender = serializers.ChoiceField(choices=DoctorProfile.GENDER_CHOICES, default='male')
+    phone = serializers.CharField(max_length=20, required=False, allow_blank=True, default='')
+    date_of_birth = serializers.DateField(default=date(2000, 1, 1))
+
+    def validate_email(self, value):
+        return User.objects.normalize_email(value)
+
+
+class ClinicTokenObtainPairSerializer(TokenObtainSerializer):
+    """Issue a token pair, refusing locked-out logins before any hashing.
+
+    Authentication (dominated by the password hash) and token issuance are
+    timed separately and added to the login metrics.
+    """
+
+    token_class = ClinicRefreshToken
+
+    def validate(self, attrs):
+        limiter = LoginAttemptLimiter.for_request(self.context.get('request'), attrs[self.username_field])
+        limiter.check()
+
+        started = time.perf_counter()
+        try:
+            super().validate(attrs)
+        except exceptions.AuthenticationFailed:
+            elapsed = int((time.perf_counter() - started) * 1e6)
+            limiter.record_failure()
+            record_login_metrics(attempts=1, failed=1, authenticate_us=elapsed, total_us=elapsed)
+            raise
+        authenticated = time.perf_counter()
+        limiter.reset()
+
+        refresh = self.get_token(self.user)
+        data = {'refresh': str(refresh), 'access': str(refresh.access_token)}
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, self.user)
+
+        finished = time.perf_counter()
+        record_login_metrics(
+            attempts=1,
+            succeeded=1,
+            authenticate_us=int((authenticated - started) * 1e6),
+            total_us=int((finished - started) * 1e6),
+        )
+        login_logger.debug(
+            'Login for user %s: authenticate %.1f ms, total %.1f ms',
+            self.user.pk, (authenticated - started) * 1e3, (finished - started) * 1e3,
+        )
+        return data
+
+
+class ClinicTokenRefreshSerializer(TokenRefreshSerializer):
+    """Re-read the user on refresh so new access tokens never carry stale claims."""
+
+    token_class = ClinicRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(**{jwt_settings.USER_ID_FIELD: refresh[jwt_settings.USER_ID_CLAIM]}).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed('User is inactive or no longer exists', code='user_inactive')
+
+        data = {'access': str(add_user_claims(refresh.access_token, user))}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            add_user_claims(refresh, user)
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
+
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     
     class Meta:
         model = User
@@ -61,7 +163,7 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         fields = ['username', 'email', 'first_name', 'last_name', 'is_active']
 
 
-class DoctorProfileSerializer(serializers.ModelSerializer):
+class DoctorProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     
     user = UserSerializer(read_only=True)
     
@@ -78,7 +180,7 @@ class DoctorProfileUpdateSerializer(serializers.ModelSerializer):
         fields = ['specialization', 'experience_years', 'gender']
 
 
-class PatientProfileSerializer(serializers.ModelSerializer):
+class PatientProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     
     user = UserSerializer(read_only=True)
     
@@ -95,36 +197,165 @@ class PatientProfileUpdateSerializer(serializers.ModelSerializer):
         fields = ['phone', 'date_of_birth', 'gender']
 
 
-class TimeSlotSerializer(serializers.ModelSerializer):
+class TimeSlotOverlapMixin:
+    """Slot validation shared by create and update: ordered and overlap-free.
+
+    A slot may only end before it starts (running past midnight) when the
+    write says ``overnight: true``; an update that leaves both times alone
+    keeps an existing overnight slot as it is. The overlap check is one
+    ``EXISTS`` query; a concurrent insert that gets past it is caught by
+    the database constraint on PostgreSQL.
+    """
+
+    def validate(self, data):
+        def current(name):
+            return data[name] if name in data else getattr(self.instance, name)
+
+        start, end = current('start_time'), current('end_time')
+        overnight = data.pop('overnight', None)
+        if overnight is None:
+            overnight = self.instance is not None and 'start_time' not in data and 'end_time' not in data
+        if start == end or (end < start and not overnight):
+            raise serializers.ValidationError("Start time must be before end time")
+        if has_overlap(current('doctor'), current('date'), start, end, exclude=getattr(self.instance, 'pk', None)):
+            raise serializers.ValidationError("This time slot overlaps with an existing time slot")
+        return data
+
+    def create(self, validated_data):
+        with overlap_errors_as_conflicts():
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with overlap_errors_as_conflicts():
+            return super().update(instance, validated_data)
+
+
+class TimeSlotSerializer(TimedSerializerMixin, TimeSlotOverlapMixin, serializers.ModelSerializer):
     
     doctor_name = serializers.CharField(source='doctor.get_full_name', read_only=True)
+    overnight = serializers.BooleanField(write_only=True, required=False)
     
     class Meta:
         model = TimeSlot
-        fields = ['id', 'doctor', 'doctor_name', 'date', 'start_time', 'end_time', 'is_available', 'created_at']
+        fields = [
+            'id', 'doctor', 'doctor_name', 'date', 'start_time', 'end_time', 'overnight', 'is_available', 'created_at',
+        ]
         read_only_fields = ['id', 'created_at']
-    
+
+
+class TimeSlotBulkCreateSerializer(serializers.Serializer):
+
+    MAX_SLOTS = 5000
+
+    start_date = serializers.DateField()
+    weeks = serializers.IntegerField(min_value=1, max_value=52, default=1)
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6),
+        allow_empty=False,
+        default=[0, 1, 2, 3, 4],
+    )
+    day_start = serializers.TimeField()
+    day_end = serializers.TimeField()
+    slot_minutes = serializers.IntegerField(min_value=5, max_value=480, default=30)
+
     def validate(self, data):
-        if data['start_time'] >= data['end_time']:
-            raise serializers.ValidationError("Start time must be before end time")
-        
-        existing_slots = TimeSlot.objects.filter(
-            doctor=data['doctor'],
-            date=data['date']
-        ).exclude(id=self.instance.id if self.instance else None)
-        
-        for slot in existing_slots:
-            if slot.is_overlap(data['start_time'], data['end_time']):
-                raise serializers.ValidationError("This time slot overlaps with an existing time slot")
-        
+        if data['day_start'] >= data['day_end']:
+            raise serializers.ValidationError("Day start must be before day end")
+
+        start = data['day_start'].hour * 60 + data['day_start'].minute
+        end = data['day_end'].hour * 60 + data['day_end'].minute
+        per_day = (end - start) // data['slot_minutes']
+        if per_day == 0:
+            raise serializers.ValidationError("Slot length does not fit between day start and day end")
+        if per_day * len(set(data['weekdays'])) * data['weeks'] > self.MAX_SLOTS:
+            raise serializers.ValidationError(f"Cannot generate more than {self.MAX_SLOTS} slots at once")
+
         return data
 
 
-class TimeSlotDetailSerializer(serializers.ModelSerializer):
+class TimeSlotConflictSerializer(serializers.Serializer):
+
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    detail = serializers.CharField()
+
+
+class AvailabilityQuerySerializer(serializers.Serializer):
+
+    MAX_DAYS = 62
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    time_from = serializers.TimeField(required=False)
+    time_to = serializers.TimeField(required=False)
+    specialization = serializers.CharField(required=False)
+    gender = serializers.ChoiceField(choices=DoctorProfile.GENDER_CHOICES, required=False)
+    per_doctor = serializers.IntegerField(min_value=1, max_value=50, required=False)
+    first = serializers.IntegerField(min_value=1, max_value=500, required=False)
+
+    def validate(self, data):
+        today = timezone.localdate()
+        data['date_from'] = max(data.get('date_from') or today, today)
+        data['date_to'] = data.get('date_to') or data['date_from'] + timedelta(days=14)
+        if data['date_from'] > data['date_to']:
+            raise serializers.ValidationError("date_from must not be after date_to")
+        if (data['date_to'] - data['date_from']).days > self.MAX_DAYS:
+            raise serializers.ValidationError(f"Date range cannot exceed {self.MAX_DAYS} days")
+        if data.get('time_from') and data.get('time_to') and data['time_from'] >= data['time_to']:
+            raise serializers.ValidationError("time_from must be before time_to")
+        return data
+
+
+class AvailableSlotSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+
+    class Meta:
+        model = TimeSlot
+        fields = ['id', 'date', 'start_time', 'end_time']
+
+
+class AvailableDoctorSerializer(TimedSerializerMixin, serializers.Serializer):
+
+    id = serializers.IntegerField(source='doctor.id')
+    name = serializers.CharField(source='doctor.get_full_name')
+    specialization = serializers.CharField(source='profile.specialization', default=None)
+    gender = serializers.CharField(source='profile.gender', default=None)
+    experience_years = serializers.IntegerField(source='profile.experience_years', default=None)
+    slots = AvailableSlotSerializer(many=True)
+
+
+class TimeSlotDetailSerializer(TimedSerializerMixin, TimeSlotOverlapMixin, serializers.ModelSerializer):
     
     doctor = UserSerializer(read_only=True)
+    overnight = serializers.BooleanField(write_only=True, required=False)
     
     class Meta:
         model = TimeSlot
-        fields = ['id', 'doctor', 'date', 'start_time', 'end_time', 'is_available', 'created_at', 'updated_at']
+        fields = [
+            'id', 'doctor', 'date', 'start_time', 'end_time', 'overnight', 'is_available', 'created_at', 'updated_at',
+        ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class DoctorDaySummarySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+
+    booked = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DoctorDaySummary
+        fields = ['doctor', 'date', 'total', 'available', 'booked', 'pending', 'confirmed', 'cancelled', 'updated_at']
+
+    def get_booked(self, obj):
+        return obj.total - obj.available
+
+
+class DaySummaryQuerySerializer(serializers.Serializer):
+
+    doctor = serializers.IntegerField(min_value=1, required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError("date_from must not be after date_to")
+        return data
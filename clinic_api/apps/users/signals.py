@@ -0,0 +1,38 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from clinic_api.apps.users.cache import bump_directory_version
+from clinic_api.apps.users.tokens import USER_STATE_CLAIMS, remember_user_state, user_state
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import DoctorProfile
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, using, **kwargs):
+    if 'doctor' in (instance.role, getattr(instance, '_loaded_role', None)):
+        transaction.on_commit(bump_directory_version, using=using)
+
+
+@receiver([post_save, post_delete], sender=DoctorProfile)
+def doctor_profile_changed(sender, instance, using, **kwargs):
+    # On commit, or a request could cache the old directory under the new version.
+    transaction.on_commit(bump_directory_version, using=using)
+
+
+@receiver(post_save, sender=User)
+def publish_user_state(sender, instance, using, **kwargs):
+    if instance.get_deferred_fields():
+        state = User.objects.using(using).filter(pk=instance.pk).values(*USER_STATE_CLAIMS).get()
+    else:
+        state = user_state(instance)
+    # Published on commit: a rolled-back change must not reach other processes' token checks.
+    transaction.on_commit(partial(remember_user_state, instance.pk, state), using=using)
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user(sender, instance, using, **kwargs):
+    state = {claim: instance.__dict__.get(claim) for claim in USER_STATE_CLAIMS}
+    transaction.on_commit(partial(remember_user_state, instance.pk, {**state, 'is_active': False}), using=using)
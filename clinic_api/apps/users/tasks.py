@@ -0,0 +1,14 @@
+import logging
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.tasks.queue import task
+
+audit_logger = logging.getLogger('clinic_api.audit')
+
+
+@task(max_attempts=5)
+def record_user_registered(user_id):
+    """Audit trail of sign-ups; welcome messages belong here too."""
+    user = User.objects.filter(pk=user_id).values('id', 'username', 'role').first()
+    if user:
+        audit_logger.info('user.registered id=%s username=%s role=%s', user['id'], user['username'], user['role'])
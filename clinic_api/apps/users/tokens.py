@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# Copied into every token so requests can be authorised without loading the user row.
+USER_STATE_CLAIMS = ('username', 'first_name', 'last_name', 'role', 'is_active', 'is_superuser')
+
+
+def user_state(user):
+    return {claim: getattr(user, claim) for claim in USER_STATE_CLAIMS}
+
+
+def add_user_claims(token, user):
+    for claim, value in user_state(user).items():
+        token[claim] = value
+    return token
+
+
+def user_state_key(user_id):
+    return f'auth:user-state:{user_id}'
+
+
+def remember_user_state(user_id, state):
+    """Publish a user's current claims so older tokens stop carrying stale ones.
+
+    Entries only need to outlive access tokens: refreshing re-reads the row.
+    Saves, deletes and ``User.objects.update()`` call it once their
+    transaction commits; other processes only see it through a shared
+    cache, which the ``users.W001`` check asks for outside DEBUG.
+    """
+    timeout = int(settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds())
+    cache.set(user_state_key(user_id), state, timeout)
+
+
+def changed_user_state(user_id):
+    return cache.get(user_state_key(user_id))
+
+
+class ClinicRefreshToken(RefreshToken):
+
+    @classmethod
+    def for_user(cls, user):
+        return add_user_claims(super().for_user(user), user)
@@ -1,7 +1,13 @@
+from functools import partial
+
 from rest_framework import viewsets, generics, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 
 from clinic_api.apps.users.models import User
 from clinic_api.apps.users.serializers import (
@@ -10,8 +16,23 @@ from clinic_api.apps.users.serializers import (
     UserUpdateSerializer,
 )
 from clinic_api.apps.users.permissions import IsAdmin, IsOwner, IsAdminOrReadOnly
+from clinic_api.apps.users.cache import (
+    directory_cache_key,
+    directory_cache_timeout,
+    directory_etag,
+    directory_version,
+)
 
 from clinic_api.apps.doctors.models import TimeSlot
+from clinic_api.core.async_views import AsyncViewSetMixin
+from clinic_api.core.db_routers import use_primary
+from clinic_api.core.mixins import ConditionalGetMixin, ConditionalResponseMixin
+from clinic_api.core.pagination import KeysetPagination
+from clinic_api.core.throttling import AvailabilityThrottle, LoginThrottle
+
+
+class LoginView(TokenObtainPairView):
+    throttle_classes = [LoginThrottle]
 
 
 class UserRegistrationView(generics.CreateAPIView):
@@ -24,7 +45,7 @@ class UserRegistrationView(generics.CreateAPIView):
         serializer.save()
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
 
     queryset = User.objects.all().order_by('-created_at')
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -43,11 +64,16 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='me')
     def me(self, request):
-        serializer = self.get_serializer(request.user)
+        user = request.user
+        deferred = user.get_deferred_fields()
+        if deferred:
+            # Token-backed users only carry their claims; load the rest in one query.
+            user.refresh_from_db(fields=deferred)
+        serializer = self.get_serializer(user)
         return Response(serializer.data)
 
 
-class DoctorViewSet(viewsets.ReadOnlyModelViewSet):
+class DoctorViewSet(ConditionalResponseMixin, viewsets.ReadOnlyModelViewSet):
 
     queryset = User.objects.filter(role='doctor', is_active=True)
     serializer_class = UserSerializer
@@ -55,20 +81,107 @@ class DoctorViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['first_name', 'last_name', 'doctor_profile__specialization']
     ordering_fields = ['first_name', 'last_name']
-
-    @action(detail=True, methods=['get'], url_path='timeslots')
-    def timeslots(self, request, pk=None):
-
-        doctor = self.get_object()
-        qs = (
+    pagination_class = KeysetPagination
+    # Only the timeslots action uses conditional_response; its slots show the doctor's name.
+    conditional_related = ('doctor',)
+
+    @property
+    def keyset_ordering(self):
+        if self.action == 'timeslots':
+            return ('date', 'start_time', 'id')
+        return None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """Serve directory pages from the cache, or a 304 when the client is current.
+
+        Keys embed a version that the User/DoctorProfile signals bump, so a
+        change makes every cached page and ETag stale at once. Pages are
+        filled from the primary: a lagging replica would store pre-change
+        rows under the new version, where no later bump would evict them.
+        """
+        version, key, etag, response = self.directory_lookup(request)
+        if response is None:
+            with use_primary():
+                response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, directory_cache_timeout())
+        return self.add_directory_validators(response, version, etag)
+
+    def directory_lookup(self, request):
+        """Return the version, cache key, ETag and a 304/cached response if there is one."""
+        version = directory_version()
+        key = directory_cache_key(request, version)
+        etag = directory_etag(key)
+        response = get_conditional_response(request, etag=etag, last_modified=version)
+        if response is None:
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+        return version, key, etag, response
+
+    @staticmethod
+    def add_directory_validators(response, version, etag):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(version)
+        return response
+
+    @staticmethod
+    def open_timeslots(doctor):
+        return (
             TimeSlot.objects
             .filter(doctor=doctor, is_available=True)
             .select_related('doctor')
             .order_by('date', 'start_time')
         )
 
-        page = self.paginate_queryset(qs)
+    @action(detail=True, methods=['get'], url_path='timeslots', throttle_classes=[AvailabilityThrottle])
+    def timeslots(self, request, pk=None):
+
+        doctor = self.get_object()
+        qs = self.open_timeslots(doctor)
+
+        def render():
+            page = self.paginate_queryset(qs)
+            from clinic_api.apps.users.serializers import TimeSlotSerializer
+            if page is not None:
+                return self.get_paginated_response(TimeSlotSerializer(page, many=True).data)
+            return Response(TimeSlotSerializer(qs, many=True).data)
+
+        return self.conditional_response(qs, render)
+
+
+class AsyncDoctorViewSet(AsyncViewSetMixin, DoctorViewSet):
+    """``DoctorViewSet`` with async reads, routed in the ASGI deployment."""
+
+    async def list(self, request, *args, **kwargs):
+        return await self.acached_response(partial(self.apaginated_response, self.filter_queryset(self.get_queryset())))
+
+    async def retrieve(self, request, *args, **kwargs):
+        async def render():
+            return Response(self.get_serializer(await self.aget_object()).data)
+        return await self.acached_response(render)
+
+    async def acached_response(self, render):
+        # Cache access is blocking, so the lookup makes one trip to a worker thread.
+        version, key, etag, response = await sync_to_async(self.directory_lookup)(self.request)
+        if response is None:
+            with use_primary():
+                response = await render()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            await cache.aset(key, response.data, directory_cache_timeout())
+        return self.add_directory_validators(response, version, etag)
+
+    @action(detail=True, methods=['get'], url_path='timeslots', throttle_classes=[AvailabilityThrottle])
+    async def timeslots(self, request, pk=None):
         from clinic_api.apps.users.serializers import TimeSlotSerializer
-        if page is not None:
-            return self.get_paginated_response(TimeSlotSerializer(page, many=True).data)
-        return Response(TimeSlotSerializer(qs, many=True).data)
+
+        qs = self.open_timeslots(await self.aget_object())
+        return await self.aconditional_response(qs, partial(self.apaginated_response, qs, TimeSlotSerializer))
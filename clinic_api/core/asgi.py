@@ -0,0 +1,9 @@
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clinic_api.core.settings')
+# Route the read-heavy endpoints to their async views.
+os.environ.setdefault('ASYNC_READ_VIEWS', 'true')
+
+application = get_asgi_application()
@@ -0,0 +1,10 @@
+from clinic_api.apps.users.views import AsyncDoctorViewSet
+from clinic_api.apps.doctors.views import AsyncTimeSlotViewSet
+from clinic_api.apps.appointments.views import AsyncAppointmentViewSet
+from clinic_api.core.urls import api_urlpatterns
+
+urlpatterns = api_urlpatterns(
+    doctor_viewset=AsyncDoctorViewSet,
+    timeslot_viewset=AsyncTimeSlotViewSet,
+    appointment_viewset=AsyncAppointmentViewSet,
+)
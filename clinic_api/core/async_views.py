@@ -0,0 +1,76 @@
+import asyncio
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import Http404
+from rest_framework.response import Response
+
+
+class AsyncViewSetMixin:
+    """Let a DRF viewset serve ``async def`` actions under ASGI.
+
+    ``dispatch`` becomes a coroutine: authentication, permissions and
+    throttles run as usual (in a worker thread, since they may touch the
+    database), async handlers are awaited on the event loop and the
+    viewset's remaining sync handlers run through ``sync_to_async``, so
+    writes keep their existing code paths.
+    """
+
+    # Streamed exports hand ASGI an async iterator (see core.export).
+    async_streaming = True
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        return markcoroutinefunction(super().as_view(actions, **initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            if asyncio.iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        if hasattr(self.paginator, 'apaginate_queryset'):
+            return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+        return await sync_to_async(self.paginator.paginate_queryset)(queryset, self.request, view=self)
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (ObjectDoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginated_response(self, queryset, serializer_class=None):
+        """Serialise a page of ``queryset`` (or all of it without a paginator)."""
+        def serialize(rows):
+            if serializer_class is not None:
+                return serializer_class(rows, many=True).data
+            return self.get_serializer(rows, many=True).data
+
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize(page))
+        return Response(serialize([obj async for obj in queryset]))
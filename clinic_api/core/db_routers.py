@@ -0,0 +1,106 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+PRIMARY = 'default'
+
+# Routing state of the request being served; None outside requests.
+_request_state = ContextVar('replica_routing_state', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICA_ALIASES', [])
+
+
+class RoutingState:
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+@contextmanager
+def use_primary():
+    """Send every read in the block to the primary."""
+    state = _request_state.get()
+    if state is None:
+        yield
+        return
+    pinned, state.pinned = state.pinned, True
+    try:
+        yield
+    finally:
+        state.pinned = pinned
+
+
+class PrimaryReplicaRouter:
+    """Serve reads of safe requests from a replica, everything else from the primary.
+
+    Only requests passing through ``ReplicaRoutingMiddleware`` are routed to
+    replicas; management commands and background code always read the
+    primary. A request is pinned to the primary as soon as it writes, so it
+    reads its own writes, and ``ReplicaRoutingMiddleware`` keeps the same
+    client on the primary for a short sticky window afterwards.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None or state.pinned:
+            return PRIMARY
+        if state.replica is None:
+            aliases = replica_aliases()
+            state.replica = random.choice(aliases) if aliases else PRIMARY
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold copies of the primary's rows.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replica_aliases()
+
+
+class ReplicaRoutingMiddleware:
+    """Open a routing scope per request for ``PrimaryReplicaRouter``.
+
+    Unsafe methods are pinned to the primary for the whole request. After a
+    request that wrote, the client (identified by its Authorization header)
+    stays on the primary for ``REPLICA_STICKY_SECONDS`` so an immediate
+    re-read does not miss its own write on a lagging replica.
+    """
+
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = self.sticky_key(request)
+        pinned = request.method not in self.safe_methods or (key is not None and cache.get(key) is not None)
+        state = RoutingState(pinned)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        if state.wrote and key is not None:
+            cache.set(key, True, getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+        return response
+
+    @staticmethod
+    def sticky_key(request):
+        credentials = request.META.get('HTTP_AUTHORIZATION')
+        if not credentials:
+            return None
+        return f'db:sticky:{hashlib.sha1(credentials.encode()).hexdigest()}'
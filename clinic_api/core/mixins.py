@@ -0,0 +1,125 @@
+import hashlib
+from datetime import datetime
+from functools import partial
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Window
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+from clinic_api.core.pagination import KeysetPagination
+
+
+class ConditionalResponseMixin:
+    """Answer repeat GETs with 304 Not Modified before the page is serialised.
+
+    The validator comes from the rows the response would render: one narrow
+    query reads the primary key and ``updated_at`` of each row on the
+    requested page, plus ``updated_at`` of the related rows named in
+    ``conditional_related`` (whose names and times the body shows). It is
+    sliced and ordered exactly like the page, so it costs what the page
+    costs and never counts the whole table; numbered pages, whose body
+    carries a count, get it from a window function in the same query.
+
+    Only single objects also get ``Last-Modified``. A page's newest
+    ``updated_at`` does not move when one of its rows is deleted, so on
+    lists ``If-Modified-Since`` would answer 304 for a changed page; the
+    ETag, which covers the primary keys, does not.
+    """
+
+    conditional_timestamp_field = 'updated_at'
+    # Relations rendered in the body; a change to one of their rows changes the ETag.
+    conditional_related = ()
+
+    def validator_query(self, queryset, paginated=True):
+        """The rows behind the response as tuples, or None when the page cannot be predicted."""
+        timestamp = self.conditional_timestamp_field
+        fields = ['pk', timestamp] + [f'{relation}__{timestamp}' for relation in self.conditional_related]
+        paginator = self.paginator if paginated else None
+        if paginator is None:
+            return queryset.values_list(*fields)
+        if isinstance(paginator, KeysetPagination):
+            queryset = paginator.seek_queryset(queryset, self.request, self)
+            if paginator.page_number is None:
+                return queryset.values_list(*fields)[:paginator.page_size + 1]
+        page_size = paginator.page_size
+        try:
+            number = int(self.request.query_params.get('page', 1))
+        except ValueError:
+            return None
+        if number < 1:
+            return None
+        queryset = queryset.annotate(validator_total=Window(Count('pk')))
+        return queryset.values_list(*fields, 'validator_total')[(number - 1) * page_size:number * page_size]
+
+    def get_validators(self, queryset, paginated=True):
+        query = self.validator_query(queryset, paginated)
+        return None if query is None else self.validators_from_rows(list(query), dated=not paginated)
+
+    async def aget_validators(self, queryset, paginated=True):
+        query = self.validator_query(queryset, paginated)
+        return None if query is None else self.validators_from_rows([row async for row in query], dated=not paginated)
+
+    def validators_from_rows(self, rows, dated=False):
+        timestamps = [value for row in rows for value in row[1:] if isinstance(value, datetime)]
+        last_modified = max(timestamps, default=None) if dated else None
+        fingerprint = '|'.join([
+            self.request.get_full_path(),
+            str(getattr(self.request.user, 'pk', '')),
+            repr([tuple(value.isoformat() if isinstance(value, datetime) else value for value in row) for row in rows]),
+        ])
+        etag = quote_etag(hashlib.sha1(fingerprint.encode()).hexdigest())
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    def conditional_response(self, queryset, render, paginated=True):
+        validators = self.get_validators(queryset, paginated)
+        if validators is None:
+            return render()
+        etag, last_modified = validators
+        response = get_conditional_response(self.request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = render()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        return self.add_validators(response, etag, last_modified)
+
+    async def aconditional_response(self, queryset, render, paginated=True):
+        """``conditional_response`` for async views; ``render`` is a coroutine function."""
+        validators = await self.aget_validators(queryset, paginated)
+        if validators is None:
+            return await render()
+        etag, last_modified = validators
+        response = get_conditional_response(self.request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await render()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        return self.add_validators(response, etag, last_modified)
+
+    def add_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+
+class ConditionalGetMixin(ConditionalResponseMixin):
+    """Conditional ``list`` and ``retrieve`` for model viewsets."""
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(queryset, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        render = partial(super().retrieve, request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, DjangoValidationError):
+            # Malformed lookup: let get_object() turn it into a 404.
+            return render()
+        return self.conditional_response(queryset, render, paginated=False)
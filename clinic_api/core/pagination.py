@@ -0,0 +1,184 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class NumberedPagination(PageNumberPagination):
+    """Page numbers whose previous link from page 2 says ``page=1``.
+
+    Plain ``PageNumberPagination`` drops the parameter there, which under
+    ``KeysetPagination`` would switch the client over to cursors.
+    """
+
+    def get_previous_link(self):
+        if not self.page.has_previous():
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page.previous_page_number())
+
+
+class KeysetPagination(BasePagination):
+    """Seek pagination over the view's ``keyset_ordering``.
+
+    Each page is fetched with ``WHERE (ordering) > (last row) LIMIT n`` so
+    deep pages cost the same as the first one and no ``COUNT(*)`` is run.
+    Views without a ``keyset_ordering``, requests passing ``?page=`` and
+    requests choosing their own ``?ordering=`` use page numbers instead.
+    Views opt in with ``pagination_class``; the default stays page numbers.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    page_query_param = 'page'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.seek_queryset(queryset, request, view)
+        if self.page_number is not None:
+            return self.page_number.paginate_queryset(queryset, request, view)
+        return self.page_rows(list(queryset[:self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views, fetching rows with the async ORM."""
+        queryset = self.seek_queryset(queryset, request, view)
+        if self.page_number is not None:
+            return await sync_to_async(self.page_number.paginate_queryset)(queryset, request, view)
+        return self.page_rows([row async for row in queryset[:self.page_size + 1]])
+
+    def seek_queryset(self, queryset, request, view):
+        """Order and filter ``queryset`` to the requested page, or set up page numbers."""
+        self.request = request
+        self.page_number = None
+        ordering = getattr(view, 'keyset_ordering', None)
+        params = request.query_params
+        if not ordering or self.page_query_param in params or params.get(api_settings.ORDERING_PARAM):
+            self.page_number = NumberedPagination()
+            self.page_number.page_size = self.page_size
+            return queryset
+
+        self.fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in ordering]
+        self.position, self.reverse = self.decode_cursor(params.get(self.cursor_query_param))
+
+        order_by = [self._flip(name) if self.reverse else name for name in ordering]
+        queryset = queryset.order_by(*order_by)
+        if self.position is not None:
+            queryset = queryset.filter(self.seek_filter(order_by, self.position))
+        return queryset
+
+    def page_rows(self, rows):
+        """Trim the ``page_size + 1`` fetched rows to a page and work out its links."""
+        position, reverse = self.position, self.reverse
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_position = self.previous_position = None
+        if rows and (has_more if not reverse else position is not None):
+            self.next_position = self.get_position(rows[-1])
+        if rows and (has_more if reverse else position is not None):
+            self.previous_position = self.get_position(rows[0])
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.page_number is not None:
+            return self.page_number.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'description': 'Only present with ?page='},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor taken from a previous next/previous link.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Switch to numbered pages (runs a COUNT query).',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+    def get_next_link(self):
+        return self._link(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        return self._link(self.previous_position, reverse=True)
+
+    def get_position(self, row):
+        if isinstance(row, dict):
+            return [row[field.attname] if field.attname in row else row[field.name] for field in self.fields]
+        return [getattr(row, field.attname) for field in self.fields]
+
+    def seek_filter(self, order_by, position):
+        """Rows strictly after ``position`` in ``order_by`` order.
+
+        The leading ``>=``/``<=`` bound lets the database seek the
+        composite index; the OR chain breaks ties on the later columns.
+        """
+        lookups = [('lt' if name.startswith('-') else 'gt', name.lstrip('-')) for name in order_by]
+        first_lookup, first_name = lookups[0]
+        condition = Q()
+        equal = Q()
+        for (lookup, name), value in zip(lookups, position):
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return Q(**{f'{first_name}__{first_lookup}e': position[0]}) & condition
+
+    def encode_cursor(self, position, reverse):
+        # isoformat() keeps microseconds, which DjangoJSONEncoder would truncate.
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        payload = json.dumps({'p': values, 'r': reverse}, separators=(',', ':'))
+        return urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, encoded):
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            values = payload['p']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [field.to_python(value) for field, value in zip(self.fields, values)]
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, BinasciiError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _link(self, position, reverse):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    @staticmethod
+    def _flip(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
@@ -0,0 +1,260 @@
+import cProfile
+import heapq
+import os
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Sample of the request being profiled; None when profiling is off.
+_current_sample = ContextVar('profiling_sample', default=None)
+
+
+def profiling_setting(name, default):
+    return getattr(settings, f'PROFILING_{name}', default)
+
+
+def route_labels(request):
+    """``(route, action, method)`` for a request, e.g. ``('appointment-list', 'create', 'POST')``."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved', '', request.method
+    actions = getattr(match.func, 'actions', None) or {}
+    return match.view_name or match.route, actions.get(request.method.lower(), ''), request.method
+
+
+class RequestSample:
+    """Timings collected for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.render_seconds = 0.0
+        self.serializing = False
+        self.queries = 0
+        self.statements = set()
+        self._render_started = None
+
+    @property
+    def duplicates(self):
+        return self.queries - len(self.statements)
+
+    @property
+    def wall_seconds(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper() for the whole request.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+            self.statements.add((sql, repr(params)))
+
+    def server_timing(self):
+        duplicates = f', {self.duplicates} duplicate' if self.duplicates else ''
+        app = self.wall_seconds - self.db_seconds - self.serialize_seconds - self.render_seconds
+        return ', '.join([
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries{duplicates}"',
+            f'serialize;dur={self.serialize_seconds * 1000:.2f}',
+            f'render;dur={self.render_seconds * 1000:.2f}',
+            f'app;dur={max(app, 0) * 1000:.2f}',
+            f'total;dur={self.wall_seconds * 1000:.2f}',
+        ])
+
+
+class TimedSerializerMixin:
+    """Add a serializer's ``to_representation`` time to the profiled request's ``serialize``.
+
+    Only the outermost call is timed, so nested serializers and list items
+    are not counted twice, and queries it triggers stay under ``db``.
+    """
+
+    def to_representation(self, instance):
+        sample = _current_sample.get()
+        if sample is None or sample.serializing:
+            return super().to_representation(instance)
+        sample.serializing = True
+        db_seconds, started = sample.db_seconds, time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            sample.serialize_seconds += time.perf_counter() - started - (sample.db_seconds - db_seconds)
+            sample.serializing = False
+
+
+class MetricsRegistry:
+    """Per-process aggregates keyed by ``(route, action, method)``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def observe(self, labels, sample):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {
+                    'count': 0, 'wall': 0.0, 'db': 0.0, 'serialize': 0.0, 'render': 0.0, 'queries': 0,
+                    'duplicates': 0,
+                    'buckets': [0] * len(DURATION_BUCKETS),
+                }
+            series['count'] += 1
+            series['wall'] += sample.wall_seconds
+            series['db'] += sample.db_seconds
+            series['serialize'] += sample.serialize_seconds
+            series['render'] += sample.render_seconds
+            series['queries'] += sample.queries
+            series['duplicates'] += sample.duplicates
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if sample.wall_seconds <= bound:
+                    series['buckets'][i] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: {**series, 'buckets': list(series['buckets'])} for labels, series in self._series.items()}
+
+
+registry = MetricsRegistry()
+
+
+def escape_label(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def format_labels(**labels):
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + '}'
+
+
+def prometheus_metrics(snapshot):
+    """Render a registry snapshot in the Prometheus text exposition format."""
+    lines = [
+        '# HELP clinic_request_duration_seconds Wall time per request.',
+        '# TYPE clinic_request_duration_seconds histogram',
+    ]
+    totals = [
+        ('db_seconds', 'db', 'Time spent in database queries.'),
+        ('serialize_seconds', 'serialize', 'Time spent serializing response data, excluding its queries.'),
+        ('render_seconds', 'render', 'Time spent rendering response bodies.'),
+        ('queries', 'queries', 'Database queries issued.'),
+        ('duplicate_queries', 'duplicates', 'Queries repeating an earlier statement and parameters of the same request.'),
+    ]
+    for (route, action, method), series in sorted(snapshot.items()):
+        labels = {'route': route, 'action': action, 'method': method}
+        for bound, count in zip(DURATION_BUCKETS, series['buckets']):
+            lines.append(f'clinic_request_duration_seconds_bucket{format_labels(**labels, le=bound)} {count}')
+        lines.append(f'clinic_request_duration_seconds_bucket{format_labels(**labels, le="+Inf")} {series["count"]}')
+        lines.append(f'clinic_request_duration_seconds_sum{format_labels(**labels)} {series["wall"]:.6f}')
+        lines.append(f'clinic_request_duration_seconds_count{format_labels(**labels)} {series["count"]}')
+    for name, key, help_text in totals:
+        lines.append(f'# HELP clinic_request_{name}_total {help_text}')
+        lines.append(f'# TYPE clinic_request_{name}_total counter')
+        for (route, action, method), series in sorted(snapshot.items()):
+            labels = format_labels(route=route, action=action, method=method)
+            value = series[key]
+            lines.append(f'clinic_request_{name}_total{labels} {value:.6f}' if isinstance(value, float)
+                         else f'clinic_request_{name}_total{labels} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class SlowRequestDumps:
+    """Keep cProfile dumps of the ``keep`` slowest sampled requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kept = []
+
+    def reset(self):
+        with self._lock:
+            self._kept = []
+
+    def offer(self, profiler, labels, wall_seconds):
+        directory = profiling_setting('DUMP_DIR', 'profiles')
+        keep = profiling_setting('DUMP_KEEP', 20)
+        with self._lock:
+            if len(self._kept) >= keep and wall_seconds <= self._kept[0][0]:
+                return None
+            os.makedirs(directory, exist_ok=True)
+            name = re.sub(r'[^\w.-]+', '_', '-'.join(filter(None, labels)))
+            path = os.path.join(directory, f'{int(time.time() * 1000)}-{name}-{wall_seconds * 1000:.0f}ms.prof')
+            profiler.dump_stats(path)
+            heapq.heappush(self._kept, (wall_seconds, path))
+            while len(self._kept) > keep:
+                _, evicted = heapq.heappop(self._kept)
+                try:
+                    os.remove(evicted)
+                except FileNotFoundError:
+                    pass
+            return path
+
+
+slow_requests = SlowRequestDumps()
+
+
+class RequestProfilingMiddleware:
+    """Opt-in request profiling; enabled with ``PROFILING_ENABLED``.
+
+    Records wall time, DB time, query and duplicate-query counts,
+    serialization time (of serializers with ``TimedSerializerMixin``) and
+    response rendering time per route and viewset action. Each response
+    carries a ``Server-Timing`` header and the aggregates are served from
+    ``/metrics/``. With ``PROFILING_SAMPLE_RATE`` above zero a share of
+    requests also run under cProfile, and those slower than
+    ``PROFILING_SLOW_MS`` are dumped to ``PROFILING_DUMP_DIR``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample = request._profiling_sample = RequestSample()
+        token = _current_sample.set(sample)
+        profiler = None
+        if random.random() < profiling_setting('SAMPLE_RATE', 0.0):
+            profiler = cProfile.Profile()
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(sample))
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                _current_sample.reset(token)
+        sample.finished = time.perf_counter()
+
+        labels = route_labels(request)
+        registry.observe(labels, sample)
+        response['Server-Timing'] = sample.server_timing()
+        if profiler is not None and sample.wall_seconds * 1000 >= profiling_setting('SLOW_MS', 500):
+            slow_requests.offer(profiler, labels, sample.wall_seconds)
+        return response
+
+    def process_template_response(self, request, response):
+        # Outermost middleware: this runs last, right before render().
+        sample = request._profiling_sample
+        sample._render_started = time.perf_counter()
+
+        def rendered(response):
+            sample.render_seconds += time.perf_counter() - sample._render_started
+
+        response.add_post_render_callback(rendered)
+        return response
@@ -27,6 +27,7 @@ INSTALLED_APPS = [
     'clinic_api.apps.doctors',
     'clinic_api.apps.patients',
     'clinic_api.apps.appointments',
+    'clinic_api.apps.tasks',
 ]
 
 MIDDLEWARE = [
@@ -39,7 +40,24 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'clinic_api.core.urls'
+# Opt-in request profiling: Server-Timing headers and /metrics/ aggregates.
+# A PROFILING_SAMPLE_RATE share of requests also run under cProfile; those
+# slower than PROFILING_SLOW_MS are dumped to PROFILING_DUMP_DIR, keeping
+# the PROFILING_DUMP_KEEP slowest.
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_SLOW_MS = config('PROFILING_SLOW_MS', default=500, cast=int)
+PROFILING_DUMP_DIR = config('PROFILING_DUMP_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+PROFILING_DUMP_KEEP = config('PROFILING_DUMP_KEEP', default=20, cast=int)
+
+if PROFILING_ENABLED:
+    MIDDLEWARE.insert(0, 'clinic_api.core.profiling.RequestProfilingMiddleware')
+
+# The ASGI entry point turns this on to serve the doctor directory, timeslot
+# list and appointments/me from async views.
+ASYNC_READ_VIEWS = config('ASYNC_READ_VIEWS', default=False, cast=bool)
+
+ROOT_URLCONF = 'clinic_api.core.async_urls' if ASYNC_READ_VIEWS else 'clinic_api.core.urls'
 
 TEMPLATES = [
     {
@@ -58,6 +76,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'clinic_api.core.wsgi.application'
+ASGI_APPLICATION = 'clinic_api.core.asgi.application'
 
 DATABASES = {
     'default': {
@@ -67,9 +86,45 @@ DATABASES = {
         'PASSWORD': config('DATABASE_PASSWORD', default=''),
         'HOST': config('DATABASE_HOST', default=''),
         'PORT': config('DATABASE_PORT', default=''),
+        # Keep connections open between requests (seconds; 0 closes them after
+        # every request) and ping reused ones first so a dropped connection
+        # costs a reconnect instead of a failed request. Under ASGI (where
+        # ASYNC_READ_VIEWS is on) connections belong to whichever worker
+        # thread ran the sync code and are never closed by a request of their
+        # own, so persistent ones pile up: the default there is 0 and pooling
+        # is left to a pooler such as PgBouncer.
+        'CONN_MAX_AGE': config('DATABASE_CONN_MAX_AGE', default=0 if ASYNC_READ_VIEWS else 60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DATABASE_CONN_HEALTH_CHECKS', default=True, cast=bool),
     }
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['OPTIONS'] = {
+        'connect_timeout': config('DATABASE_CONNECT_TIMEOUT', default=5, cast=int),
+        'sslmode': config('DATABASE_SSLMODE', default='prefer'),
+    }
+    # Behind PgBouncer in transaction pooling mode a server-side cursor can
+    # outlive the server connection it was opened on, so .iterator() must
+    # fall back to client-side cursors.
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = config('DATABASE_PGBOUNCER', default=False, cast=bool)
+
+# Read replicas: hosts (or SQLite files) sharing the primary's other settings.
+# Safe requests read from one of them; see clinic_api.core.db_routers.
+DATABASE_REPLICAS = config('DATABASE_REPLICAS', default='', cast=lambda value: [v.strip() for v in value.split(',') if v.strip()])
+for index, location in enumerate(DATABASE_REPLICAS, 1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'NAME' if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3' else 'HOST': location,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICA_ALIASES = [f'replica{index}' for index in range(1, len(DATABASE_REPLICAS) + 1)]
+DATABASE_ROUTERS = ['clinic_api.core.db_routers.PrimaryReplicaRouter']
+# How long a client keeps reading from the primary after a write.
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
+
+if DATABASE_REPLICA_ALIASES:
+    MIDDLEWARE.insert(0, 'clinic_api.core.db_routers.ReplicaRoutingMiddleware')
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -85,6 +140,33 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# The first hasher stores new and rehashed passwords; the rest only verify
+# existing hashes, which Django upgrades on the next successful login.
+# argon2 and bcrypt need the argon2-cffi / bcrypt packages installed.
+PASSWORD_HASHER_POLICIES = {
+    'pbkdf2': 'clinic_api.apps.users.hashers.TunedPBKDF2PasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'bcrypt': 'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHER = config('PASSWORD_HASHER', default='pbkdf2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_POLICIES[PASSWORD_HASHER]] + [
+    path for name, path in PASSWORD_HASHER_POLICIES.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_PBKDF2_ITERATIONS = config('PASSWORD_PBKDF2_ITERATIONS', default=600000, cast=int)
+
+# Failed logins allowed per client (username + IP) / per IP before that
+# client / IP is refused for LOGIN_LOCKOUT_SECONDS without checking the password.
+LOGIN_MAX_FAILURES_PER_CLIENT = config('LOGIN_MAX_FAILURES_PER_CLIENT', default=5, cast=int)
+LOGIN_MAX_FAILURES_PER_IP = config('LOGIN_MAX_FAILURES_PER_IP', default=50, cast=int)
+LOGIN_LOCKOUT_SECONDS = config('LOGIN_LOCKOUT_SECONDS', default=900, cast=int)
+# Failures against one username from anywhere never lock it; past this many
+# it takes one attempt per LOGIN_SLOWDOWN_SECONDS.
+LOGIN_SLOWDOWN_AFTER_FAILURES = config('LOGIN_SLOWDOWN_AFTER_FAILURES', default=5, cast=int)
+LOGIN_SLOWDOWN_SECONDS = config('LOGIN_SLOWDOWN_SECONDS', default=5, cast=int)
+
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
@@ -99,9 +181,64 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'users.User'
 
+TEST_RUNNER = 'clinic_api.tests.runner.ClinicTestRunner'
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='clinic-api'),
+    }
+}
+
+DOCTOR_DIRECTORY_CACHE_TIMEOUT = config('DOCTOR_DIRECTORY_CACHE_TIMEOUT', default=300, cast=int)
+
+# Background jobs (clinic_api.apps.tasks.queue). 'thread' runs them on a pool
+# in the web process after commit and polls the job table every
+# TASKS_POLL_INTERVAL seconds for retries and reclaimed jobs, 'worker' leaves
+# them to `manage.py run_task_workers`, 'local' runs them inline (the test
+# runner, clinic_api.tests.runner, switches to it). Every web process polls:
+# with many of them, or with run_task_workers running, set the interval to 0
+# on most or all of them.
+TASKS_RUNNER = config('TASKS_RUNNER', default='thread')
+TASKS_THREADS = config('TASKS_THREADS', default=4, cast=int)
+TASKS_POLL_INTERVAL = config('TASKS_POLL_INTERVAL', default=10.0, cast=float)
+# First retry after this many seconds, doubling on each further attempt.
+TASKS_RETRY_DELAY = config('TASKS_RETRY_DELAY', default=10, cast=int)
+# A running job whose runner has been silent this long is handed to another worker;
+# runners renew their lock every third of it.
+TASKS_LOCK_TIMEOUT = config('TASKS_LOCK_TIMEOUT', default=300, cast=int)
+TASKS_RETENTION_DAYS = config('TASKS_RETENTION_DAYS', default=7, cast=int)
+
+# Rows fetched per round trip (and written per chunk) by the streaming exports.
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Request budgets per endpoint group (clinic_api.core.throttling): per caller
+# by role ('anon' = unauthenticated, per IP) and 'total' across all callers,
+# as 'count/period' with period s, m, h or d. Missing roles are unlimited.
+# 'total' budgets are only exact with a cache shared by every process; under
+# LocMemCache each process enforces its own, so the effective bound is
+# approximate (budget x processes). Logins have none, so a flood cannot lock
+# everyone out.
+# The test runner switches it off; the throttling tests switch it back on.
+THROTTLE_ENABLED = config('THROTTLE_ENABLED', default=True, cast=bool)
+THROTTLE_RATES = {
+    'booking': {
+        'patient': config('THROTTLE_BOOKING_PATIENT', default='10/m'),
+        'total': config('THROTTLE_BOOKING_TOTAL', default='50/s'),
+    },
+    'availability': {
+        'patient': config('THROTTLE_AVAILABILITY_PATIENT', default='60/m'),
+        'doctor': config('THROTTLE_AVAILABILITY_DOCTOR', default='120/m'),
+        'total': config('THROTTLE_AVAILABILITY_TOTAL', default='200/s'),
+    },
+    'login': {
+        'anon': config('THROTTLE_LOGIN_ANON', default='20/m'),
+    },
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'clinic_api.apps.users.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -134,6 +271,8 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'USER_AUTHENTICATION_RULE': 'rest_framework_simplejwt.authentication.default_user_authentication_rule',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'TOKEN_OBTAIN_SERIALIZER': 'clinic_api.apps.users.serializers.ClinicTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'clinic_api.apps.users.serializers.ClinicTokenRefreshSerializer',
     'TOKEN_TYPE_CLAIM': 'token_type',
     'JTI_CLAIM': 'jti',
 }
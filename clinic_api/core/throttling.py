@@ -0,0 +1,147 @@
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger('clinic_api.throttling')
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Backends that keep their entries inside one process.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def parse_rate(rate):
+    """``'10/min'`` -> ``(10, 60)``; ``None`` means unlimited."""
+    if rate is None:
+        return None
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def throttle_rates(scope):
+    if not getattr(settings, 'THROTTLE_ENABLED', True):
+        return {}
+    return getattr(settings, 'THROTTLE_RATES', {}).get(scope, {})
+
+
+def cache_is_shared():
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+_warned_scopes = set()
+
+
+class SlidingWindow:
+    """A sliding-window request counter kept in the cache.
+
+    The estimate is this window's count plus the previous window's count
+    weighted by how much of it still overlaps the last ``period`` seconds.
+    A request is counted first and taken back if it pushed the estimate
+    over the limit, so concurrent requests cannot overshoot as long as the
+    cache's ``incr`` is atomic.
+    """
+
+    def __init__(self, key, limit, period):
+        self.key = key
+        self.limit = limit
+        self.period = period
+
+    def _counter(self, index):
+        return f'{self.key}:{index}'
+
+    def acquire(self, now):
+        """Count a request at ``now``; return None if admitted, else seconds to wait."""
+        index, elapsed = divmod(now, self.period)
+        self.index = int(index)
+        current = self._counter(self.index)
+        cache.add(current, 0, self.period * 2)
+        try:
+            count = cache.incr(current)
+        except ValueError:
+            # Expired between add() and incr(); start a new window.
+            cache.set(current, 1, self.period * 2)
+            count = 1
+        previous = cache.get(self._counter(self.index - 1)) or 0
+        remaining = self.period - elapsed
+        if previous * remaining / self.period + count <= self.limit:
+            return None
+        self.release()
+        # The previous window's share fades linearly across the current one.
+        if count > self.limit:
+            # This window is full: it has to become the previous one and fade enough.
+            return max(1, math.ceil(remaining + self.period * (1 - (self.limit - 1) / (count - 1))))
+        return max(1, math.ceil(remaining - (self.limit - count) * self.period / previous))
+
+    def release(self):
+        try:
+            cache.decr(self._counter(self.index))
+        except ValueError:
+            pass
+
+
+class RoleRateThrottle(BaseThrottle):
+    """Throttle one endpoint group (``scope``) by the caller's role.
+
+    ``THROTTLE_RATES[scope]`` maps a role (``'anon'`` for unauthenticated
+    clients, counted per IP) to a per-user rate, plus an optional
+    ``'total'`` rate shared by every caller, which is what bounds the load
+    the endpoint can put on the database. Rates are read on every request
+    and the counters live in the default cache. With a per-process cache the
+    ``'total'`` budget is still enforced, but by each worker on its own, so
+    the real bound is the budget times the number of processes; a warning
+    says so once per scope.
+    """
+
+    scope = None
+    timer = time.time
+
+    def allow_request(self, request, view):
+        rates = throttle_rates(self.scope)
+        user = request.user
+        if user is not None and user.is_authenticated:
+            role, ident = user.role, f'user:{user.pk}'
+        else:
+            role, ident = 'anon', f'ip:{self.get_ident(request)}'
+
+        budgets = [(role, ident), ('total', 'all')]
+        if 'total' in rates and self.scope not in _warned_scopes and not cache_is_shared():
+            _warned_scopes.add(self.scope)
+            logger.warning('The %s total budget is counted per process: the default cache is not shared',
+                           self.scope)
+        windows = []
+        for name, who in budgets:
+            rate = parse_rate(rates.get(name))
+            if rate is not None:
+                windows.append(SlidingWindow(f'throttle:{self.scope}:{who}', *rate))
+
+        now = self.timer()
+        admitted = []
+        for window in windows:
+            self.wait_seconds = window.acquire(now)
+            if self.wait_seconds is not None:
+                for earlier in admitted:
+                    earlier.release()
+                return False
+            admitted.append(window)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class BookingThrottle(RoleRateThrottle):
+    scope = 'booking'
+
+
+class AvailabilityThrottle(RoleRateThrottle):
+    scope = 'availability'
+
+
+class LoginThrottle(RoleRateThrottle):
+    scope = 'login'
@@ -3,27 +3,36 @@ from django.urls import path
 from rest_framework.routers import DefaultRouter
 
 from clinic_api.apps.users.views import (
+    LoginView,
     UserViewSet,
     UserRegistrationView,
     DoctorViewSet,
 )
-from clinic_api.apps.doctors.views import TimeSlotViewSet
+from clinic_api.apps.doctors.views import TimeSlotViewSet, DoctorDaySummaryViewSet, AvailabilityView
 from clinic_api.apps.appointments.views import AppointmentViewSet
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from clinic_api.core.views import MetricsView
+from rest_framework_simplejwt.views import TokenRefreshView
 
-router = DefaultRouter()
-router.register(r'users', UserViewSet, basename='user')
-router.register(r'doctors', DoctorViewSet, basename='doctor')
-router.register(r'timeslots', TimeSlotViewSet, basename='timeslot')
-router.register(r'appointments', AppointmentViewSet, basename='appointment')
 
-urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('auth/register/', UserRegistrationView.as_view(), name='auth-register'),
-    path('auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('auth/me/', UserViewSet.as_view({'get': 'me'}), name='auth-me'),
-]
+def api_urlpatterns(doctor_viewset=DoctorViewSet, timeslot_viewset=TimeSlotViewSet,
+                    appointment_viewset=AppointmentViewSet):
+    """URL patterns for the API; the ASGI urlconf swaps in the async read viewsets."""
+    router = DefaultRouter()
+    router.register(r'users', UserViewSet, basename='user')
+    router.register(r'doctors', doctor_viewset, basename='doctor')
+    router.register(r'timeslots', timeslot_viewset, basename='timeslot')
+    router.register(r'appointments', appointment_viewset, basename='appointment')
+    router.register(r'day-summaries', DoctorDaySummaryViewSet, basename='day-summary')
 
-urlpatterns += router.urls
+    return [
+        path('admin/', admin.site.urls),
+        path('auth/register/', UserRegistrationView.as_view(), name='auth-register'),
+        path('auth/login/', LoginView.as_view(), name='token_obtain_pair'),
+        path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+        path('auth/me/', UserViewSet.as_view({'get': 'me'}), name='auth-me'),
+        path('availability/', AvailabilityView.as_view(), name='availability'),
+        path('metrics/', MetricsView.as_view(), name='metrics'),
+    ] + router.urls
 
+
+urlpatterns = api_urlpatterns()
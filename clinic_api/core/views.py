@@ -0,0 +1,31 @@
+from django.http import HttpResponse
+from rest_framework.views import APIView
+
+from clinic_api.apps.users.login import login_metrics
+from clinic_api.apps.users.permissions import IsAdmin
+from clinic_api.core.profiling import prometheus_metrics, registry
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def prometheus_login_metrics():
+    metrics = login_metrics()
+    lines = []
+    for name in ('attempts', 'succeeded', 'failed', 'locked_out', 'slowed_down'):
+        lines += [f'# TYPE clinic_login_{name}_total counter', f'clinic_login_{name}_total {metrics[name]}']
+    lines += [
+        '# HELP clinic_login_authenticate_seconds_total Time spent authenticating logins, mostly password hashing.',
+        '# TYPE clinic_login_authenticate_seconds_total counter',
+        f'clinic_login_authenticate_seconds_total {metrics["authenticate_us"] / 1e6:.6f}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsView(APIView):
+    """Request and login metrics in the Prometheus text format (admins only)."""
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        body = prometheus_metrics(registry.snapshot()) + prometheus_login_metrics()
+        return HttpResponse(body, content_type=PROMETHEUS_CONTENT_TYPE)
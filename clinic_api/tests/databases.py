@@ -0,0 +1,49 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.db import connection
+
+
+class FileDatabaseMixin:
+    """Run a ``TransactionTestCase`` class against a file copy of the SQLite test database.
+
+    The default SQLite test database lives in memory, where connections
+    from other threads share tables through locks that fail at once instead
+    of waiting, and closing a connection does nothing. Tests that use
+    threads, open their own connections or copy the database file need a
+    real file, waiting up to ``sqlite_timeout`` seconds on its write lock
+    like a server would. Other backends are left alone.
+    """
+
+    sqlite_timeout = 20
+
+    @classmethod
+    def setUpClass(cls):
+        cls.moved_database = connection.vendor == 'sqlite' and connection.is_in_memory_db()
+        if cls.moved_database:
+            settings_dict = connection.settings_dict
+            cls.memory_database = settings_dict['NAME'], settings_dict['OPTIONS']
+            cls.database_dir = tempfile.mkdtemp()
+            path = os.path.join(cls.database_dir, 'test.sqlite3')
+            connection.ensure_connection()
+            # Keeps the in-memory database alive while Django's connection points elsewhere.
+            cls.memory_keeper = sqlite3.connect(settings_dict['NAME'], uri=True)
+            copy = sqlite3.connect(path)
+            cls.memory_keeper.backup(copy)
+            copy.close()
+            settings_dict['NAME'] = path
+            settings_dict['OPTIONS'] = {**settings_dict['OPTIONS'], 'timeout': cls.sqlite_timeout}
+            connection.close()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if cls.moved_database:
+            connection.close()
+            connection.settings_dict['NAME'], connection.settings_dict['OPTIONS'] = cls.memory_database
+            connection.ensure_connection()
+            cls.memory_keeper.close()
+            shutil.rmtree(cls.database_dir, ignore_errors=True)
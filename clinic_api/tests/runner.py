@@ -0,0 +1,26 @@
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class ClinicTestRunner(DiscoverRunner):
+    """Run the suite with settings suited to tests, whatever the environment says.
+
+    Background jobs run inline right after commit and request budgets are
+    off; tests that exercise either override the setting themselves. The
+    suite is one process, so its local cache counts as shared.
+    """
+
+    test_settings = {
+        'TASKS_RUNNER': 'local',
+        'THROTTLE_ENABLED': False,
+        'SILENCED_SYSTEM_CHECKS': ['users.W001'],
+    }
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.overridden_settings = override_settings(**self.test_settings)
+        self.overridden_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.overridden_settings.disable()
+        super().teardown_test_environment(**kwargs)
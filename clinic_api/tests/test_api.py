@@ -1,12 +1,25 @@
+import json
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from django.test import TestCase, TransactionTestCase, override_settings
 from rest_framework.test import APITestCase
 from django.utils import timezone
 from datetime import date, time, timedelta
 
+from clinic_api.apps.users.checks import check_user_state_cache
+from clinic_api.apps.users.login import LoginAttemptLimiter, login_metrics
 from clinic_api.apps.users.models import User
-from clinic_api.apps.doctors.models import TimeSlot
+from clinic_api.apps.doctors.models import DoctorProfile, TimeSlot
 from clinic_api.apps.appointments.models import Appointment
+from clinic_api.apps.appointments.serializers import AppointmentStatusUpdateSerializer
+from clinic_api.apps.appointments.services import book_timeslot
+from clinic_api.tests.databases import FileDatabaseMixin
 
 
 def create_user(username, role, password='pass1234'):
@@ -16,6 +29,7 @@ def create_user(username, role, password='pass1234'):
 class ClinicAPITestCase(APITestCase):
 
     def setUp(self):
+        cache.clear()
         self.doctor = create_user('drsmith', 'doctor')
         self.patient = create_user('alice', 'patient')
         self.admin = create_user('admin', 'admin')
@@ -57,7 +71,7 @@ class ClinicAPITestCase(APITestCase):
         appt_id = r.data['id']
 
         r = self.client.post(appt_url, {'doctor': self.doctor.id, 'timeslot': timeslot_id})
-        self.assertEqual(r.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(r.status_code, status.HTTP_409_CONFLICT)
 
         self.auth(self.doctor_token)
         r = self.client.get(reverse('appointment-detail', kwargs={'pk': appt_id}))
@@ -85,7 +99,192 @@ class ClinicAPITestCase(APITestCase):
         r = self.client.post(reverse('appointment-list'), {'doctor': self.doctor.id, 'timeslot': ts})
         self.assertEqual(r.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_doctor_bulk_creates_timeslots_with_conflicts(self):
+        self.auth(self.doctor_token)
+        monday = date.today() + timedelta(days=7 - date.today().weekday())
+        TimeSlot.objects.create(doctor=self.doctor, date=monday, start_time=time(9, 15), end_time=time(9, 45))
+        data = {
+            'start_date': monday.isoformat(),
+            'weeks': 13,
+            'weekdays': [0, 1, 2, 3, 4],
+            'day_start': '09:00',
+            'day_end': '17:00',
+            'slot_minutes': 30,
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.post(reverse('timeslot-bulk'), data, format='json')
+        self.assertEqual(r.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(r.data['created']), 13 * 5 * 16 - 2)
+        self.assertEqual([c['start_time'] for c in r.data['conflicts']], ['09:00:00', '09:30:00'])
+        self.assertLessEqual(len(ctx.captured_queries), 15)
+        self.assertEqual(TimeSlot.objects.filter(doctor=self.doctor).count(), 13 * 5 * 16 - 1)
+
+    def test_doctor_directory_is_cached_and_revalidated(self):
+        DoctorProfile.objects.create(user=self.doctor, specialization='Cardiology', gender='female')
+        self.auth(self.patient_token)
+        url = reverse('doctor-list')
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+        self.assertEqual(cached.data, first.data)
+
+        with self.assertNumQueries(0):
+            r = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(r.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # The version moves when the change commits, not before.
+        with self.captureOnCommitCallbacks(execute=True):
+            DoctorProfile.objects.filter(user=self.doctor).get().save()
+            r = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(r.status_code, status.HTTP_304_NOT_MODIFIED)
+        r = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(r['ETag'], first['ETag'])
+
+    def test_token_claims_follow_user_changes(self):
+        refresh = self.client.post(reverse('token_obtain_pair'), {'username': 'alice', 'password': 'pass1234'}).data['refresh']
+        self.auth(self.patient_token)
+        # Validators and the page; the user comes from the token.
+        with self.assertNumQueries(2):
+            r = self.client.get(reverse('appointment-me'))
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+
+        self.patient.first_name = 'Alicia'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.save()
+        r = self.client.post(reverse('token_refresh'), {'refresh': refresh})
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.auth(r.data['access'])
+        self.assertEqual(self.client.get(reverse('auth-me')).data['first_name'], 'Alicia')
+
+        self.patient.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.save()
+        self.auth(self.patient_token)
+        r = self.client.get(reverse('appointment-me'))
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+        r = self.client.post(reverse('token_refresh'), {'refresh': refresh})
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_queryset_updates_revoke_token_claims(self):
+        self.auth(self.patient_token)
+        User.objects.filter(pk=self.doctor.pk).update(last_login=timezone.now())
+        self.assertEqual(self.client.get(reverse('appointment-me')).status_code, status.HTTP_200_OK)
+        # Claims are published on commit: a rolled-back update leaves tokens alone.
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    User.objects.filter(username='alice').update(is_active=False)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(self.client.get(reverse('appointment-me')).status_code, status.HTTP_200_OK)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(username='alice').update(is_active=False)
+        r = self.client.get(reverse('appointment-me'))
+        self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_claims_need_a_shared_cache_outside_debug(self):
+        with override_settings(DEBUG=False):
+            self.assertEqual([error.id for error in check_user_state_cache(None)], ['users.W001'])
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}):
+                self.assertEqual(check_user_state_cache(None), [])
+        with override_settings(DEBUG=True):
+            self.assertEqual(check_user_state_cache(None), [])
+
+    @override_settings(LOGIN_MAX_FAILURES_PER_CLIENT=3, LOGIN_SLOWDOWN_AFTER_FAILURES=10)
+    def test_repeated_failed_logins_are_refused_without_hashing(self):
+        url = reverse('token_obtain_pair')
+        for _ in range(3):
+            r = self.client.post(url, {'username': 'Alice', 'password': 'wrong'})
+            self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED)
+        with self.assertNumQueries(0):
+            r = self.client.post(url, {'username': 'alice', 'password': 'pass1234'})
+        self.assertEqual(r.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(r['Retry-After']), 0)
+
+        self.obtain_token('drsmith', 'pass1234')
+        metrics = login_metrics()
+        self.assertEqual((metrics['failed'], metrics['locked_out']), (3, 1))
+        self.assertGreater(metrics['hashes_per_sec'], 0)
+
+        # The lock is on this client, not the account: its owner logs in from elsewhere.
+        r = self.client.post(url, {'username': 'alice', 'password': 'pass1234'}, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+
+    @override_settings(LOGIN_SLOWDOWN_AFTER_FAILURES=4, LOGIN_SLOWDOWN_SECONDS=30)
+    def test_failures_from_many_addresses_only_slow_a_username_down(self):
+        url = reverse('token_obtain_pair')
+        for n in range(8):
+            r = self.client.post(url, {'username': 'alice', 'password': 'wrong'}, REMOTE_ADDR=f'10.0.1.{n // 2}')
+            self.assertEqual(r.status_code, status.HTTP_401_UNAUTHORIZED if n < 5 else status.HTTP_429_TOO_MANY_REQUESTS)
+        r = self.client.post(url, {'username': 'alice', 'password': 'pass1234'}, REMOTE_ADDR='10.0.2.1')
+        self.assertEqual(r.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertLessEqual(int(r['Retry-After']), 30)
+
+        # Once the slot comes round again the right password gets in and clears the slowdown.
+        cache.delete(f'login:slow:{LoginAttemptLimiter("alice", None).username}')
+        r = self.client.post(url, {'username': 'alice', 'password': 'pass1234'}, REMOTE_ADDR='10.0.2.1')
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        r = self.client.post(url, {'username': 'alice', 'password': 'pass1234'}, REMOTE_ADDR='10.0.2.1')
+        self.assertEqual(r.status_code, status.HTTP_200_OK)
+        self.assertEqual(login_metrics()['slowed_down'], 4)
+
+    def test_login_rehashes_to_configured_iterations(self):
+        self.assertIn('$600000$', User.objects.get(pk=self.patient.pk).password)
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=1000):
+            self.obtain_token('alice', 'pass1234')
+        self.assertIn('$1000$', User.objects.get(pk=self.patient.pk).password)
+        self.obtain_token('alice', 'pass1234')
+
     def test_migration_and_models(self):
         self.assertTrue(User.objects.filter(username='drsmith').exists())
         self.assertTrue(TimeSlot.objects.count() >= 0)
         self.assertTrue(Appointment.objects.count() >= 0)
+
+
+class AppointmentWriteQueriesTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create(username='drsmith', email='drsmith@example.com', role='doctor')
+        cls.patient = User.objects.create(username='alice', email='alice@example.com', role='patient')
+        cls.timeslot = TimeSlot.objects.create(
+            doctor=cls.doctor, date=date.today() + timedelta(days=1), start_time=time(9, 0), end_time=time(10, 0)
+        )
+
+    def load(self, appointment):
+        return Appointment.objects.select_related('doctor', 'patient', 'timeslot').get(pk=appointment.pk)
+
+    def set_status(self, appointment, value):
+        serializer = AppointmentStatusUpdateSerializer(appointment, data={'status': value}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+    def test_create_confirm_cancel_query_counts(self):
+        # SAVEPOINT, claim UPDATE, INSERT, two job INSERTs, RELEASE SAVEPOINT
+        with self.assertNumQueries(6):
+            appointment = book_timeslot(self.patient, self.doctor, self.timeslot)
+
+        appointment = self.load(appointment)
+        # status UPDATE and its jobs only; the slot is already unavailable
+        with self.assertNumQueries(3):
+            self.set_status(appointment, 'confirmed')
+
+        appointment = self.load(appointment)
+        # status UPDATE plus freeing the slot, each with its jobs
+        with self.assertNumQueries(5):
+            self.set_status(appointment, 'cancelled')
+        self.assertTrue(TimeSlot.objects.get(pk=self.timeslot.pk).is_available)
+
+
+class ConnectionReuseTestCase(FileDatabaseMixin, TransactionTestCase):
+
+    def test_persistent_connections_survive_requests(self):
+        out = StringIO()
+        call_command('benchmark_connections', requests=5, stdout=out, stderr=StringIO())
+        variants = json.loads(out.getvalue())['variants']
+        self.assertEqual(variants['per_request']['connections_opened'], 5)
+        self.assertEqual(variants['persistent']['connections_opened'], 1)
+        self.assertEqual(variants['persistent_health_checked']['connections_opened'], 1)
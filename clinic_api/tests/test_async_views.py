@@ -0,0 +1,102 @@
+import asyncio
+from datetime import date, time, timedelta
+from unittest import mock
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from clinic_api.apps.users import cache as users_cache
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import DoctorProfile, TimeSlot
+from clinic_api.apps.appointments.services import book_timeslot
+from clinic_api.tests.clients import AuthenticatedClientMixin, bearer
+
+
+ASYNC_URLCONF = 'clinic_api.core.async_urls'
+
+
+def async_request(method, url, **kwargs):
+    """Send one request through the ASGI handler with the async urlconf."""
+    async def request():
+        return await getattr(AsyncClient(), method)(url, **kwargs)
+
+    with override_settings(ROOT_URLCONF=ASYNC_URLCONF):
+        return async_to_sync(request)()
+
+
+class AsyncReadViewsTestCase(AuthenticatedClientMixin, TestCase):
+    """The ASGI urlconf's async views answer exactly like the sync ones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create(username='drsmith', email='drsmith@example.com', role='doctor')
+        DoctorProfile.objects.create(user=cls.doctor, specialization='Cardiology', gender='female')
+        cls.patient = User.objects.create(username='alice', email='alice@example.com', role='patient')
+        tomorrow = date.today() + timedelta(days=1)
+        slots = [
+            TimeSlot.objects.create(doctor=cls.doctor, date=tomorrow, start_time=time(hour), end_time=time(hour, 30))
+            for hour in range(8, 20)
+        ]
+        for slot in slots[:3]:
+            book_timeslot(cls.patient, cls.doctor, slot)
+
+    def headers(self, user):
+        return {'HTTP_AUTHORIZATION': bearer(user)}
+
+    def get_async(self, url, user, **headers):
+        self.assertTrue(asyncio.iscoroutinefunction(resolve(urlsplit(url).path, urlconf=ASYNC_URLCONF).func))
+        authorization = self.headers(user)['HTTP_AUTHORIZATION']
+        return async_request('get', url, headers={'Authorization': authorization, **headers})
+
+    def test_async_reads_match_sync(self):
+        requests = [
+            (reverse('doctor-list'), self.patient),
+            (reverse('doctor-list') + '?search=Cardiology', self.patient),
+            (reverse('doctor-detail', kwargs={'pk': self.doctor.pk}), self.patient),
+            (reverse('doctor-timeslots', kwargs={'pk': self.doctor.pk}), self.patient),
+            (reverse('timeslot-list'), self.doctor),
+            (reverse('timeslot-list') + '?page=2', self.doctor),
+            (reverse('appointment-me'), self.patient),
+            (reverse('appointment-me'), self.doctor),
+        ]
+        # Clearing the cache reseeds the directory version from the clock; keep it still.
+        self.enterContext(mock.patch.object(users_cache, 'time', mock.Mock(time=lambda: 1_700_000_000)))
+        for url, user in requests:
+            with self.subTest(url=url, user=user.username):
+                cache.clear()
+                expected = self.client.get(url, **self.headers(user))
+                cache.clear()
+                response = self.get_async(url, user)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected.json())
+                self.assertEqual(response['ETag'], expected['ETag'])
+
+        next_url = urlsplit(self.get_async(reverse('timeslot-list'), self.doctor).json()['next'])
+        next_url = f'{next_url.path}?{next_url.query}'
+        self.assertEqual(
+            self.get_async(next_url, self.doctor).json(),
+            self.client.get(next_url, **self.headers(self.doctor)).json(),
+        )
+
+    def test_async_conditional_and_error_paths(self):
+        url = reverse('appointment-me')
+        first = self.get_async(url, self.patient)
+        self.assertEqual(self.get_async(url, self.patient, **{'If-None-Match': first['ETag']}).status_code, 304)
+        self.assertEqual(self.get_async(reverse('doctor-detail', kwargs={'pk': 0}), self.patient).status_code, 404)
+        self.assertEqual(self.get_async(reverse('timeslot-list'), self.patient).json()['results'], [])
+        self.assertEqual(async_request('get', reverse('appointment-me')).status_code, 401)
+
+    def test_sync_actions_still_work_on_async_viewsets(self):
+        response = async_request(
+            'post',
+            reverse('timeslot-list'),
+            data={'doctor': self.doctor.pk, 'date': (date.today() + timedelta(days=2)).isoformat(),
+                  'start_time': '09:00', 'end_time': '09:30'},
+            content_type='application/json',
+            headers={'Authorization': self.headers(self.doctor)['HTTP_AUTHORIZATION']},
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(TimeSlot.objects.filter(pk=response.json()['id'], is_available=True).exists())
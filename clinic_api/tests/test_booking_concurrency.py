@@ -0,0 +1,68 @@
+import sys
+import threading
+from collections import Counter
+from datetime import date, time, timedelta
+from time import perf_counter
+
+from django.db import connection
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import TimeSlot
+from clinic_api.apps.appointments.models import Appointment
+from clinic_api.tests.databases import FileDatabaseMixin
+from clinic_api.tests.test_api import create_user
+
+
+class ConcurrentBookingTestCase(FileDatabaseMixin, TransactionTestCase):
+
+    CLIENTS = 100
+
+    def setUp(self):
+        self.doctor = create_user('drsmith', 'doctor')
+        User.objects.bulk_create([
+            User(username=f'patient{i}', email=f'patient{i}@example.com', role='patient', password='!')
+            for i in range(self.CLIENTS)
+        ])
+        self.patients = list(User.objects.filter(role='patient'))
+        self.timeslot = TimeSlot.objects.create(
+            doctor=self.doctor,
+            date=date.today() + timedelta(days=1),
+            start_time=time(9, 0),
+            end_time=time(10, 0),
+        )
+
+    def test_many_clients_booking_one_slot(self):
+        url = reverse('appointment-list')
+        payload = {'doctor': self.doctor.id, 'timeslot': self.timeslot.id}
+        # The timer starts once every client is lined up at the barrier.
+        barrier = threading.Barrier(self.CLIENTS, action=lambda: started.append(perf_counter()))
+        codes, started = [None] * self.CLIENTS, []
+
+        def book(i, patient):
+            client = APIClient()
+            client.force_authenticate(patient)
+            try:
+                barrier.wait()
+                codes[i] = client.post(url, payload).status_code
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(i, p)) for i, p in enumerate(self.patients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = perf_counter() - started[0]
+        sys.stderr.write(
+            f'\n{self.CLIENTS} concurrent bookings of one slot in {elapsed:.3f}s '
+            f'({self.CLIENTS / elapsed:.1f} req/s) on {connection.vendor}\n'
+        )
+
+        # Losers of the race and latecomers who see the slot taken all get a conflict.
+        self.assertEqual(Counter(codes), {201: 1, 409: self.CLIENTS - 1})
+        self.assertEqual(Appointment.objects.filter(timeslot=self.timeslot).count(), 1)
+        self.timeslot.refresh_from_db()
+        self.assertFalse(self.timeslot.is_available)
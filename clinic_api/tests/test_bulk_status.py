@@ -0,0 +1,93 @@
+from datetime import date, time, timedelta
+
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import TimeSlot
+from clinic_api.apps.appointments.models import Appointment
+from clinic_api.tests.clients import AuthenticatedClientMixin
+
+
+class BulkStatusTestCase(AuthenticatedClientMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create(username='drsmith', email='drsmith@example.com', role='doctor')
+        cls.other = User.objects.create(username='drjones', email='drjones@example.com', role='doctor')
+        cls.patient = User.objects.create(username='alice', email='alice@example.com', role='patient')
+        cls.day = date.today() + timedelta(days=1)
+        cls.mine = [cls.book(cls.doctor, cls.day, hour) for hour in (9, 10, 11)]
+        cls.later = cls.book(cls.doctor, cls.day + timedelta(days=1), 9)
+        cls.theirs = cls.book(cls.other, cls.day, 9)
+
+    @staticmethod
+    def book(doctor, day, hour):
+        slot = TimeSlot.objects.create(doctor=doctor, date=day, start_time=time(hour), end_time=time(hour, 30))
+        # Appointment.save() takes the slot.
+        return Appointment.objects.create(doctor=doctor, patient=User.objects.get(username='alice'), timeslot=slot)
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.doctor)
+
+    def post(self, payload):
+        return self.client.post(reverse('appointment-bulk-status'), payload, format='json')
+
+    def statuses(self):
+        return dict(Appointment.objects.values_list('pk', 'status'))
+
+    def test_ids_report_per_id_outcomes_and_skip_foreign_appointments(self):
+        first, second, _ = self.mine
+        Appointment.objects.filter(pk=second.pk).update(status='cancelled')
+        response = self.post({'status': 'cancelled', 'ids': [first.pk, second.pk, self.theirs.pk, 999999]})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['results'], [
+            {'id': first.pk, 'outcome': 'updated'},
+            {'id': second.pk, 'outcome': 'unchanged'},
+            {'id': self.theirs.pk, 'outcome': 'not_found'},
+            {'id': 999999, 'outcome': 'not_found'},
+        ])
+        self.assertEqual(self.statuses()[self.theirs.pk], 'pending')
+        self.assertTrue(TimeSlot.objects.get(pk=first.timeslot_id).is_available)
+        self.assertFalse(TimeSlot.objects.get(pk=self.theirs.timeslot_id).is_available)
+
+    def test_filter_updates_a_day_with_set_based_queries(self):
+        # Lock-and-read, one UPDATE per table and the two follow-up jobs, inside a savepoint.
+        with self.assertNumQueries(7):
+            response = self.post({'status': 'confirmed', 'date': self.day.isoformat(), 'current_status': 'pending'})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(sorted(row['id'] for row in response.data['results']), [a.pk for a in self.mine])
+        statuses = self.statuses()
+        self.assertEqual({statuses[a.pk] for a in self.mine}, {'confirmed'})
+        self.assertEqual(statuses[self.later.pk], 'pending')
+        self.assertEqual(statuses[self.theirs.pk], 'pending')
+
+    def test_reactivating_a_cancellation_holds_the_slot_again(self):
+        self.post({'status': 'cancelled', 'ids': [self.later.pk]})
+        self.assertTrue(TimeSlot.objects.get(pk=self.later.timeslot_id).is_available)
+        self.post({'status': 'confirmed', 'ids': [self.later.pk]})
+        self.assertFalse(TimeSlot.objects.get(pk=self.later.timeslot_id).is_available)
+
+    def test_moves_outside_the_allowed_transitions_are_rejected_per_row(self):
+        first, second, third = self.mine
+        Appointment.objects.filter(pk=first.pk).update(status='confirmed')
+        Appointment.objects.filter(pk__in=[second.pk, third.pk]).update(status='cancelled')
+        # Both cancellations freed their slot, but the second one's has been taken since.
+        TimeSlot.objects.filter(pk=second.timeslot_id).update(is_available=True)
+        response = self.post({'status': 'pending', 'ids': [first.pk, second.pk, third.pk]})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['results'], [
+            {'id': first.pk, 'outcome': 'rejected'},
+            {'id': second.pk, 'outcome': 'updated'},
+            {'id': third.pk, 'outcome': 'rejected'},
+        ])
+        statuses = self.statuses()
+        self.assertEqual([statuses[a.pk] for a in self.mine], ['confirmed', 'pending', 'cancelled'])
+
+    def test_requires_a_selection_and_a_doctor(self):
+        self.assertEqual(self.post({'status': 'confirmed'}).status_code, 400)
+        self.authenticate(self.patient)
+        self.assertEqual(self.post({'status': 'cancelled', 'ids': [self.mine[0].pk]}).status_code, 403)
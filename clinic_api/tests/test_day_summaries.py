@@ -0,0 +1,133 @@
+from datetime import date, time, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import DoctorDaySummary, TimeSlot
+from clinic_api.apps.appointments.models import Appointment
+from clinic_api.apps.appointments.seed import seed
+from clinic_api.apps.doctors.summaries import refresh_day_summaries
+from clinic_api.tests.clients import AuthenticatedClientMixin
+
+
+def summary(doctor, day):
+    return DoctorDaySummary.objects.filter(doctor=doctor, date=day).values(
+        'total', 'available', 'pending', 'confirmed', 'cancelled',
+    ).first()
+
+
+class DaySummaryMaintenanceTestCase(AuthenticatedClientMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create(username='drsmith', email='drsmith@example.com', role='doctor')
+        cls.patient = User.objects.create(username='alice', email='alice@example.com', role='patient')
+        cls.day = date.today() + timedelta(days=1)
+
+    def test_api_writes_keep_the_summary_current(self):
+        self.authenticate(self.doctor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('timeslot-bulk'), {
+                'start_date': self.day.isoformat(), 'weeks': 1, 'weekdays': [self.day.weekday()],
+                'day_start': '09:00', 'day_end': '11:00', 'slot_minutes': 30,
+            }, format='json')
+        self.assertEqual(summary(self.doctor, self.day), {
+            'total': 4, 'available': 4, 'pending': 0, 'confirmed': 0, 'cancelled': 0,
+        })
+
+        slot = TimeSlot.objects.filter(doctor=self.doctor).earliest('start_time')
+        self.authenticate(self.patient)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('appointment-list'), {'doctor': self.doctor.pk, 'timeslot': slot.pk})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(summary(self.doctor, self.day)['available'], 3)
+        self.assertEqual(summary(self.doctor, self.day)['pending'], 1)
+
+        self.authenticate(self.doctor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('appointment-bulk-status'), {'status': 'cancelled', 'ids': [response.data['id']]},
+                             format='json')
+        self.assertEqual(summary(self.doctor, self.day), {
+            'total': 4, 'available': 4, 'pending': 0, 'confirmed': 0, 'cancelled': 1,
+        })
+
+    def test_moving_and_deleting_slots_refresh_both_days(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            slot = TimeSlot.objects.create(doctor=self.doctor, date=self.day, start_time=time(9), end_time=time(9, 30))
+        slot = TimeSlot.objects.get(pk=slot.pk)
+        later = self.day + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            slot.date = later
+            slot.save()
+        self.assertIsNone(summary(self.doctor, self.day))
+        self.assertEqual(summary(self.doctor, later)['total'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            slot.delete()
+        self.assertFalse(DoctorDaySummary.objects.exists())
+
+    def test_rebuild_matches_incremental_refresh(self):
+        seed(doctors=2, patients=10, days=3)
+        expected = list(DoctorDaySummary.objects.values('doctor', 'date', 'total', 'available', 'pending'))
+        self.assertEqual(len(expected), 6)
+        DoctorDaySummary.objects.all().delete()
+        refresh_day_summaries({(row['doctor'], row['date']) for row in expected})
+        self.assertEqual(list(DoctorDaySummary.objects.values('doctor', 'date', 'total', 'available', 'pending')),
+                         expected)
+        out = StringIO()
+        call_command('rebuild_day_summaries', stdout=out)
+        self.assertIn('Rebuilt 6 day summaries', out.getvalue())
+        for row in expected:
+            booked = Appointment.objects.filter(
+                doctor_id=row['doctor'], timeslot__date=row['date'], status='pending',
+            ).count()
+            self.assertEqual(row['pending'], booked)
+
+    def test_refresh_locks_its_doctors_before_aggregating(self):
+        TimeSlot.objects.create(doctor=self.doctor, date=self.day, start_time=time(9), end_time=time(10))
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True,
+                               side_effect=QuerySet.select_for_update) as lock, \
+                CaptureQueriesContext(connection) as ctx:
+            refresh_day_summaries([(self.doctor.pk, self.day)])
+        lock.assert_called_once()
+        self.assertEqual(lock.call_args.args[0].model, User)
+        sql = [query['sql'] for query in ctx.captured_queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        # The lock comes first, so the aggregate reads counts no older refresh can overwrite.
+        self.assertIn('"users"', sql[0])
+        self.assertIn('COUNT(', sql[1])
+        self.assertEqual(summary(self.doctor, self.day)['total'], 1)
+
+
+class DaySummaryEndpointTestCase(AuthenticatedClientMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(doctors=2, patients=10, days=5)
+        cls.doctor = User.objects.get(username='doctor0')
+        cls.admin = User.objects.create(username='admin', email='admin@example.com', role='admin')
+
+    def get(self, user, **params):
+        self.authenticate(user)
+        return self.client.get(reverse('day-summary-list'), params)
+
+    def test_doctor_sees_a_date_range_of_their_own_days(self):
+        start = date.today() + timedelta(days=2)
+        with self.assertNumQueries(2):
+            response = self.get(self.doctor, date_from=start, date_to=start + timedelta(days=1))
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results']
+        self.assertEqual([row['date'] for row in rows], [str(start), str(start + timedelta(days=1))])
+        self.assertEqual({row['doctor'] for row in rows}, {self.doctor.pk})
+        self.assertEqual(rows[0]['booked'], rows[0]['total'] - rows[0]['available'])
+
+    def test_admin_filters_by_doctor_and_patients_are_refused(self):
+        rows = self.get(self.admin, doctor=self.doctor.pk).data['results']
+        self.assertEqual(len(rows), 5)
+        patient = User.objects.get(username='patient0')
+        self.assertEqual(self.get(patient).status_code, 403)
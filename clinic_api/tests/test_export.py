@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+
+from asgiref.sync import async_to_sync
+from django.http import StreamingHttpResponse
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import TimeSlot
+from clinic_api.apps.appointments.models import Appointment
+from clinic_api.apps.appointments.seed import seed
+from clinic_api.apps.appointments.serializers import AppointmentSerializer
+from clinic_api.tests.clients import AuthenticatedClientMixin, bearer
+
+
+@override_settings(EXPORT_CHUNK_SIZE=7)
+class StreamingExportTestCase(AuthenticatedClientMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(doctors=3, patients=20, days=2)
+        cls.admin = User.objects.create(username='admin', email='admin@example.com', role='admin')
+        cls.doctor = User.objects.get(username='doctor0')
+        cls.patient = Appointment.objects.earliest('id').patient
+
+    def export(self, user, basename, export_format, **params):
+        self.authenticate(user)
+        response = self.client.get(reverse(f'{basename}-export', args=[export_format]), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return b''.join(response.streaming_content).decode()
+
+    def test_appointment_csv_matches_the_list_representation(self):
+        with self.assertNumQueries(1):
+            body = self.export(self.admin, 'appointment', 'csv')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        expected = AppointmentSerializer(Appointment.objects.order_by('-created_at', '-id'), many=True).data
+        self.assertEqual(len(rows), len(expected))
+        self.assertEqual(list(rows[0]), AppointmentSerializer.Meta.fields)
+        self.assertEqual(rows[0], {key: str(value) for key, value in expected[0].items()})
+
+    def test_appointment_ndjson_is_scoped_and_filtered(self):
+        body = self.export(self.doctor, 'appointment', 'ndjson', status='confirmed')
+        rows = [json.loads(line) for line in body.splitlines()]
+        expected = Appointment.objects.filter(doctor=self.doctor, status='confirmed')
+        self.assertEqual(sorted(row['id'] for row in rows), sorted(expected.values_list('id', flat=True)))
+
+        body = self.export(self.patient, 'appointment', 'ndjson')
+        self.assertEqual({json.loads(line)['patient'] for line in body.splitlines()}, {self.patient.pk})
+
+    def test_timeslot_export(self):
+        body = self.export(self.doctor, 'timeslot', 'csv', is_available='true')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), TimeSlot.objects.filter(doctor=self.doctor, is_available=True).count())
+        self.assertEqual(rows, sorted(rows, key=lambda row: (row['date'], row['start_time'])))
+        # Write-only fields such as ``overnight`` are not part of the representation.
+        self.assertNotIn('overnight', rows[0])
+
+        self.assertEqual(self.export(self.patient, 'timeslot', 'ndjson'), '')
+
+    def test_csv_cells_cannot_start_formulas(self):
+        User.objects.filter(pk=self.patient.pk).update(first_name='=HYPERLINK("http://evil")', last_name='x')
+        body = self.export(self.admin, 'appointment', 'csv')
+        names = {row['patient_name'] for row in csv.DictReader(io.StringIO(body))}
+        self.assertIn('\'=HYPERLINK("http://evil") x', names)
+        self.assertFalse(any(name.startswith(('=', '+', '-', '@')) for name in names))
+
+    def test_asgi_export_streams_from_an_async_iterator(self):
+        url = reverse('appointment-export', args=['ndjson'])
+
+        async def export():
+            response = await AsyncClient().get(url, headers={'Authorization': bearer(self.admin)})
+            # A sync iterator would be drained into a list before the first byte is sent.
+            self.assertTrue(response.is_async)
+            return response.status_code, [block async for block in response.streaming_content]
+
+        with override_settings(ROOT_URLCONF='clinic_api.core.async_urls'):
+            status_code, blocks = async_to_sync(export)()
+        self.assertEqual(status_code, 200)
+        self.assertGreater(len(blocks), 1)
+        self.assertEqual(b''.join(blocks).decode(), self.export(self.admin, 'appointment', 'ndjson'))
@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.hashers import check_password
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from clinic_api.apps.users.cache import directory_version
+from clinic_api.apps.users.models import User
+
+CSV = """username,email,password,first_name,last_name,role,specialization,experience_years,phone,date_of_birth
+drnew,drnew@example.com,Str0ng-pass!,Nodira,Karimova,doctor,Cardiology,12,,
+alice,alice@EXAMPLE.com,,Alice,Smith,patient,,,+998901234567,1990-05-01
+existing,someone@example.com,,,,patient,,,,
+bob,bob@example.com,,Bob,,patient,,not-a-number,,
+alice,alice2@example.com,,Alice,Again,patient,,,,
+carol,not-an-email,,,,patient,,,,
+"""
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportUsersTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create(username='existing', email='existing@example.com', role='patient')
+
+    def setUp(self):
+        self.scratch = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.scratch)
+
+    def write(self, name, content):
+        path = os.path.join(self.scratch, name)
+        with open(path, 'w') as fh:
+            fh.write(content)
+        return path
+
+    def import_users(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_users', path, '--processes', '1', *args, stdout=out, stderr=err)
+        return json.loads(out.getvalue()), err.getvalue()
+
+    def test_csv_rows_are_created_with_profiles_and_errors_reported(self):
+        version = directory_version()
+        errors = os.path.join(self.scratch, 'errors.ndjson')
+        with self.captureOnCommitCallbacks(execute=True):
+            stats, progress = self.import_users(self.write('users.csv', CSV), '--batch-size', '2', '--errors', errors)
+        self.assertEqual((stats['rows'], stats['created'], stats['rejected']), (6, 2, 4))
+        self.assertIn('6 rows read, 2 created, 4 rejected', progress)
+
+        with open(errors) as fh:
+            rejected = {row['row']: row['errors'] for row in map(json.loads, fh)}
+        self.assertEqual(set(rejected), {3, 4, 5, 6})
+        self.assertIn('username', rejected[3])
+        self.assertIn('experience_years', rejected[4])
+        self.assertIn('username', rejected[5])
+        self.assertIn('email', rejected[6])
+
+        doctor = User.objects.get(username='drnew')
+        self.assertTrue(check_password('Str0ng-pass!', doctor.password))
+        self.assertEqual(doctor.doctor_profile.specialization, 'Cardiology')
+        self.assertEqual(doctor.doctor_profile.experience_years, 12)
+        patient = User.objects.get(username='alice')
+        self.assertEqual(patient.email, 'alice@example.com')
+        self.assertFalse(patient.has_usable_password())
+        self.assertEqual(str(patient.patient_profile.date_of_birth), '1990-05-01')
+        self.assertNotEqual(directory_version(), version)
+
+    def test_ndjson_and_dry_run(self):
+        path = self.write('users.ndjson', '\n'.join([
+            json.dumps({'username': 'dave', 'email': 'dave@example.com', 'role': 'admin'}),
+            '{not json',
+            '',
+            json.dumps({'username': 'erin', 'email': 'erin@example.com', 'password': 'short'}),
+        ]))
+        stats, progress = self.import_users(path, '--dry-run')
+        self.assertEqual((stats['rows'], stats['created'], stats['rejected']), (3, 1, 2))
+        self.assertFalse(User.objects.filter(username='dave').exists())
+        self.assertIn('"row": 2', progress)
+        self.assertIn('"password"', progress)
+
+        stats, _ = self.import_users(path)
+        self.assertEqual(stats['created'], 1)
+        self.assertTrue(User.objects.filter(username='dave', role='admin').exists())
@@ -0,0 +1,15 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from clinic_api.apps.appointments.seed import seed
+
+
+class HotQueryIndexTestCase(TestCase):
+
+    def test_hot_queries_use_indexes(self):
+        seed(doctors=3, patients=20, days=2)
+        out = StringIO()
+        call_command('explain_queries', '--strict', stdout=out)
+        self.assertNotIn('NO INDEX', out.getvalue())
@@ -0,0 +1,103 @@
+import random
+from datetime import date, time, timedelta
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import TimeSlot
+from clinic_api.apps.doctors.overlaps import IntervalIndex, has_overlap, slot_bounds
+from clinic_api.tests.clients import AuthenticatedClientMixin
+
+DAY = date(2030, 1, 7)
+
+
+class IntervalIndexTestCase(SimpleTestCase):
+
+    def test_overnight_slots_overlap_the_next_morning(self):
+        index = IntervalIndex([(DAY, time(23), time(1))])
+        self.assertTrue(index.overlaps(DAY + timedelta(days=1), time(0, 30), time(2)))
+        self.assertFalse(index.overlaps(DAY + timedelta(days=1), time(1), time(2)))
+        self.assertFalse(index.overlaps(DAY, time(22), time(23)))
+
+    def test_matches_pairwise_comparison(self):
+        rng = random.Random(7)
+        minutes = [time(h, m) for h in range(24) for m in (0, 30)]
+        slots = []
+        for _ in range(300):
+            start, end = rng.sample(minutes, 2)
+            slots.append((DAY + timedelta(days=rng.randint(0, 3)), start, end))
+
+        index, accepted = IntervalIndex(), []
+        for slot in slots:
+            start, end = slot_bounds(*slot)
+            expected = any(start < other_end and end > other_start for other_start, other_end in accepted)
+            self.assertEqual(index.overlaps(*slot), expected, slot)
+            if not expected:
+                index.add(*slot)
+                accepted.append((start, end))
+        self.assertEqual(len(index), len(accepted))
+
+
+class OverlapValidationTestCase(AuthenticatedClientMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = User.objects.create(username='drsmith', email='drsmith@example.com', role='doctor')
+        cls.day = date.today() + timedelta(days=3)
+        cls.night = TimeSlot.objects.create(doctor=cls.doctor, date=cls.day, start_time=time(23), end_time=time(1))
+        cls.morning = TimeSlot.objects.create(
+            doctor=cls.doctor, date=cls.day + timedelta(days=1), start_time=time(9), end_time=time(10),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.doctor)
+
+    def test_exists_query_sees_slots_across_midnight(self):
+        next_day = self.day + timedelta(days=1)
+        with self.assertNumQueries(1):
+            self.assertTrue(has_overlap(self.doctor, next_day, time(0), time(0, 30)))
+        self.assertTrue(has_overlap(self.doctor, self.day - timedelta(days=1), time(23, 30), time(23, 15)))
+        self.assertFalse(has_overlap(self.doctor, next_day, time(1), time(9)))
+        self.assertFalse(has_overlap(self.doctor, self.day, time(23), time(1), exclude=self.night.pk))
+
+    def test_overnight_slots_must_be_asked_for(self):
+        url = reverse('timeslot-list')
+        slot = {'doctor': self.doctor.pk, 'date': self.day + timedelta(days=5), 'start_time': '22:00', 'end_time': '02:00'}
+        response = self.client.post(url, slot)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Start time must be before end time', str(response.data))
+        self.assertEqual(self.client.post(url, {**slot, 'start_time': '02:00'}).status_code, 400)
+
+        response = self.client.post(url, {**slot, 'overnight': True})
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertNotIn('overnight', response.data)
+
+        detail = reverse('timeslot-detail', args=[response.data['id']])
+        self.assertEqual(self.client.patch(detail, {'is_available': False}).status_code, 200)
+        self.assertEqual(self.client.patch(detail, {'end_time': '03:00'}).status_code, 400)
+        self.assertEqual(self.client.patch(detail, {'end_time': '03:00', 'overnight': True}).status_code, 200)
+
+    def test_create_and_update_reject_overlaps(self):
+        response = self.client.post(reverse('timeslot-list'), {
+            'doctor': self.doctor.pk, 'date': self.day + timedelta(days=1), 'start_time': '00:30', 'end_time': '02:00',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('overlaps', str(response.data))
+
+        url = reverse('timeslot-detail', args=[self.morning.pk])
+        response = self.client.patch(url, {'start_time': '00:45'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.patch(url, {'start_time': '08:30'}).status_code, 200)
+
+    def test_bulk_creation_skips_the_tail_of_an_overnight_slot(self):
+        next_day = self.day + timedelta(days=1)
+        response = self.client.post(reverse('timeslot-bulk'), {
+            'start_date': next_day.isoformat(), 'weeks': 1, 'weekdays': [next_day.weekday()],
+            'day_start': '00:00', 'day_end': '02:00', 'slot_minutes': 30,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([slot['start_time'] for slot in response.data['created']], ['01:00:00', '01:30:00'])
+        self.assertEqual(len(response.data['conflicts']), 2)
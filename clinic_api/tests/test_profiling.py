@@ -0,0 +1,68 @@
+import os
+import tempfile
+from datetime import date, time, timedelta
+
+from django.conf import settings
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import TimeSlot
+from clinic_api.core.profiling import registry, slow_requests
+from clinic_api.tests.clients import AuthenticatedClientMixin
+
+PROFILED_MIDDLEWARE = ['clinic_api.core.profiling.RequestProfilingMiddleware'] + settings.MIDDLEWARE
+
+
+@override_settings(MIDDLEWARE=PROFILED_MIDDLEWARE)
+class RequestProfilingTestCase(AuthenticatedClientMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+        self.doctor = User.objects.create(username='drsmith', email='drsmith@example.com', role='doctor')
+        self.admin = User.objects.create(username='admin', email='admin@example.com', role='admin')
+        tomorrow = date.today() + timedelta(days=1)
+        for hour in (9, 10, 11):
+            TimeSlot.objects.create(doctor=self.doctor, date=tomorrow, start_time=time(hour), end_time=time(hour, 30))
+
+    def test_server_timing_and_metrics(self):
+        self.authenticate(self.doctor)
+        response = self.client.get(reverse('doctor-timeslots', kwargs={'pk': self.doctor.pk}))
+        self.assertEqual(response.status_code, 200)
+        timing = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(set(timing), {'db', 'serialize', 'render', 'app', 'total'})
+        self.assertIn('3 queries', timing['db'])
+        # Serializing the page is timed apart from rendering it to JSON.
+        self.assertGreater(float(timing['serialize'].removeprefix('dur=')), 0)
+        self.assertGreater(float(timing['render'].removeprefix('dur=')), 0)
+
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+
+        self.authenticate(self.admin)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        labels = '{route="doctor-timeslots",action="timeslots",method="GET"}'
+        self.assertIn(f'clinic_request_duration_seconds_count{labels} 1', body)
+        self.assertIn(f'clinic_request_queries_total{labels} 3', body)
+        self.assertIn(f'clinic_request_duplicate_queries_total{labels} 0', body)
+        self.assertIn(f'clinic_request_serialize_seconds_total{labels} ', body)
+        self.assertIn(f'clinic_request_render_seconds_total{labels} ', body)
+        self.assertIn('clinic_request_duration_seconds_count{route="metrics",action="",method="GET"} 1', body)
+        self.assertIn('clinic_login_attempts_total 0', body)
+
+    def test_slow_sampled_requests_are_dumped(self):
+        self.authenticate(self.doctor)
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            PROFILING_SAMPLE_RATE=1.0, PROFILING_SLOW_MS=0, PROFILING_DUMP_DIR=directory, PROFILING_DUMP_KEEP=2,
+        ):
+            slow_requests.reset()
+            for _ in range(4):
+                self.client.get(reverse('timeslot-list'))
+            dumps = os.listdir(directory)
+        self.assertEqual(len(dumps), 2)
+        self.assertTrue(all('timeslot-list-list-GET' in name and name.endswith('.prof') for name in dumps))
@@ -0,0 +1,229 @@
+from contextlib import contextmanager
+from datetime import date, timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.settings import api_settings
+from rest_framework.test import APITestCase
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import TimeSlot
+from clinic_api.apps.appointments.models import Appointment
+from clinic_api.apps.appointments.seed import seed
+from clinic_api.tests.clients import AuthenticatedClientMixin
+
+PAGE_SIZES = (10, 100)
+
+
+@contextmanager
+def page_size(size):
+    with mock.patch.object(api_settings.DEFAULT_PAGINATION_CLASS, 'page_size', size):
+        yield
+
+
+class QueryBudgetTestCase(AuthenticatedClientMixin, APITestCase):
+    """Every routed endpoint runs within a fixed number of queries.
+
+    List endpoints are measured at several page sizes against a seeded
+    dataset of thousands of rows, so an N+1 shows up as a budget overrun.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(doctors=40, patients=2000, days=10)
+        cls.admin = User.objects.create(username='admin', email='admin@example.com', role='admin')
+        cls.doctor = User.objects.filter(role='doctor').earliest('id')
+        cls.appointment = Appointment.objects.filter(doctor=cls.doctor).earliest('id')
+        cls.patient = cls.appointment.patient
+        cls.free_slot = TimeSlot.objects.filter(doctor=cls.doctor, is_available=True, appointment__isnull=True).earliest('id')
+
+    def assertQueryBudget(self, budget, method, url, data=None, expected_status=200, page_sizes=(None,)):
+        for size in page_sizes:
+            with page_size(size or api_settings.PAGE_SIZE), CaptureQueriesContext(connection) as ctx:
+                response = getattr(self.client, method)(url, data, format='json')
+            self.assertEqual(response.status_code, expected_status, response.content)
+            if len(ctx.captured_queries) > budget:
+                queries = '\n'.join(f'  {q["sql"]}' for q in ctx.captured_queries)
+                self.fail(
+                    f'{method.upper()} {url} (page size {size}) ran {len(ctx.captured_queries)} '
+                    f'queries, budget is {budget}:\n{queries}'
+                )
+        return response
+
+    def assertListBudget(self, budget, url):
+        return self.assertQueryBudget(budget, 'get', url, page_sizes=PAGE_SIZES)
+
+    def test_users(self):
+        self.authenticate(self.admin)
+        self.assertListBudget(3, reverse('user-list'))
+        self.assertQueryBudget(2, 'get', reverse('user-detail', kwargs={'pk': self.doctor.pk}))
+        self.assertQueryBudget(1, 'get', reverse('user-me'))
+        self.assertQueryBudget(1, 'get', reverse('auth-me'))
+
+    def test_doctors(self):
+        self.authenticate(self.patient)
+        self.assertListBudget(2, reverse('doctor-list'))
+        self.assertListBudget(2, reverse('doctor-list') + '?search=Cardiology')
+        self.assertQueryBudget(1, 'get', reverse('doctor-detail', kwargs={'pk': self.doctor.pk}))
+        self.assertListBudget(3, reverse('doctor-timeslots', kwargs={'pk': self.doctor.pk}))
+
+    def test_timeslots(self):
+        self.authenticate(self.admin)
+        self.assertListBudget(2, reverse('timeslot-list'))
+        self.assertListBudget(3, reverse('timeslot-list') + '?page=2')
+        self.authenticate(self.doctor)
+        self.assertListBudget(2, reverse('timeslot-list') + '?is_available=true')
+        self.assertListBudget(2, reverse('timeslot-mine'))
+        self.assertQueryBudget(2, 'get', reverse('timeslot-detail', kwargs={'pk': self.free_slot.pk}))
+        day = (date.today() + timedelta(days=30)).isoformat()
+        self.assertQueryBudget(5, 'post', reverse('timeslot-list'), {
+            'doctor': self.doctor.pk, 'date': day, 'start_time': '09:00', 'end_time': '09:30',
+        }, expected_status=201)
+        self.assertQueryBudget(14, 'post', reverse('timeslot-bulk'), {
+            'start_date': day, 'weeks': 2, 'day_start': '10:00', 'day_end': '17:00',
+        }, expected_status=201)
+
+    def test_appointments(self):
+        for user in (self.admin, self.doctor, self.patient):
+            self.authenticate(user)
+            self.assertListBudget(2, reverse('appointment-list'))
+            self.assertListBudget(2, reverse('appointment-me'))
+            self.assertQueryBudget(2, 'get', reverse('appointment-detail', kwargs={'pk': self.appointment.pk}))
+
+        self.authenticate(self.patient)
+        self.assertQueryBudget(8, 'post', reverse('appointment-list'), {
+            'doctor': self.doctor.pk, 'timeslot': self.free_slot.pk,
+        }, expected_status=201)
+        self.authenticate(self.doctor)
+        self.assertQueryBudget(6, 'patch', reverse('appointment-detail', kwargs={'pk': self.appointment.pk}), {
+            'status': 'cancelled',
+        })
+
+    def test_availability(self):
+        self.authenticate(self.patient)
+        url = reverse('availability')
+        response = self.assertQueryBudget(1, 'get', url, {'per_doctor': 2, 'time_from': '10:00'})
+        doctors = response.data['results']
+        self.assertEqual(len(doctors), User.objects.filter(role='doctor').count())
+        for doctor in doctors:
+            self.assertLessEqual(len(doctor['slots']), 2)
+            self.assertTrue(all(slot['start_time'] >= '10:00' for slot in doctor['slots']))
+
+        response = self.assertQueryBudget(1, 'get', url, {'first': 5, 'specialization': 'cardiology'})
+        slots = [slot for doctor in response.data['results'] for slot in doctor['slots']]
+        self.assertLessEqual(len(slots), 5)
+        self.assertTrue(all(doctor['specialization'] == 'Cardiology' for doctor in response.data['results']))
+
+    def test_availability_first_is_a_plain_limit(self):
+        self.authenticate(self.patient)
+        url = reverse('availability')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {'first': 5})
+        self.assertEqual(len(ctx.captured_queries), 1)
+        sql = ctx.captured_queries[0]['sql']
+        # No window: the LIMIT can stop the calendar-index scan after five slots.
+        self.assertNotIn('ROW_NUMBER', sql)
+        self.assertTrue(sql.endswith('LIMIT 5'), sql)
+        slots = [slot['id'] for doctor in response.data['results'] for slot in doctor['slots']]
+        earliest = (
+            TimeSlot.objects.filter(is_available=True, date__gte=date.today() + timedelta(days=1))
+            .order_by('date', 'start_time', 'id').values_list('id', flat=True)[:5]
+        )
+        self.assertEqual(sorted(slots), sorted(earliest))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url, {'first': 5, 'per_doctor': 1})
+        self.assertIn('ROW_NUMBER', ctx.captured_queries[0]['sql'])
+
+    def test_unchanged_lists_answer_304(self):
+        self.authenticate(self.doctor)
+        etags = {}
+        for url in (reverse('appointment-me'), reverse('timeslot-mine'), reverse('timeslot-list') + '?is_available=true'):
+            etags[url] = self.assertQueryBudget(2, 'get', url)['ETag']
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, 304)
+
+        url = reverse('appointment-me')
+        # A change outside the page being served leaves its ETag alone...
+        last = Appointment.objects.filter(doctor=self.doctor).order_by('created_at', 'id').first()
+        Appointment.objects.filter(pk=last.pk).update(status='confirmed', updated_at=timezone.now())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code, 304)
+        # ...a change on it does not.
+        first = Appointment.objects.filter(doctor=self.doctor).order_by('-created_at', '-id').first()
+        Appointment.objects.filter(pk=first.pk).update(status='confirmed', updated_at=timezone.now())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etags[url])
+        etags[url] = response['ETag']
+
+        # Names and slot times come from joined rows; changing them changes the ETag too.
+        User.objects.filter(pk=first.patient_id).update(first_name='Renamed', updated_at=timezone.now())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+        self.assertEqual(response.status_code, 200)
+        etags[url] = response['ETag']
+        TimeSlot.objects.filter(pk=first.timeslot_id).update(updated_at=timezone.now())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code, 200)
+
+        # Deleting a row leaves the page's newest timestamp alone, so lists carry no Last-Modified.
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        Appointment.objects.filter(pk=first.pk).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date()).status_code, 200)
+        detail = self.client.get(reverse('appointment-detail', kwargs={'pk': response.data['results'][1]['id']}))
+        self.assertIn('Last-Modified', detail)
+        self.assertEqual(self.client.get(detail.wsgi_request.path, HTTP_IF_MODIFIED_SINCE=detail['Last-Modified']).status_code, 304)
+
+    def test_validators_never_count_the_table(self):
+        self.authenticate(self.admin)
+        url = reverse('appointment-list')
+        with CaptureQueriesContext(connection) as ctx:
+            etag = self.client.get(url)['ETag']
+        self.assertFalse(any('COUNT(' in query['sql'] for query in ctx.captured_queries))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertIn('LIMIT 11', ctx.captured_queries[0]['sql'])
+
+        # Numbered pages show a count, which the validator reads in the same query.
+        url = reverse('appointment-list') + '?page=3'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Appointment.objects.filter(pk=Appointment.objects.order_by('-created_at', '-id').last().pk).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_keyset_pages_cost_the_same(self):
+        self.authenticate(self.admin)
+        expected = list(Appointment.objects.order_by('-created_at', '-id').values_list('id', flat=True)[:60])
+        url, seen, pages = reverse('appointment-list'), [], []
+        while len(seen) < len(expected):
+            response = self.assertQueryBudget(2, 'get', url)
+            pages.append(response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen[:len(expected)], expected)
+        self.assertIsNone(pages[0]['previous'])
+
+        response = self.assertQueryBudget(2, 'get', pages[-1]['previous'])
+        self.assertEqual(response.data['results'], pages[-2]['results'])
+
+        response = self.assertQueryBudget(3, 'get', reverse('appointment-list') + '?page=2')
+        self.assertEqual(response.data['count'], Appointment.objects.count())
+        # Going back from page 2 stays on numbered pages.
+        self.assertIn('page=1', response.data['previous'])
+        self.assertNotIn('cursor', response.data['previous'])
+
+    def test_auth(self):
+        self.client.credentials()
+        self.assertQueryBudget(1, 'post', reverse('token_obtain_pair'), {
+            'username': self.patient.username, 'password': 'pass1234',
+        })
+        self.assertQueryBudget(6, 'post', reverse('auth-register'), {
+            'username': 'newpatient', 'email': 'newpatient@example.com', 'password': 'S3cure-pass!',
+            'password2': 'S3cure-pass!', 'first_name': 'New', 'last_name': 'Patient', 'role': 'patient',
+        }, expected_status=201)
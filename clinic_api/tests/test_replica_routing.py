@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+from datetime import date, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import TimeSlot
+from clinic_api.apps.appointments.models import Appointment
+from clinic_api.core.db_routers import PrimaryReplicaRouter, ReplicaRoutingMiddleware, use_primary
+from clinic_api.tests.clients import AuthenticatedClientMixin
+from clinic_api.tests.databases import FileDatabaseMixin
+
+REPLICA = 'replica'
+
+
+@override_settings(
+    DATABASE_REPLICA_ALIASES=[REPLICA],
+    MIDDLEWARE=['clinic_api.core.db_routers.ReplicaRoutingMiddleware'] + settings.MIDDLEWARE,
+)
+class ReplicaRoutingTestCase(AuthenticatedClientMixin, FileDatabaseMixin, TransactionTestCase):
+    """Two SQLite files: the test database as primary and a stale copy of it as replica."""
+
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scratch = tempfile.mkdtemp()
+        cls.replica_path = os.path.join(cls.scratch, 'replica.sqlite3')
+        # Registered before super() so '__all__' covers it.
+        connections.settings[REPLICA] = {**connections['default'].settings_dict, 'NAME': cls.replica_path}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        shutil.rmtree(cls.scratch, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        self.doctor = User.objects.create(username='drsmith', email='drsmith@example.com', role='doctor')
+        self.patient = User.objects.create(username='alice', email='alice@example.com', role='patient')
+        self.slot = TimeSlot.objects.create(
+            doctor=self.doctor, date=date.today() + timedelta(days=1), start_time=time(9), end_time=time(9, 30),
+        )
+        self.replicate()
+        self.client = APIClient()
+        self.authenticate(self.patient)
+
+    def replicate(self):
+        connections[REPLICA].close()
+        shutil.copyfile(connections['default'].settings_dict['NAME'], self.replica_path)
+
+    def test_safe_requests_read_from_the_replica(self):
+        url = reverse('doctor-timeslots', kwargs={'pk': self.doctor.pk})
+        TimeSlot.objects.create(doctor=self.doctor, date=self.slot.date, start_time=time(10), end_time=time(10, 30))
+        self.assertEqual(len(self.client.get(url).json()['results']), 1)
+
+        self.replicate()
+        self.assertEqual(len(self.client.get(url).json()['results']), 2)
+
+    def test_directory_cache_is_filled_from_the_primary(self):
+        # The signal bumps the directory version; the replica has not seen the new doctor yet.
+        User.objects.create(username='drnew', email='drnew@example.com', role='doctor')
+        usernames = [doctor['username'] for doctor in self.client.get(reverse('doctor-list')).json()['results']]
+        self.assertEqual(sorted(usernames), ['drnew', 'drsmith'])
+        self.assertEqual(self.client.get(reverse('doctor-detail', kwargs={'pk': self.doctor.pk})).status_code, 200)
+
+    def test_writes_go_to_the_primary_and_stick_for_a_while(self):
+        response = self.client.post(reverse('appointment-list'), {'doctor': self.doctor.pk, 'timeslot': self.slot.pk})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(Appointment.objects.using('default').exists())
+        self.assertFalse(Appointment.objects.using(REPLICA).exists())
+
+        # Read-after-write: the lagging replica does not have the booking yet.
+        self.assertEqual(len(self.client.get(reverse('appointment-me')).json()['results']), 1)
+
+        # Once the sticky window has passed, reads go back to the replica.
+        cache.delete(ReplicaRoutingMiddleware.sticky_key(response.wsgi_request))
+        self.assertEqual(len(self.client.get(reverse('appointment-me')).json()['results']), 0)
+
+    def test_outside_requests_and_use_primary_read_the_primary(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(User), 'default')
+        with use_primary():
+            self.assertEqual(router.db_for_read(User), 'default')
+        self.assertFalse(router.allow_migrate(REPLICA, 'users'))
@@ -0,0 +1,75 @@
+import json
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth.hashers import check_password
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import DoctorDaySummary, DoctorProfile, TimeSlot
+from clinic_api.apps.patients.models import PatientProfile
+from clinic_api.apps.appointments.models import Appointment
+from clinic_api.apps.appointments.seed import seed
+
+START = date(2030, 1, 7)
+
+
+def snapshot():
+    return (
+        list(User.objects.order_by('id').values_list('id', 'username', 'first_name', 'last_name', 'role')),
+        list(PatientProfile.objects.order_by('id').values_list('user_id', 'phone', 'date_of_birth', 'gender')),
+        list(TimeSlot.objects.order_by('id').values_list('doctor_id', 'date', 'start_time', 'is_available')),
+        list(Appointment.objects.order_by('id').values_list('doctor_id', 'patient_id', 'timeslot_id', 'status')),
+    )
+
+
+class SeedTestCase(TestCase):
+
+    def test_small_batches_write_consistent_rows(self):
+        counts = seed(doctors=3, patients=7, days=4, slots_per_day=5, start=START, batch_size=4)
+        self.assertEqual(counts['timeslots'], 3 * 4 * 5)
+        self.assertEqual(TimeSlot.objects.count(), counts['timeslots'])
+        self.assertEqual(Appointment.objects.count(), counts['appointments'])
+        self.assertEqual(DoctorProfile.objects.count(), 3)
+        self.assertEqual(PatientProfile.objects.count(), 7)
+        self.assertTrue(check_password('pass1234', User.objects.get(username='patient6').password))
+
+        for appointment in Appointment.objects.select_related('timeslot', 'patient'):
+            self.assertEqual(appointment.doctor_id, appointment.timeslot.doctor_id)
+            self.assertEqual(appointment.patient.role, 'patient')
+            self.assertEqual(appointment.timeslot.is_available, appointment.status == 'cancelled')
+        self.assertFalse(TimeSlot.objects.filter(appointment__isnull=True, is_available=False).exists())
+        self.assertEqual(
+            sum(DoctorDaySummary.objects.values_list('total', flat=True)), counts['timeslots'],
+        )
+        # Keys were assigned explicitly; the ORM carries on after them.
+        self.assertGreater(User.objects.create(username='late', email='late@example.com').pk, counts['patients'] + 3)
+
+    def test_same_seed_gives_same_data(self):
+        seed(doctors=2, patients=5, days=3, start=START, batch_size=7)
+        first = snapshot()
+        for model in (Appointment, TimeSlot, User):
+            model.objects.all().delete()
+        # Batch boundaries do not change the data.
+        seed(doctors=2, patients=5, days=3, start=START, batch_size=100)
+        self.assertEqual(snapshot(), first)
+
+    def test_day_must_end_by_midnight(self):
+        with self.assertRaisesMessage(ValueError, 'A day of slots must end by midnight'):
+            seed(doctors=1, patients=1, days=1, slots_per_day=31)
+
+
+class SeedDataCommandTestCase(TestCase):
+
+    def test_command_reports_counts(self):
+        out = StringIO()
+        call_command('seed_data', doctors=2, patients=4, days=10, start=START, stdout=out, stderr=StringIO())
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['timeslots'], 2 * 10 * 16)
+        self.assertEqual(report['rows'], 2 + 4 + report['timeslots'] + report['appointments'])
+        self.assertEqual(Appointment.objects.count(), report['appointments'])
+
+        with self.assertRaisesMessage(CommandError, 'already holds seeded users'):
+            call_command('seed_data', doctors=1, patients=1, days=1, stdout=StringIO())
@@ -0,0 +1,44 @@
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import TimeSlot
+from clinic_api.apps.appointments.models import Appointment
+from clinic_api.apps.appointments.seed import seed
+from clinic_api.apps.appointments.serializers import AppointmentRowSerializer, AppointmentSerializer
+from clinic_api.tests.clients import AuthenticatedClientMixin
+
+
+class AppointmentRowSerializerContractTestCase(AuthenticatedClientMixin, APITestCase):
+    """The .values() fast path renders exactly the bytes the model serializer does."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(doctors=3, patients=20, days=2)
+        cls.admin = User.objects.create(username='admin', email='admin@example.com', role='admin')
+        # Edge cases: a blank first name and an appointment whose slot was deleted.
+        User.objects.filter(pk=Appointment.objects.earliest('id').patient_id).update(first_name='')
+        TimeSlot.objects.filter(pk=Appointment.objects.latest('id').timeslot_id).delete()
+
+    def render_both(self, queryset):
+        queryset = queryset.order_by('-created_at', '-id')
+        rows = queryset.values(*AppointmentRowSerializer.values)
+        models = queryset.select_related('doctor', 'patient', 'timeslot')
+        return (
+            JSONRenderer().render(AppointmentRowSerializer(rows, many=True).data),
+            JSONRenderer().render(AppointmentSerializer(models, many=True).data),
+        )
+
+    def test_rows_render_identically(self):
+        self.assertTrue(Appointment.objects.filter(timeslot__isnull=True).exists())
+        fast, expected = self.render_both(Appointment.objects.all())
+        self.assertEqual(fast, expected)
+
+    def test_list_endpoint_uses_row_serializer(self):
+        self.authenticate(self.admin)
+        response = self.client.get(reverse('appointment-list'))
+        self.assertEqual(response.status_code, 200)
+        page = Appointment.objects.order_by('-created_at', '-id')[:10]
+        expected = JSONRenderer().render(AppointmentSerializer(page, many=True).data)
+        self.assertEqual(JSONRenderer().render(response.data['results']), expected)
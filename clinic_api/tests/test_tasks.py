@@ -0,0 +1,163 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+import time
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from clinic_api.apps.tasks.models import Job
+from clinic_api.apps.tasks import queue
+from clinic_api.apps.tasks.queue import beat_once, due, heartbeat, poll_once, renew_locks, run_due_jobs, run_job, task
+
+calls = []
+
+
+@task(max_attempts=2)
+def flaky(value, failures):
+    calls.append(value)
+    if calls.count(value) <= failures:
+        raise RuntimeError(f'attempt {calls.count(value)} failed')
+
+
+@task
+def slow(seconds):
+    time.sleep(seconds)
+
+
+class TaskQueueTestCase(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_jobs_are_written_with_the_transaction_and_run_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    flaky.enqueue(value='rolled back', failures=0)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Job.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            flaky.enqueue(value='committed', failures=0)
+            self.assertEqual(Job.objects.get().status, Job.QUEUED)
+            self.assertEqual(calls, [])
+        # The local runner runs the job inline right after commit.
+        self.assertEqual(calls, ['committed'])
+        self.assertEqual(Job.objects.get().status, Job.SUCCEEDED)
+
+    @override_settings(TASKS_RUNNER='worker', TASKS_RETRY_DELAY=60)
+    def test_failures_are_retried_with_backoff_then_given_up(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            flaky.enqueue(value='once', failures=1)
+            flaky.enqueue(value='always', failures=5)
+        self.assertEqual(calls, [])
+
+        self.assertEqual(run_due_jobs(), {Job.QUEUED: 2})
+        self.assertEqual(run_due_jobs(), {})
+        self.assertEqual(Job.objects.filter(run_at__gt=timezone.now() + timedelta(seconds=50)).count(), 2)
+
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(run_due_jobs(), {Job.SUCCEEDED: 1, Job.FAILED: 1})
+        failed = Job.objects.get(status=Job.FAILED)
+        self.assertEqual(failed.attempts, 2)
+        self.assertIn('attempt 2 failed', failed.last_error)
+
+    @override_settings(TASKS_RUNNER='worker', TASKS_LOCK_TIMEOUT=60)
+    def test_worker_command_reclaims_abandoned_jobs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            flaky.enqueue(value='abandoned', failures=0)
+        Job.objects.update(status=Job.RUNNING, locked_at=timezone.now() - timedelta(minutes=5), attempts=1)
+        out = StringIO()
+        call_command('run_task_workers', '--once', '--threads', '1', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'succeeded: 1')
+        self.assertEqual(calls, ['abandoned'])
+
+    @override_settings(TASKS_RUNNER='worker')
+    def test_thread_runner_polls_for_due_jobs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            flaky.enqueue(value='retry', failures=0)
+        job = Job.objects.get()
+        pool = mock.Mock()
+        # Connections are the pool thread's business, not this test's transaction's.
+        with mock.patch.object(queue, 'executor', return_value=pool), mock.patch.object(queue, 'close_old_connections'):
+            self.assertEqual(poll_once(), [job.pk])
+            # A job already waiting in the pool is not handed over twice.
+            self.assertEqual(poll_once(), [job.pk])
+            pool.submit.assert_called_once_with(queue.run_in_thread, job.pk)
+            queue.run_in_thread(job.pk)
+        self.assertEqual(calls, ['retry'])
+        self.assertEqual(poll_once(), [])
+
+    @override_settings(TASKS_RUNNER='worker')
+    def test_attempts_of_reclaimed_jobs_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            flaky.enqueue(value='late', failures=0)
+            flaky.enqueue(value='late failure', failures=1)
+        success, failure = Job.objects.order_by('pk')
+
+        def reclaim(job):
+            Job.objects.filter(pk=job.pk).update(locked_by='other')
+
+        # Another worker reclaims the first job while this one runs it: the
+        # attempt rolls back, taking what the task wrote with it.
+        def run_and_lose(value, failures):
+            calls.append(value)
+            reclaim(success)
+
+        with mock.patch.object(flaky, 'func', side_effect=run_and_lose):
+            self.assertIsNone(run_job(success.pk, 'w1'))
+        self.assertEqual(calls, ['late'])
+        success.refresh_from_db()
+        self.assertEqual((success.status, success.locked_by), (Job.RUNNING, 'w1'))
+
+        # The second is reclaimed as its failure is being recorded.
+        with mock.patch.object(queue, 'retry_delay', side_effect=lambda attempts: reclaim(failure) or timedelta()):
+            self.assertIsNone(run_job(failure.pk, 'w1'))
+        failure.refresh_from_db()
+        self.assertEqual((failure.status, failure.locked_by, failure.last_error), (Job.RUNNING, 'other', ''))
+
+    @override_settings(TASKS_RUNNER='worker', TASKS_LOCK_TIMEOUT=60)
+    def test_running_jobs_renew_their_lock(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = slow.enqueue(seconds=0)
+            second = slow.enqueue(seconds=0)
+        stale = timezone.now() - timedelta(minutes=5)
+        Job.objects.update(status=Job.RUNNING, locked_by='w1', locked_at=stale)
+        self.assertEqual(Job.objects.filter(due(timezone.now())).count(), 2)
+        self.assertEqual(renew_locks({first.pk: 'w2', second.pk: 'w1'}), 1)
+        self.assertEqual(list(Job.objects.filter(due(timezone.now())).values_list('pk', flat=True)), [first.pk])
+
+        # One heartbeat thread renews whatever the process is running, and only while it runs.
+        Job.objects.update(locked_at=stale)
+        with mock.patch.object(queue, '_heartbeat', None), mock.patch.object(queue, 'threading') as threads:
+            with heartbeat(first.pk, 'w1'), heartbeat(second.pk, 'w2'):
+                self.assertEqual(beat_once(), 1)
+            self.assertEqual(beat_once(), 0)
+        threads.Thread.assert_called_once()
+        self.assertEqual(list(Job.objects.filter(due(timezone.now())).values_list('pk', flat=True)), [second.pk])
+
+
+@override_settings(TASKS_RUNNER='worker')
+class WritePathJobsTestCase(APITestCase):
+
+    def test_registration_hands_follow_up_work_to_the_queue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('auth-register'), {
+                'username': 'alice', 'email': 'alice@example.com', 'password': 'Str0ng-pass!', 'password2': 'Str0ng-pass!',
+                'first_name': 'Alice', 'last_name': 'Smith', 'role': 'patient',
+            })
+        self.assertEqual(response.status_code, 201, response.content)
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'clinic_api.apps.users.tasks.record_user_registered')
+        self.assertEqual(job.payload, {'user_id': response.data['id']})
+        with self.assertLogs('clinic_api.audit') as logs:
+            self.assertEqual(run_due_jobs(), {Job.SUCCEEDED: 1})
+        self.assertIn('user.registered', logs.output[0])
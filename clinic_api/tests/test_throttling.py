@@ -0,0 +1,166 @@
+import shutil
+import tempfile
+from collections import Counter
+from datetime import date
+from itertools import cycle
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from clinic_api.apps.users.models import User
+from clinic_api.apps.doctors.models import TimeSlot
+from clinic_api.apps.appointments.seed import seed
+from clinic_api.core import throttling
+from clinic_api.core.throttling import RoleRateThrottle, SlidingWindow
+from clinic_api.tests.clients import AuthenticatedClientMixin
+
+RATES = {
+    'booking': {'patient': '3/m', 'total': '5/s'},
+    'availability': {'patient': '2/m', 'doctor': '4/m'},
+    'login': {'anon': '2/m'},
+}
+
+
+class Clock:
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_RATES=RATES)
+class ThrottlingTestCase(AuthenticatedClientMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(doctors=1, patients=40, days=3, booked_ratio=0, start=date(2099, 1, 5))
+        cls.doctor = User.objects.get(username='doctor0')
+        cls.patients = list(User.objects.filter(role='patient').order_by('id'))
+        cls.slots = list(TimeSlot.objects.order_by('id').values_list('pk', flat=True))
+
+    def setUp(self):
+        super().setUp()
+        self.clock = Clock()
+        patcher = mock.patch.object(RoleRateThrottle, 'timer', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def shared_cache(self):
+        """A cache every process sees, as exact 'total' budgets require."""
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        return override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }})
+
+    def book(self, patient, slot):
+        self.authenticate(patient)
+        return self.client.post(reverse('appointment-list'), {'doctor': self.doctor.pk, 'timeslot': slot})
+
+    def test_booking_budget_per_patient_with_retry_after(self):
+        patient = self.patients[0]
+        codes = [self.book(patient, slot).status_code for slot in self.slots[:3]]
+        self.assertEqual(codes, [201, 201, 201])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.book(patient, self.slots[3])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '40')
+        self.assertEqual(len(ctx.captured_queries), 0)
+        # Other patients have their own budget.
+        self.assertEqual(self.book(self.patients[1], self.slots[3]).status_code, 201)
+        # Reads are a separate endpoint group.
+        self.authenticate(patient)
+        self.assertEqual(self.client.get(reverse('appointment-list')).status_code, 200)
+
+    def test_availability_budget_depends_on_role(self):
+        url = reverse('doctor-timeslots', kwargs={'pk': self.doctor.pk})
+        codes = Counter()
+        for user in (self.patients[0], self.doctor):
+            self.authenticate(user)
+            codes[user.role] = sum(self.client.get(url).status_code == 200 for _ in range(6))
+        self.assertEqual(codes, {'patient': 2, 'doctor': 4})
+        self.authenticate(self.patients[0])
+        self.assertEqual(self.client.get(reverse('availability'), {'date': '2099-01-05'}).status_code, 429)
+
+    def test_login_budget_per_ip(self):
+        url = reverse('token_obtain_pair')
+        payload = {'username': 'patient0', 'password': 'pass1234'}
+        self.assertEqual(self.client.post(url, payload).status_code, 200)
+        self.assertEqual(self.client.post(url, {**payload, 'password': 'wrong'}).status_code, 401)
+        response = self.client.post(url, payload)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.clock.now += 120
+        self.assertEqual(self.client.post(url, payload).status_code, 200)
+
+    def test_rates_are_read_per_request(self):
+        patient = self.patients[0]
+        with override_settings(THROTTLE_RATES={'booking': {'patient': '1/m'}}):
+            self.assertEqual(self.book(patient, self.slots[0]).status_code, 201)
+            self.assertEqual(self.book(patient, self.slots[1]).status_code, 429)
+        with override_settings(THROTTLE_ENABLED=False):
+            self.assertEqual(self.book(patient, self.slots[1]).status_code, 201)
+
+    def test_total_budget_is_per_process_without_a_shared_cache(self):
+        warned = self.enterContext(mock.patch.object(throttling, '_warned_scopes', set()))
+        with override_settings(THROTTLE_RATES={'booking': {'total': '1/s'}}):
+            with self.assertLogs('clinic_api.throttling', 'WARNING'):
+                codes = [self.book(self.patients[0], slot).status_code for slot in self.slots[:2]]
+            # This process still enforces it; it just cannot see the others' requests.
+            self.assertEqual(codes, [201, 429])
+            self.assertEqual(warned, {'booking'})
+            self.clock.now += 10
+            with self.shared_cache(), self.assertNoLogs('clinic_api.throttling'):
+                codes = [self.book(self.patients[0], slot).status_code for slot in self.slots[2:4]]
+            self.assertEqual(codes, [201, 429])
+
+    def test_booking_storm_keeps_database_load_bounded(self):
+        """Load test: 40 patients send 400 bookings a second for 3 seconds.
+
+        The shared 5/s budget admits a handful of requests each second and
+        throttled ones never reach the database, so queries per second stay
+        at the budget times one booking's cost however hard clients push.
+        """
+        self.enterContext(self.shared_cache())
+        queries_per_second, admitted_per_second, codes = Counter(), Counter(), Counter()
+        slots = cycle(self.slots)
+        start = self.clock.now
+        for tick in range(3 * 400):
+            self.clock.now = start + tick / 400
+            patient = self.patients[tick % len(self.patients)]
+            with CaptureQueriesContext(connection) as ctx:
+                status_code = self.book(patient, next(slots)).status_code
+            second = tick // 400
+            codes[status_code] += 1
+            queries_per_second[second] += len(ctx.captured_queries)
+            if status_code != 429:
+                admitted_per_second[second] += 1
+            else:
+                self.assertEqual(len(ctx.captured_queries), 0)
+
+        self.assertEqual(codes[429], 3 * 400 - sum(admitted_per_second.values()))
+        # The sliding window smooths admissions across seconds but never exceeds the budget.
+        self.assertTrue(10 <= sum(admitted_per_second.values()) <= 15)
+        for second in range(3):
+            self.assertLessEqual(admitted_per_second[second], 5)
+            # One booking costs a handful of queries (see test_query_budget).
+            self.assertLessEqual(queries_per_second[second], 5 * 10)
+
+
+class SlidingWindowTestCase(AuthenticatedClientMixin, APITestCase):
+
+    def test_previous_window_weighs_in_and_sets_the_wait(self):
+        window = SlidingWindow('throttle:test', limit=4, period=10)
+        self.assertEqual([window.acquire(105) for _ in range(4)], [None] * 4)
+        self.assertEqual(window.acquire(109), 4)
+        # At 112 the previous window still counts 4 * 0.8 = 3.2 requests, at 113 only 2.8.
+        self.assertEqual(window.acquire(112), 1)
+        self.assertIsNone(window.acquire(113))
+        self.assertEqual(cache.get('throttle:test:11'), 1)